@@ -0,0 +1,56 @@
+"""Benchmark blocking vs asynchronous execution of several warehouse queries.
+
+Each query waits ``--seconds`` in the fake warehouse. The blocking baseline
+runs them one after another on one cursor; ``execute_many`` submits them
+all and polls their query IDs, so they overlap. A final run shows a query
+that outlives its timeout being cancelled in the warehouse.
+
+    python benchmarks/bench_async_queries.py --queries 1 4 8 --seconds 0.5
+"""
+import argparse
+import time
+
+from fake_connector import FakeConnection, make_tables
+from core.snowflake import QueryTimeout, SnowflakeConnection
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--queries', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--seconds', type=float, default=0.5, help="Warehouse time per query")
+    parser.add_argument('--latency', type=float, default=0.01, help="Seconds per round-trip")
+    args = parser.parse_args()
+
+    print(f"{'queries':>8} {'blocking s':>11} {'async s':>8} {'speedup':>8}")
+    for query_count in args.queries:
+        # Distinct texts so neither side is served from the result cache
+        queries = [f"SELECT {i} AS N, SYSTEM$WAIT({args.seconds})" for i in range(query_count)]
+
+        blocking_conn = SnowflakeConnection(conn=FakeConnection({}, latency=args.latency))
+        start = time.perf_counter()
+        for query in queries:
+            blocking_conn.execute_query(query)
+        blocking = time.perf_counter() - start
+
+        async_conn = SnowflakeConnection(conn=FakeConnection({}, latency=args.latency))
+        start = time.perf_counter()
+        results = async_conn.execute_many(queries)
+        concurrent = time.perf_counter() - start
+
+        assert not any(isinstance(result, Exception) for result in results)
+        print(f"{query_count:>8} {blocking:>11.3f} {concurrent:>8.3f} {blocking / concurrent:>7.1f}x")
+
+    fake = FakeConnection(make_tables(1), latency=args.latency)
+    conn = SnowflakeConnection(conn=fake)
+    timeout = args.seconds
+    start = time.perf_counter()
+    try:
+        conn.execute_query(f"SELECT SYSTEM$WAIT({args.seconds * 20})", timeout=timeout)
+    except QueryTimeout:
+        pass
+    print(f"\nQuery of {args.seconds * 20:g}s with a {timeout:g}s timeout returned after "
+          f"{time.perf_counter() - start:.3f}s; cancelled in warehouse: {fake.cancelled_count}")
+
+
+if __name__ == '__main__':
+    main()
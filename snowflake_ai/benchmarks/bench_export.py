@@ -0,0 +1,62 @@
+"""Benchmark the memory an export needs, in-memory CSV vs the chunked spool.
+
+The baseline is what every download button used to do on every rerun,
+``to_csv().encode()``; the spool writes the same frame to disk in slices.
+Peak memory is measured with tracemalloc on top of the source frame.
+
+    python benchmarks/bench_export.py --rows 100000 1000000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import fake_connector  # noqa: F401  (puts src/ on sys.path)
+from utils.export import ResultExporter
+
+
+def make_frame(rows: int) -> pd.DataFrame:
+    ids = np.arange(rows)
+    return pd.DataFrame({
+        'ID': ids,
+        'TS': pd.Timestamp('2024-01-01') + pd.to_timedelta(ids, unit='min'),
+        'AMOUNT': ids * 0.5,
+        'CATEGORY': pd.Categorical([f'category_{i % 13}' for i in ids])
+    })
+
+
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / 1024 / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--chunk-rows', type=int, default=100_000)
+    parser.add_argument('--format', choices=['CSV', 'Parquet'], default='CSV')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        exporter = ResultExporter(spool_dir=spool_dir, chunk_rows=args.chunk_rows)
+        print(f"{'rows':>10} {'in-memory s':>12} {'peak MB':>8} {'spool s':>8} {'peak MB':>8} {'file MB':>8}")
+        for rows in args.rows:
+            df = make_frame(rows)
+            payload, baseline, baseline_peak = measure(lambda: df.to_csv(index=False).encode('utf-8'))
+            del payload
+            path, spooled, spool_peak = measure(lambda: exporter.spool_frame(df, args.format))
+            size = os.path.getsize(path) / 1024 / 1024
+            print(f"{rows:>10} {baseline:>12.2f} {baseline_peak:>8.1f} {spooled:>8.2f} {spool_peak:>8.1f} {size:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
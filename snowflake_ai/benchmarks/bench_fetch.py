@@ -0,0 +1,93 @@
+"""Benchmark result fetching: row tuples vs Arrow vs streamed chunks.
+
+Each mode runs in a fresh interpreter so peak RSS is not polluted by the
+previous run.
+
+    python benchmarks/bench_fetch.py --rows 100000 1000000
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from fake_connector import FakeConnection, synthetic_result
+from core.snowflake import SnowflakeConnection
+
+MODES = ['fetchall', 'arrow', 'stream']
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_mode(mode: str, rows: int, chunk_rows: int) -> dict:
+    import pandas as pd
+
+    fake = FakeConnection({}, latency=0, results={'RESULT': synthetic_result(rows, chunk_rows)})
+    conn = SnowflakeConnection(conn=fake)
+    query = "SELECT * FROM RESULT"
+    baseline_rss = peak_rss_mb()
+
+    start = time.perf_counter()
+    if mode == 'fetchall':
+        # The previous execute_query implementation
+        conn.cursor.execute(query)
+        result = conn.cursor.fetchall()
+        frame = pd.DataFrame(result, columns=[desc[0] for desc in conn.cursor.description])
+        first_row = time.perf_counter() - start
+        total_rows = len(frame)
+    elif mode == 'arrow':
+        frame = conn.execute_query(query)
+        first_row = time.perf_counter() - start
+        total_rows = len(frame)
+    else:
+        first_row = None
+        total_rows = 0
+        for chunk in conn.stream_query(query):
+            if first_row is None:
+                first_row = time.perf_counter() - start
+            total_rows += len(chunk)
+    total = time.perf_counter() - start
+
+    return {
+        'mode': mode,
+        'rows': total_rows,
+        'first_row_s': first_row,
+        'total_s': total,
+        'peak_rss_mb': peak_rss_mb() - baseline_rss
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100000, 1000000])
+    parser.add_argument('--chunk-rows', type=int, default=100000)
+    parser.add_argument('--mode', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.rows[0], args.chunk_rows)))
+        return
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        sys.exit(f"bench_fetch.py needs a working pyarrow (see requirements.txt): {e}")
+
+    print(f"{'rows':>10} {'mode':>9} {'first row s':>12} {'total s':>8} {'peak RSS MB':>12}")
+    for rows in args.rows:
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, __file__, '--mode', mode, '--rows', str(rows),
+                 '--chunk-rows', str(args.chunk_rows)],
+                check=True, capture_output=True, text=True
+            ).stdout
+            result = json.loads(output)
+            print(f"{rows:>10} {mode:>9} {result['first_row_s']:>12.3f} "
+                  f"{result['total_s']:>8.3f} {result['peak_rss_mb']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Benchmark join discovery: all table pairs vs the column inverted index.
+
+Builds a star-like schema where fact tables reference a few dimension
+tables by ``<DIM>_ID`` and every table carries audit columns, then times
+the previous pairwise comparison against core.join_graph.JoinGraph.
+
+    python benchmarks/bench_join_suggestions.py --tables 100 1000 3000
+"""
+import argparse
+import random
+import time
+
+import fake_connector  # noqa: F401  (puts src/ on sys.path)
+from core.join_graph import JoinGraph
+
+AUDIT_COLUMNS = [('CREATED_AT', 'TIMESTAMP_NTZ'), ('UPDATED_AT', 'TIMESTAMP_NTZ'), ('LOAD_ID', 'NUMBER')]
+
+
+def star_schema(table_count: int, dims_per_fact: int = 4, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    dimension_count = max(1, table_count // 5)
+    schema = {}
+    for d in range(dimension_count):
+        key = f'DIM_{d}_ID'
+        columns = [(key, 'NUMBER'), (f'DIM_{d}_NAME', 'VARCHAR')] + AUDIT_COLUMNS
+        schema[f'DIM_{d}'] = _table(columns, [{key: r, f'DIM_{d}_NAME': f'n{r}', 'LOAD_ID': 1} for r in range(5)])
+    for f in range(table_count - dimension_count):
+        dims = rng.sample(range(dimension_count), min(dims_per_fact, dimension_count))
+        columns = [(f'FACT_{f}_ID', 'NUMBER'), ('AMOUNT', 'FLOAT')] + [(f'DIM_{d}_ID', 'NUMBER') for d in dims]
+        rows = [dict({f'FACT_{f}_ID': r, 'AMOUNT': r * 1.5, 'LOAD_ID': 1},
+                     **{f'DIM_{d}_ID': r % 3 for d in dims}) for r in range(5)]
+        schema[f'FACT_{f}'] = _table(columns + AUDIT_COLUMNS, rows)
+    return schema
+
+
+def _table(columns, rows) -> dict:
+    return {
+        'type': 'BASE TABLE',
+        'columns': [{'name': name, 'type': col_type, 'nullable': 'YES'} for name, col_type in columns],
+        'sample_data': rows
+    }
+
+
+def pairwise_joins(schema_info: dict) -> int:
+    """The previous generate_sql_suggestions join loop, kept as the baseline"""
+    suggestions = 0
+    tables = list(schema_info.keys())
+    for i, table1 in enumerate(tables):
+        for table2 in tables[i + 1:]:
+            cols1 = {col['name'].lower(): col for col in schema_info[table1]['columns']}
+            cols2 = {col['name'].lower(): col for col in schema_info[table2]['columns']}
+            suggestions += len(set(cols1.keys()) & set(cols2.keys()))
+    return suggestions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', type=int, nargs='+', default=[100, 1000, 3000])
+    parser.add_argument('--skip-pairwise-above', type=int, default=3000,
+                        help="Skip the quadratic baseline for larger schemas")
+    args = parser.parse_args()
+
+    print(f"{'tables':>8} {'pairwise s':>11} {'joins':>9} {'graph s':>8} {'edges':>7} {'capped cols':>12}")
+    for table_count in args.tables:
+        schema = star_schema(table_count)
+        pairwise_s, joins = float('nan'), '-'
+        if table_count <= args.skip_pairwise_above:
+            start = time.perf_counter()
+            joins = pairwise_joins(schema)
+            pairwise_s = time.perf_counter() - start
+        start = time.perf_counter()
+        graph = JoinGraph(schema)
+        graph_s = time.perf_counter() - start
+        print(f"{table_count:>8} {pairwise_s:>11.2f} {joins:>9} {graph_s:>8.3f} {len(graph.edges):>7} "
+              f"{len(graph.capped_columns):>12}")
+
+
+if __name__ == '__main__':
+    main()
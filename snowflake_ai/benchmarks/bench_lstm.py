@@ -0,0 +1,98 @@
+"""Benchmark LSTM training time against series length.
+
+Compares the previous implementation (list-append windowing, batch_size=1,
+fixed epochs) with MLAnalyzer's vectorized windowing plus mini-batch
+training with early stopping, and with the NumPy autoregressive fallback.
+Windowing alone is timed separately since it needs no TensorFlow.
+
+    python benchmarks/bench_lstm.py --lengths 500 2000 5000
+    python benchmarks/bench_lstm.py --modes windowing numpy   # without TensorFlow
+"""
+import argparse
+import time
+
+import numpy as np
+
+import fake_connector  # noqa: F401  (puts src/ on sys.path)
+from ml.analyzer import MLAnalyzer
+
+MODES = ['windowing', 'legacy', 'keras', 'numpy']
+
+
+def series(length: int) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    t = np.arange(length)
+    return 10 + 0.01 * t + 3 * np.sin(2 * np.pi * t / 30) + rng.normal(scale=0.5, size=length)
+
+
+def loop_windows(data: np.ndarray, look_back: int):
+    # The previous _prepare_lstm_data
+    X, y = [], []
+    for i in range(len(data) - look_back):
+        X.append(data[i:(i + look_back)])
+        y.append(data[i + look_back])
+    return np.array(X).reshape(-1, look_back, 1), np.array(y)
+
+
+def time_windowing(values: np.ndarray, look_back: int) -> str:
+    analyzer = MLAnalyzer()
+    data = values.reshape(-1, 1)
+    start = time.perf_counter()
+    loop_windows(data, look_back)
+    loop_s = time.perf_counter() - start
+    start = time.perf_counter()
+    analyzer._prepare_lstm_data(data, look_back)
+    vector_s = time.perf_counter() - start
+    return f"loop {loop_s * 1000:.1f} ms, strided {vector_s * 1000:.2f} ms"
+
+
+def time_legacy(values: np.ndarray, epochs: int) -> str:
+    from tensorflow.keras.layers import LSTM, Dense
+    from tensorflow.keras.models import Sequential
+
+    start = time.perf_counter()
+    scaled = (values - values.mean()) / values.std()
+    X, y = loop_windows(scaled.reshape(-1, 1), 1)
+    model = Sequential([LSTM(50, input_shape=(1, 1)), Dense(1)])
+    model.compile(optimizer='adam', loss='mse')
+    model.fit(X, y, epochs=epochs, batch_size=1, verbose=0)
+    predictions = model.predict(X, verbose=0).flatten() * values.std() + values.mean()
+    return _report(time.perf_counter() - start, predictions, values[1:])
+
+
+def time_analyzer(values: np.ndarray, look_back: int, epochs: int, min_samples: int) -> str:
+    analyzer = MLAnalyzer(lstm_look_back=look_back, lstm_epochs=epochs, lstm_min_samples=min_samples)
+    start = time.perf_counter()
+    predictions = analyzer._fit_lstm(values)
+    return _report(time.perf_counter() - start, predictions, values[analyzer.look_back:])
+
+
+def _report(seconds: float, predictions: np.ndarray, actual: np.ndarray) -> str:
+    mae = np.abs(predictions - actual).mean()
+    return f"{seconds:.2f} s, MAE {mae:.3f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lengths', type=int, nargs='+', default=[500, 2000, 5000])
+    parser.add_argument('--modes', choices=MODES, nargs='+', default=MODES)
+    parser.add_argument('--look-back', type=int, default=10)
+    parser.add_argument('--epochs', type=int, default=100)
+    args = parser.parse_args()
+
+    for length in args.lengths:
+        values = series(length)
+        for mode in args.modes:
+            if mode == 'windowing':
+                result = time_windowing(values, args.look_back)
+            elif mode == 'legacy':
+                result = time_legacy(values, args.epochs)
+            elif mode == 'keras':
+                result = time_analyzer(values, args.look_back, args.epochs, min_samples=0)
+            else:
+                result = time_analyzer(values, args.look_back, args.epochs, min_samples=length)
+            print(f"{length:>8} {mode:>10}  {result}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark SnowflakeConnection.get_schema_info against the fake connector.
+
+Compares the previous one-query-per-table introspection with the bulk
+columns query plus concurrent sample fetches, for growing table counts.
+
+    python benchmarks/bench_schema_info.py --latency 0.01 --tables 10 50 100 400
+"""
+import argparse
+import time
+
+from fake_connector import FakeConnection, make_tables
+from core.snowflake import SnowflakeConnection
+
+
+def sequential_schema_info(cursor) -> dict:
+    """The original per-table loop, kept here as the baseline"""
+    schema_info = {}
+    cursor.execute("""
+        SELECT table_name, table_type
+        FROM information_schema.tables
+        WHERE table_schema = CURRENT_SCHEMA()
+    """)
+    for obj_name, obj_type in cursor.fetchall():
+        cursor.execute(f"""
+            SELECT column_name, data_type, is_nullable
+            FROM information_schema.columns
+            WHERE table_name = '{obj_name}'
+            AND table_schema = CURRENT_SCHEMA()
+            ORDER BY ordinal_position
+        """)
+        columns = cursor.fetchall()
+        cursor.execute(f"SELECT * FROM {obj_name} LIMIT 5")
+        sample_data = cursor.fetchall()
+        sample_columns = [desc[0] for desc in cursor.description]
+        schema_info[obj_name] = {
+            'type': obj_type,
+            'columns': [{'name': c[0], 'type': c[1], 'nullable': c[2]} for c in columns],
+            'sample_data': [dict(zip(sample_columns, row)) for row in sample_data]
+        }
+    return schema_info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tables', type=int, nargs='+', default=[10, 50, 100, 400])
+    parser.add_argument('--latency', type=float, default=0.01, help="Seconds per round-trip")
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    print(f"{'tables':>8} {'sequential s':>13} {'queries':>8} {'batched s':>10} {'queries':>8} {'speedup':>8}")
+    for table_count in args.tables:
+        tables = make_tables(table_count)
+
+        baseline_conn = FakeConnection(tables, latency=args.latency)
+        start = time.perf_counter()
+        expected = sequential_schema_info(baseline_conn.cursor())
+        baseline = time.perf_counter() - start
+
+        batched_conn = FakeConnection(tables, latency=args.latency)
+        start = time.perf_counter()
+        actual = SnowflakeConnection(conn=batched_conn, max_workers=args.workers).get_schema_info()
+        batched = time.perf_counter() - start
+
+        assert actual == expected, "Batched schema info differs from the sequential result"
+        print(f"{table_count:>8} {baseline:>13.3f} {baseline_conn.query_count:>8} "
+              f"{batched:>10.3f} {batched_conn.query_count:>8} {baseline / batched:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark offline SQL validation and check its verdicts on known cases.
+
+Every case is validated ``--repeat`` times against a small orders/customers
+schema. A case whose verdict differs from the expected one is reported and
+the script exits non-zero, so valid SQL that the validator would throw away
+(e.g. ``FROM`` inside EXTRACT or TRIM arguments) is caught.
+
+    python benchmarks/bench_sql_validator.py --repeat 200
+"""
+import argparse
+import sys
+import time
+
+import fake_connector  # noqa: F401  (puts src/ on sys.path)
+from core.sql_validator import SQLValidator
+
+SCHEMA = {
+    'ORDERS': {'columns': [{'name': name} for name in ('ORDER_ID', 'CUSTOMER_ID', 'ORDER_DATE', 'AMOUNT', 'STATUS')]},
+    'CUSTOMERS': {'columns': [{'name': name} for name in ('CUSTOMER_ID', 'NAME', 'REGION')]}
+}
+
+# (sql, valid)
+CASES = [
+    ("SELECT ORDER_ID, AMOUNT FROM ORDERS", True),
+    ("SELECT EXTRACT(YEAR FROM ORDER_DATE) AS YR, SUM(AMOUNT) FROM ORDERS GROUP BY 1", True),
+    ("SELECT TRIM(BOTH ' ' FROM NAME) FROM CUSTOMERS", True),
+    ("SELECT SUBSTRING(NAME FROM 1 FOR 3) FROM CUSTOMERS", True),
+    ("SELECT POSITION('a' IN NAME) FROM CUSTOMERS", True),
+    ("SELECT COALESCE((SELECT MAX(AMOUNT) FROM ORDERS), 0) AS TOP_AMOUNT FROM CUSTOMERS", True),
+    ("SELECT c.NAME, SUM(o.AMOUNT) FROM CUSTOMERS c JOIN ORDERS o ON c.CUSTOMER_ID = o.CUSTOMER_ID GROUP BY 1", True),
+    ("WITH recent AS (SELECT ORDER_ID FROM ORDERS) SELECT ORDER_ID FROM recent", True),
+    ("SELECT EXTRACT(YEAR FROM SHIPPED_AT) FROM ORDERS", False),
+    ("SELECT * FROM SHIPMENTS", False),
+    ("SELECT c.EMAIL FROM CUSTOMERS c", False),
+    ("SELECT 1; DROP TABLE ORDERS", False),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200, help="Validations per case")
+    args = parser.parse_args()
+
+    validator = SQLValidator(SCHEMA)
+    failures = 0
+    start = time.perf_counter()
+    for sql, valid in CASES:
+        for _ in range(args.repeat):
+            errors = validator.validate(sql)
+        if (not errors) != valid:
+            failures += 1
+            print(f"UNEXPECTED {'rejection' if valid else 'acceptance'}: {sql}\n    {errors}")
+    elapsed = time.perf_counter() - start
+
+    validations = len(CASES) * args.repeat
+    print(f"{validations} validations in {elapsed:.2f}s ({elapsed / validations * 1e6:.0f} us each)")
+    print(f"{len(CASES) - failures}/{len(CASES)} cases as expected")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
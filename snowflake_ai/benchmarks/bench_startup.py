@@ -0,0 +1,122 @@
+"""Benchmark app startup: import time and resident memory per page.
+
+Each scenario runs in a fresh interpreter. It imports ``app`` the way
+``streamlit run`` does, then loads whatever the page needs on first render;
+the ML Analysis scenarios train a model on a small synthetic frame so the
+selected backend is actually imported. ``eager ML stack`` imports every ML
+backend up front, as the app did before the imports were made lazy.
+
+    python benchmarks/bench_startup.py
+"""
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import fake_connector  # noqa: F401  (puts src/ on sys.path)
+
+EAGER_MODULES = [
+    'sklearn.model_selection', 'sklearn.preprocessing', 'sklearn.ensemble', 'sklearn.cluster',
+    'plotly.express', 'plotly.graph_objects', 'statsmodels.api', 'prophet',
+    'statsmodels.tsa.arima.model', 'tensorflow.keras.models', 'tensorflow.keras.layers'
+]
+
+SCENARIOS = {
+    'SQL Generator': [],
+    'SQL Suggestions': [],
+    'AI Suggestions': [],
+    'ML Analysis: Linear Regression': ['Linear Regression'],
+    'ML Analysis: Random Forest': ['Random Forest'],
+    'ML Analysis: K-Means': ['K-Means'],
+    'ML Analysis: ARIMA': ['ARIMA'],
+    'ML Analysis: Prophet': ['Prophet'],
+    'ML Analysis: LSTM': ['LSTM'],
+    'eager ML stack': EAGER_MODULES,
+}
+
+
+def rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def sample_frame():
+    import numpy as np
+    import pandas as pd
+
+    rng = np.random.default_rng(0)
+    n = 120
+    x = rng.normal(size=n)
+    return pd.DataFrame({
+        'DATE': pd.date_range('2020-01-01', periods=n, freq='D'),
+        'X1': x,
+        'X2': rng.normal(size=n),
+        'Y': 2 * x + rng.normal(scale=0.1, size=n),
+    })
+
+
+def first_use(name: str):
+    """What the page loads on its first render, after ``import app``"""
+    if name == 'eager ML stack':
+        import importlib
+        for module in EAGER_MODULES:
+            importlib.import_module(module)
+        return
+    if not name.startswith('ML Analysis'):
+        return
+    from ml.analyzer import MLAnalyzer
+
+    algorithm = SCENARIOS[name][0]
+    analyzer = MLAnalyzer()
+    df = sample_frame()
+    if algorithm in ('ARIMA', 'Prophet', 'LSTM'):
+        # Time-series algorithms take the date column as feature_cols
+        analyzer.train_model(df, algorithm, target_col='Y', feature_cols='DATE')
+    elif algorithm == 'K-Means':
+        analyzer.train_model(df, algorithm, feature_cols=['X1', 'X2'])
+    else:
+        analyzer.train_model(df, algorithm, target_col='Y', feature_cols=['X1'])
+
+
+def run_scenario(name: str) -> dict:
+    baseline = rss_mb()
+    start = time.perf_counter()
+    import app  # noqa: F401
+    import_s = time.perf_counter() - start
+    import_rss = rss_mb()
+    first_use(name)
+    return {
+        'import_s': import_s,
+        'first_use_s': time.perf_counter() - start - import_s,
+        'import_rss_mb': import_rss - baseline,
+        'rss_mb': rss_mb() - baseline
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scenario', choices=list(SCENARIOS), nargs='+', default=list(SCENARIOS))
+    parser.add_argument('--run', choices=list(SCENARIOS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        print(json.dumps(run_scenario(args.run)))
+        return
+
+    print(f"{'page':>32} {'import s':>9} {'import RSS MB':>14} {'first use s':>12} {'RSS MB':>8}")
+    for name in args.scenario:
+        process = subprocess.run([sys.executable, __file__, '--run', name],
+                                 capture_output=True, text=True)
+        if process.returncode != 0:
+            error = process.stderr.strip().splitlines()[-1] if process.stderr.strip() else 'failed'
+            print(f"{name:>32} {error}")
+            continue
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        print(f"{name:>32} {result['import_s']:>9.2f} {result['import_rss_mb']:>14.1f} "
+              f"{result['first_use_s']:>12.2f} {result['rss_mb']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Benchmark perceived SQL generation latency, blocking vs streaming.
+
+Runs QueryGenerator against the local mock OpenAI server and reports when
+the user first sees SQL and when local validation can start.
+
+    python benchmarks/bench_streaming.py --runs 5
+"""
+import argparse
+import statistics
+import time
+
+import openai
+
+from fake_connector import make_tables
+from mock_openai_server import MockOpenAIServer
+from core.openai_client import QueryGenerator
+from core.sql_validator import statement_complete
+
+
+def schema_info() -> dict:
+    return {
+        name: {
+            'type': table['type'],
+            'columns': [{'name': c[0], 'type': c[1], 'nullable': c[2]} for c in table['columns']],
+            'sample_data': []
+        } for name, table in make_tables(20).items()
+    }
+
+
+def blocking_run(generator: QueryGenerator, schema: dict) -> dict:
+    start = time.perf_counter()
+    generator.generate_sql("rows of table 1 with positive col 2", schema)
+    elapsed = time.perf_counter() - start
+    return {'first_token_s': elapsed, 'validation_start_s': elapsed}
+
+
+def streaming_run(generator: QueryGenerator, schema: dict) -> dict:
+    start = time.perf_counter()
+    first_token = None
+    text = ""
+    deltas = generator.stream_sql("rows of table 1 with positive col 2", schema)
+    for delta in deltas:
+        if first_token is None:
+            first_token = time.perf_counter() - start
+        text += delta
+        if statement_complete(text):
+            break
+    deltas.close()
+    return {'first_token_s': first_token, 'validation_start_s': time.perf_counter() - start}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--first-token-delay', type=float, default=0.3)
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(first_token_delay=args.first_token_delay,
+                              token_delay=args.token_delay).start()
+    openai.api_base = server.api_base
+    generator = QueryGenerator()
+    openai.api_key = 'mock'
+    schema = schema_info()
+
+    print(f"{'mode':>10} {'first SQL shown s':>18} {'validation starts s':>20}")
+    for name, run in [('blocking', blocking_run), ('streaming', streaming_run)]:
+        results = [run(generator, schema) for _ in range(args.runs)]
+        print(f"{name:>10} {statistics.median(r['first_token_s'] for r in results):>18.3f} "
+              f"{statistics.median(r['validation_start_s'] for r in results):>20.3f}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,272 @@
+"""In-process stand-in for snowflake.connector used by the benchmarks.
+
+Every ``execute`` sleeps for ``latency`` seconds to model the warehouse
+round-trip, so timings reflect how many round-trips a code path makes and
+how well it overlaps them rather than the speed of a real warehouse.
+
+Queries calling ``SYSTEM$WAIT(n)`` take ``n`` extra seconds. They run in
+the background when submitted with ``execute_async`` and can be stopped
+with ``SYSTEM$CANCEL_QUERY``, as in the real connector.
+"""
+import re
+import sys
+import time
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List
+
+from snowflake.connector.connection import SnowflakeConnection as _SnowflakeConnection
+from snowflake.connector.constants import QueryStatus
+from snowflake.connector.errors import DatabaseError, NotSupportedError
+
+# Make ``core``/``ml``/``utils`` importable the same way ``streamlit run src/app.py`` does
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+def make_tables(table_count: int, column_count: int = 8, row_count: int = 5) -> Dict[str, Dict]:
+    """Build a synthetic schema of ``table_count`` tables"""
+    tables = {}
+    for t in range(table_count):
+        columns = [('ID', 'NUMBER', 'NO')] + [
+            (f'COL_{c}', 'VARCHAR' if c % 2 else 'FLOAT', 'YES')
+            for c in range(1, column_count)
+        ]
+        rows = [
+            tuple([r] + [f'v{r}_{c}' if c % 2 else float(r * c) for c in range(1, column_count)])
+            for r in range(row_count)
+        ]
+        tables[f'TABLE_{t}'] = {'type': 'BASE TABLE', 'columns': columns, 'rows': rows}
+    return tables
+
+
+class ArrowResult:
+    """A result set served as Arrow record batches, like a real SELECT"""
+    def __init__(self, columns: List[str], make_batches: Callable[[], Iterator]):
+        self.columns = columns
+        self.make_batches = make_batches
+
+
+def synthetic_result(row_count: int, batch_rows: int = 100000) -> ArrowResult:
+    """Numeric, timestamp and string columns generated batch by batch"""
+    import numpy as np
+    import pyarrow as pa
+
+    columns = ['ID', 'TS', 'AMOUNT', 'QUANTITY', 'CATEGORY']
+
+    def make_batches():
+        for start in range(0, row_count, batch_rows):
+            ids = np.arange(start, min(start + batch_rows, row_count), dtype=np.int64)
+            yield pa.RecordBatch.from_arrays([
+                pa.array(ids),
+                pa.array(ids * 60_000_000, type=pa.timestamp('us')),
+                pa.array(ids * 0.5),
+                pa.array(ids % 97),
+                pa.array([f'category_{i % 13}' for i in ids])
+            ], names=columns)
+
+    return ArrowResult(columns, make_batches)
+
+
+class FakeCursor:
+    def __init__(self, connection: 'FakeConnection'):
+        self.connection = connection
+        self.description = None
+        self.sfqid = None
+        self._rows: Iterator[tuple] = iter(())
+        self._arrow = None
+
+    def execute(self, query: str, params=None, *args, **kwargs):
+        self.connection._round_trip()
+        self.sfqid = uuid.uuid4().hex
+        if 'SYSTEM$CANCEL_QUERY' in query.upper():
+            self.connection._cancel(params[0])
+            self._set_result(self.connection._describe('STATUS'), [('query cancelled',)])
+            return self
+        time.sleep(self.connection._duration(query))
+        self._set_result(*self.connection._run(query))
+        return self
+
+    def execute_async(self, query: str, *args, **kwargs) -> Dict:
+        self.connection._round_trip()
+        self.sfqid = self.connection._submit(query)
+        return {'queryId': self.sfqid}
+
+    def get_results_from_sfqid(self, sfqid: str):
+        query = self.connection._wait(sfqid)
+        self._set_result(*self.connection._run(query))
+
+    def _set_result(self, description, result):
+        self.description = description
+        if isinstance(result, ArrowResult):
+            self._arrow = result
+            self._rows = self._arrow_rows(result)
+        else:
+            self._arrow = None
+            self._rows = iter(result)
+
+    def fetchall(self) -> List[tuple]:
+        return list(self._rows)
+
+    def fetchmany(self, size: int) -> List[tuple]:
+        return [row for _, row in zip(range(size), self._rows)]
+
+    def fetch_pandas_all(self):
+        if self._arrow is None:
+            raise NotSupportedError
+        import pyarrow as pa
+
+        result, self._arrow = self._arrow, None
+        return pa.Table.from_batches(list(result.make_batches())).to_pandas()
+
+    def fetch_pandas_batches(self):
+        if self._arrow is None:
+            raise NotSupportedError
+        result, self._arrow = self._arrow, None
+        return (batch.to_pandas() for batch in result.make_batches())
+
+    def close(self):
+        self._rows = iter(())
+        self._arrow = None
+
+    @staticmethod
+    def _arrow_rows(result: ArrowResult) -> Iterator[tuple]:
+        # The row path converts every value to a Python object, as the connector does
+        for batch in result.make_batches():
+            yield from zip(*(column.to_pylist() for column in batch.columns))
+
+
+class FakeConnection:
+    def __init__(self, tables: Dict[str, Dict], latency: float = 0.01,
+                 results: Dict[str, ArrowResult] = None):
+        self.tables = tables
+        # Arrow-backed results served for ``SELECT * FROM <name>``
+        self.results = results or {}
+        self.latency = latency
+        self.query_count = 0
+        self.cancelled_count = 0
+        # query ID -> {'query', 'finish_at', 'cancelled'} for asynchronous queries
+        self._async: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def cursor(self) -> FakeCursor:
+        return FakeCursor(self)
+
+    def close(self):
+        pass
+
+    is_still_running = staticmethod(_SnowflakeConnection.is_still_running)
+    is_an_error = staticmethod(_SnowflakeConnection.is_an_error)
+
+    def get_query_status(self, sfqid: str) -> QueryStatus:
+        self._round_trip()
+        with self._lock:
+            entry = self._async.get(sfqid)
+        if entry is None:
+            return QueryStatus.NO_DATA
+        if entry['cancelled']:
+            return QueryStatus.ABORTED
+        if time.monotonic() < entry['finish_at']:
+            return QueryStatus.RUNNING
+        try:
+            self._run(entry['query'])
+        except Exception:
+            return QueryStatus.FAILED_WITH_ERROR
+        return QueryStatus.SUCCESS
+
+    def _submit(self, query: str) -> str:
+        sfqid = uuid.uuid4().hex
+        with self._lock:
+            self._async[sfqid] = {'query': query, 'cancelled': False,
+                                  'finish_at': time.monotonic() + self._duration(query)}
+        return sfqid
+
+    def _cancel(self, sfqid: str):
+        with self._lock:
+            entry = self._async.get(sfqid)
+            if entry is not None and not entry['cancelled'] and time.monotonic() < entry['finish_at']:
+                entry['cancelled'] = True
+                self.cancelled_count += 1
+
+    def _wait(self, sfqid: str) -> str:
+        """Block until an asynchronous query finishes; returns its text"""
+        with self._lock:
+            entry = self._async[sfqid]
+        time.sleep(max(0.0, entry['finish_at'] - time.monotonic()))
+        if entry['cancelled']:
+            raise DatabaseError(f"Status of query '{sfqid}' is ABORTED, results are unavailable")
+        return entry['query']
+
+    @staticmethod
+    def _duration(query: str) -> float:
+        match = re.search(r'SYSTEM\$WAIT\((\d+(?:\.\d+)?)', query, re.IGNORECASE)
+        return float(match.group(1)) if match else 0.0
+
+    def _round_trip(self):
+        with self._lock:
+            self.query_count += 1
+        time.sleep(self.latency)
+
+    def _run(self, query: str):
+        normalized = ' '.join(query.split()).upper()
+        if normalized.startswith('EXPLAIN'):
+            return self._explain(normalized)
+        if 'SYSTEM$WAIT' in normalized:
+            return self._describe('SYSTEM$WAIT'), [(f'waited {self._duration(query):g} seconds',)]
+        selected = self._selected_tables(normalized)
+        if 'HASH_AGG' in normalized:
+            return self._describe('TABLE_NAME', 'TABLE_TYPE', 'LAST_ALTERED', 'COLUMNS', 'HASH'), [
+                (name, table['type'], table.get('last_altered', '2024-01-01'),
+                 len(table['columns']), hash(tuple(col[:2] for col in table['columns'])))
+                for name, table in self.tables.items()
+            ]
+        if 'FROM INFORMATION_SCHEMA.TABLES' in normalized:
+            return self._describe('TABLE_NAME', 'TABLE_TYPE'), [
+                (name, table['type']) for name, table in self.tables.items() if name in selected
+            ]
+        if 'FROM INFORMATION_SCHEMA.COLUMNS' in normalized:
+            match = re.search(r"TABLE_NAME = '([^']+)'", normalized)
+            names = [match.group(1)] if match else sorted(selected)
+            rows = []
+            for name in names:
+                for col in self.tables.get(name, {}).get('columns', []):
+                    rows.append(col if match else (name,) + col)
+            header = ['COLUMN_NAME', 'DATA_TYPE', 'IS_NULLABLE']
+            return self._describe(*(header if match else ['TABLE_NAME'] + header)), rows
+        match = re.match(r'SELECT \* FROM (\w+)(?: LIMIT (\d+))?', normalized)
+        if match and match.group(1) in self.results:
+            result = self.results[match.group(1)]
+            return self._describe(*result.columns), result
+        if match and match.group(1) in self.tables:
+            table = self.tables[match.group(1)]
+            limit = int(match.group(2)) if match.group(2) else None
+            return self._describe(*[col[0] for col in table['columns']]), table['rows'][:limit]
+        raise Exception(f"Fake connector cannot run query: {query}")
+
+    def _explain(self, normalized: str):
+        """A GlobalStats-only tabular plan; fails for tables the schema does not have"""
+        referenced = set(re.findall(r'\b(?:FROM|JOIN) (\w+)', normalized))
+        missing = sorted(name for name in referenced if name not in self.tables)
+        if missing:
+            raise Exception(f"Object '{missing[0]}' does not exist or not authorized.")
+        partitions = len(referenced)
+        size = sum(len(self.tables[name]['rows']) * len(self.tables[name]['columns']) * 8
+                   for name in referenced)
+        header = ['step', 'id', 'parent', 'operation', 'objects', 'alias', 'expressions',
+                  'partitionsTotal', 'partitionsAssigned', 'bytesAssigned']
+        return self._describe(*header), [
+            (None, None, None, 'GlobalStats', None, None, None, partitions, partitions, size)
+        ]
+
+    def _selected_tables(self, normalized: str) -> List[str]:
+        match = re.search(r"TABLE_NAME IN \(([^)]*)\)", normalized)
+        if not match:
+            return list(self.tables)
+        return re.findall(r"'([^']+)'", match.group(1))
+
+    @staticmethod
+    def _describe(*names):
+        # Mirrors the (name, type_code, ...) tuples of a DB-API description
+        return [(name, None, None, None, None, None, None) for name in names]
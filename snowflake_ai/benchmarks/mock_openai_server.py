@@ -0,0 +1,118 @@
+"""Local stand-in for the OpenAI chat completions endpoint.
+
+Answers ``POST /v1/chat/completions`` with a canned SQL reply, either as a
+single JSON body or, with ``"stream": true``, as server-sent events that
+emit one token every ``--token-delay`` seconds. Point the app at it with
+
+    python benchmarks/mock_openai_server.py --port 8765
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 OPENAI_API_KEY=mock streamlit run src/app.py
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_REPLY = "```sql\nSELECT ID, COL_1, COL_2\nFROM TABLE_1\nWHERE COL_2 > 0\nORDER BY ID;\n```\nThis query selects rows."
+
+
+def tokenize(text: str):
+    # Word-ish pieces with their trailing whitespace, close to how the API chunks deltas
+    return re.findall(r'\S+\s*|\s+', text)
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), reply: str = DEFAULT_REPLY,
+                 first_token_delay: float = 0.3, token_delay: float = 0.02):
+        super().__init__(address, _Handler)
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.token_delay = token_delay
+        self.requests = 0
+
+    @property
+    def api_base(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'MockOpenAIServer':
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        if not self.path.endswith('/chat/completions'):
+            self.send_error(404)
+            return
+        body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        self.server.requests += 1
+        model = body.get('model', 'gpt-3.5-turbo')
+        time.sleep(self.server.first_token_delay)
+
+        if not body.get('stream'):
+            # A blocking call waits for the whole completion
+            time.sleep(self.server.token_delay * len(tokenize(self.server.reply)))
+            self._send_json({
+                'id': 'chatcmpl-mock', 'object': 'chat.completion', 'created': int(time.time()),
+                'model': model,
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': self.server.reply}}],
+                'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0}
+            })
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        try:
+            self._send_event(model, {'role': 'assistant'})
+            for token in tokenize(self.server.reply):
+                self._send_event(model, {'content': token})
+                time.sleep(self.server.token_delay)
+            self._send_event(model, {}, finish_reason='stop')
+            self.wfile.write(b'data: [DONE]\n\n')
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading once the statement was complete
+            pass
+
+    def _send_json(self, payload: dict):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_event(self, model: str, delta: dict, finish_reason=None):
+        chunk = {
+            'id': 'chatcmpl-mock', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+            'model': model,
+            'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}]
+        }
+        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--first-token-delay', type=float, default=0.3)
+    parser.add_argument('--token-delay', type=float, default=0.02)
+    args = parser.parse_args()
+    server = MockOpenAIServer(('127.0.0.1', args.port), first_token_delay=args.first_token_delay,
+                              token_delay=args.token_delay)
+    print(f"Mock OpenAI API listening on {server.api_base}")
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
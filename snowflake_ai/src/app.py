@@ -1,50 +1,107 @@
 from pages.sql_suggestions import render_sql_suggestions_page
+from pages.latency_dashboard import render_latency_dashboard_page
 import streamlit as st
 from core.snowflake import SnowflakeConnection
+from core.connection_pool import get_pool
+from utils.result_cache import get_result_cache
+from utils.nl_sql_cache import get_nl_sql_cache
 from core.openai_client import QueryGenerator   
+from core.sql_engine import SQLGenerationEngine
+from core.sql_validator import is_valid_sql
+from core.pushdown import TIME_GRAINS, PushdownBuilder
 import pandas as pd
 from dotenv import load_dotenv
 import sqlparse
 import traceback
 import streamlit.components.v1 as components
-from ml.analyzer import MLAnalyzer
 from ml.suggestions import MLSuggestionEngine
+from utils.export import export_buttons
+from utils.session import current_session_id, load_schema_info, run_scheduled_rerun, schedule_rerun
+from utils.tracing import set_page, span
 
 
 load_dotenv()
 
+# Parallel SQL candidates per round, and rounds before giving up
+GENERATION_CANDIDATES = 3
+GENERATION_ROUNDS = 3
+
+# Tables and approximate prompt tokens of schema context sent with each generation
+SCHEMA_TOP_K = 8
+SCHEMA_TOKEN_BUDGET = 3000
+
+# Caps on rows/bytes pulled into the session by "Execute Query"
+RESULT_ROW_CAP = 500_000
+RESULT_BYTE_CAP = 512 * 1024 * 1024
+
+# Rows drawn by the warehouse for suggestions that need raw points, and the default resampling grain
+PUSHDOWN_SAMPLE_ROWS = 10_000
+DEFAULT_TIME_GRAIN = 'DAY'
+
+# How often the ML Analysis page refreshes while background jobs are running
+ANALYSIS_POLL_SECONDS = 1.0
+
 def init_session_state():
     if 'history' not in st.session_state:
         st.session_state.history = []
     if 'schema_info' not in st.session_state:
         st.session_state.schema_info = None
+    if 'schema_fingerprint' not in st.session_state:
+        st.session_state.schema_fingerprint = None
+    if 'schema_structure' not in st.session_state:
+        st.session_state.schema_structure = None
     if 'generated_sql' not in st.session_state:
         st.session_state.generated_sql = None
     if 'query_results' not in st.session_state:
         st.session_state.query_results = None
-
-def is_valid_sql(query: str) -> bool:
-    # Basic SQL validation
-    if not query or len(query.strip()) == 0:
-        return False
-    
-    # Check for basic SQL structure
-    valid_starts = ['SELECT', 'WITH']
-    return any(query.strip().upper().startswith(start) for start in valid_starts)
+    if 'ml_jobs' not in st.session_state:
+        st.session_state.ml_jobs = []
+    if 'ml_job_outcomes' not in st.session_state:
+        # job_id -> (status, result) of finished jobs, so reruns do not unpickle them again
+        st.session_state.ml_job_outcomes = {}
+    if 'ml_cached_result' not in st.session_state:
+        st.session_state.ml_cached_result = None
 
 def main():
     init_session_state()
     st.sidebar.title("Navigation")
-    page = st.sidebar.selectbox("Choose a page", ["SQL Generator", "ML Analysis", "AI Analysis Suggestions", "SQL Suggestions"])
+    page = st.sidebar.selectbox("Choose a page", ["SQL Generator", "ML Analysis", "AI Analysis Suggestions",
+                                                  "SQL Suggestions", "Latency Dashboard"])
+    # Every span recorded during this run is attributed to the selected page
+    set_page(page)
+    if st.sidebar.button("Refresh schema"):
+        # The next load re-introspects only tables whose fingerprint changed
+        st.session_state.schema_info = None
+    with st.sidebar.expander("Connection pool"):
+        pool_stats = get_pool().stats()
+        st.write(f"In use: {pool_stats['in_use']} / {pool_stats['max_size']}, idle: {pool_stats['idle']}")
+        st.write(f"Handshakes: {pool_stats['handshakes']}, avoided: {pool_stats['handshakes_avoided']}")
+        st.write(f"Pool waits: {pool_stats['waits']} ({pool_stats['wait_seconds']:.2f}s total, "
+                 f"{pool_stats['max_wait_seconds']:.2f}s max)")
+    with st.sidebar.expander("Query result cache"):
+        cache_stats = get_result_cache().stats()
+        st.write(f"Hit rate: {cache_stats['hit_rate']:.0%} "
+                 f"({cache_stats['memory_hits']} memory, {cache_stats['disk_hits']} disk, "
+                 f"{cache_stats['misses']} misses)")
+        st.write(f"In memory: {cache_stats['memory_entries']} results, "
+                 f"{cache_stats['memory_bytes'] / 1024 / 1024:.1f} MB")
+    with st.sidebar.expander("Prompt to SQL cache"):
+        sql_cache_stats = get_nl_sql_cache().stats()
+        st.write(f"Hit rate: {sql_cache_stats['hit_rate']:.0%} "
+                 f"({sql_cache_stats['exact_hits']} exact, {sql_cache_stats['semantic_hits']} similar, "
+                 f"{sql_cache_stats['misses']} misses)")
 
-    if page == "SQL Generator":
-        show_sql_generator()
-    elif page == "ML Analysis":
-        show_ml_analysis()
-    elif page == "SQL Suggestions":
-        render_sql_suggestions_page()
-    else:
-        show_ai_suggestions()
+    with span('page.render'):
+        if page == "SQL Generator":
+            show_sql_generator()
+        elif page == "ML Analysis":
+            show_ml_analysis()
+        elif page == "SQL Suggestions":
+            render_sql_suggestions_page()
+        elif page == "Latency Dashboard":
+            render_latency_dashboard_page()
+        else:
+            show_ai_suggestions()
 
     # Add ML suggestions after query execution
     if st.session_state.get('query_results') is not None:
@@ -69,6 +126,9 @@ def main():
         else:
             st.info("No ML suggestions available for current data")
 
+    # Pages that poll background work asked for a rerun; wait for it now that rendering is done
+    run_scheduled_rerun()
+
 def show_sql_generator():
     st.title("SQL Query Generator")
     
@@ -79,12 +139,10 @@ def show_sql_generator():
         st.session_state.query_results = None
 
     try:
-        snowflake_conn = SnowflakeConnection()
+        snowflake_conn = SnowflakeConnection(session_id=current_session_id())
         
-        # Get schema info if not cached
-        if not st.session_state.schema_info:
-            with st.spinner("Loading schema information..."):
-                st.session_state.schema_info = snowflake_conn.get_schema_info()
+        # Get schema info through the fingerprint-validated cache
+        load_schema_info(snowflake_conn)
         
         # Show schema information
         with st.expander("Available Tables/Views"):
@@ -103,49 +161,52 @@ def show_sql_generator():
             help="Example: Show me treasury yields above 5% in the last quarter"
         )
 
+        use_sql_cache = st.checkbox("Reuse SQL from similar earlier questions", value=True)
+
         if st.button("Generate Query") and prompt:
-            result=None
-            countr=0
             st.session_state.generated_sql = None
             st.session_state.query_results = None
             try:
                 with st.spinner("Generating query..."):
-                    while result is None:
-                        countr+=1
-                        if countr>10:
+                    sql_cache = get_nl_sql_cache()
+                    # Keyed on table/column structure so data loads do not empty the cache
+                    cached = sql_cache.lookup(prompt, st.session_state.schema_structure) if use_sql_cache else None
+                    if cached is not None:
+                        generated_sql, match = cached
+                        st.info(f"Reused SQL from an {match} match of an earlier question")
+                    else:
+                        # Candidates plus this page's own connection use at most half the shared
+                        # pool, so another session can still check connections out
+                        engine = SQLGenerationEngine(
+                            connection_factory=SnowflakeConnection,
+                            query_generator=QueryGenerator(top_k=SCHEMA_TOP_K, token_budget=SCHEMA_TOKEN_BUDGET),
+                            candidates=GENERATION_CANDIDATES,
+                            max_rounds=GENERATION_ROUNDS,
+                            schema_fingerprint=st.session_state.schema_fingerprint,
+                            max_connections=max(1, get_pool().max_size // 2 - 1),
+                            session_id=current_session_id()
+                        )
+                        live_sql = st.empty()
+                        generated_sql = engine.generate(
+                            prompt,
+                            st.session_state.schema_info,
+                            on_token=lambda text: live_sql.code(QueryGenerator.clean_sql(text), language='sql')
+                        )
+                        live_sql.empty()
+                        for attempt in engine.attempts:
+                            reason = f" ({attempt['error']})" if attempt['error'] else ""
+                            st.write(f"Attempt {attempt['round']}.{attempt['candidate']}: {attempt['status']}{reason}")
+                        if generated_sql is None:
                             st.error("Failed to generate query")
-                            st.session_state.generated_sql = None
-                            st.session_state.query_results = None
-                            generated_sql = None
-                            break
-                        st.write(f"Attempt {countr}")
-                        query_gen = QueryGenerator()
-                        generated_sql = query_gen.generate_sql(prompt, st.session_state.schema_info)
-                        generated_sql=generated_sql.replace('```sql', '').replace('```', '').strip()
-                        #st.write("Generated SQL: ", generated_sql)
-                        generated_sql_limit = query_gen._add_limit_clause(generated_sql)
-                        #st.write("Generated SQL limit: ", generated_sql_limit)
-                        sqlparse.format(generated_sql_limit, reindent=True, keyword_case='upper')
-                        try:
-                            print("Executing generated SQL")
-                            result = snowflake_conn.execute_query(generated_sql_limit)
-                            if not result.empty and result.shape[0]>0:
-                                print("adding querry to session state")
-                                st.session_state.generated_sql = generated_sql
-
-                            else:
-                               # result = None
-                                continue
-                                
-                        except Exception as e:
-                            continue
-                        
-                    #generated_sql = sqlparse.format(generated_sql, reindent=True, keyword_case='upper').strip()
-                    
-                    
+                        else:
+                            # The engine only returns SQL whose validation query returned rows
+                            sql_cache.put(prompt, st.session_state.schema_structure, generated_sql)
+                    st.session_state.generated_sql = generated_sql
+
                 # Show generated SQL
-                st.subheader("Generated SQL")
-                st.code(generated_sql, language='sql')
+                if generated_sql:
+                    st.subheader("Generated SQL")
+                    st.code(generated_sql, language='sql')
                 
             except Exception as e:
                 st.error(f"Failed to generate query: {str(e)}")
@@ -160,25 +221,36 @@ def show_sql_generator():
             if execute_button:
                 try:
                     with st.spinner("Executing query..."):
-                        results = None
-                        results = snowflake_conn.execute_query(st.session_state.generated_sql)
-                        st.session_state.query_results = results
-                        
                         st.subheader("Query Results")
-                        st.dataframe(results)
-                        
-                        # Add download button
-                        if not results.empty:
-                            csv = results.to_csv(index=False).encode('utf-8')
-                            st.download_button(
-                                "Download Results",
-                                csv,
-                                "query_results.csv",
-                                "text/csv"
-                            )
+                        results_placeholder = st.empty()
+                        chunks = []
+                        # Render the first chunk right away while the rest streams in
+                        for chunk in snowflake_conn.stream_query(
+                            st.session_state.generated_sql,
+                            max_rows=RESULT_ROW_CAP,
+                            max_bytes=RESULT_BYTE_CAP
+                        ):
+                            if not chunks:
+                                results_placeholder.dataframe(chunk)
+                            chunks.append(chunk)
+                        results = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+                        st.session_state.query_results = results
+                        results_placeholder.dataframe(results)
+                        # Remember capped SQL so its export can re-stream the full result
+                        st.session_state.capped_sql = st.session_state.generated_sql if snowflake_conn.truncated else None
+                        if snowflake_conn.truncated:
+                            st.warning(f"Showing the first {len(results):,} rows; the result was capped.")
                 except Exception as e:
                     st.error(f"Query execution failed: {str(e)}")
 
+            # Export on request only; a capped result is re-streamed in full from the warehouse
+            results = st.session_state.query_results
+            if results is not None and not results.empty:
+                truncated = st.session_state.get('capped_sql') == st.session_state.generated_sql
+                export_buttons(results, "query_results", "sql_generator",
+                               query=st.session_state.generated_sql if truncated else None,
+                               snowflake_conn=snowflake_conn if truncated else None)
+
     except Exception as e:
         st.error(f"Connection error: {str(e)}")
     finally:
@@ -194,6 +266,10 @@ def show_ml_analysis():
     
     df = st.session_state.query_results
     
+    # Imported here so the other pages never load the ML stack
+    from ml.analyzer import MLAnalyzer, run_analysis
+    from ml.jobs import get_job_runner
+
     # Initialize analyzers
     suggestion_engine = MLSuggestionEngine()
     analyzer = MLAnalyzer()
@@ -230,45 +306,132 @@ def show_ml_analysis():
                     default=details['suggested_columns'][:2]
                 )
             
+            if selected_algo == 'LSTM':
+                analyzer.lstm_look_back = st.number_input(
+                    "Look-back window (observations)", min_value=1, max_value=365, value=analyzer.lstm_look_back
+                )
+
+            if selected_algo in ('Random Forest', 'K-Means'):
+                analyzer.fast_mode = st.checkbox(
+                    "Fast mode (parallel, sampling and mini-batches; approximate)",
+                    value=len(df) > analyzer.sample_size,
+                    help="Trains on a stratified sample of large results and picks k automatically for K-Means"
+                )
+
             if st.button("Run Analysis"):
-                with st.spinner("Analyzing data..."):
-                    try:
-                        # Train model
-                        result = analyzer.train_model(
-                            df=df,
-                            algorithm=selected_algo,
-                            target_col=selected_columns['value'] if isinstance(selected_columns, dict) else selected_columns[0],
-                            feature_cols=selected_columns['time'] if isinstance(selected_columns, dict) else selected_columns[1:]
-                        )
-                        
-                        # Plot results
-                        fig = analyzer.plot_results(
-                            df=df,
-                            algorithm=selected_algo,
-                            target_col=selected_columns['value'] if isinstance(selected_columns, dict) else selected_columns[0],
-                            feature_cols=selected_columns['time'] if isinstance(selected_columns, dict) else selected_columns[1:]
+                target_col = selected_columns['value'] if isinstance(selected_columns, dict) else selected_columns[0]
+                feature_cols = selected_columns['time'] if isinstance(selected_columns, dict) else selected_columns[1:]
+                analyzer_options = {'lstm_look_back': analyzer.lstm_look_back, 'fast_mode': analyzer.fast_mode}
+                label = f"{selected_algo}: {target_col}"
+                try:
+                    restored = analyzer.restore(df, selected_algo, target_col, feature_cols)
+                    if restored is not None:
+                        # Same data and settings as an earlier run: only re-plot
+                        result = restored['result']
+                        st.session_state.ml_cached_result = {
+                            'label': label,
+                            'score': result if isinstance(result, float) else None,
+                            'figure': analyzer.plot_results(df, selected_algo, target_col=target_col,
+                                                            feature_cols=feature_cols),
+                            'tradeoff': analyzer.tradeoff
+                        }
+                    else:
+                        st.session_state.ml_cached_result = None
+                        # Train in a worker process so the page stays responsive across reruns
+                        job_id = get_job_runner().submit(
+                            run_analysis, df, selected_algo, target_col, feature_cols,
+                            label=label, **analyzer_options
                         )
-                        
-                        # Display results
-                        if isinstance(result, float):
-                            st.write(f"Model Score: {result:.4f}")
-                        
-                        st.plotly_chart(fig)
-                        
-                    except Exception as e:
-                        st.error(f"Analysis failed: {str(e)}")
-                        st.error(traceback.format_exc())
+                        st.session_state.ml_jobs.insert(0, job_id)
+                except Exception as e:
+                    st.error(f"Analysis failed: {str(e)}")
+
+    cached_result = st.session_state.ml_cached_result
+    if cached_result is not None:
+        st.subheader(cached_result['label'])
+        st.caption("Loaded the previously trained model")
+        if cached_result['score'] is not None:
+            st.write(f"Model Score: {cached_result['score']:.4f}")
+        show_tradeoff(cached_result['tradeoff'])
+        st.plotly_chart(cached_result['figure'])
+
+    show_analysis_jobs()
+
+def show_tradeoff(tradeoff):
+    """Explain what fast mode gave up for speed"""
+    if not tradeoff:
+        return
+    message = f"Fast mode: trained on {tradeoff['rows_used']:,} of {tradeoff['rows_total']:,} rows."
+    if 'estimated_score_loss' in tradeoff:
+        message += (f" Halving the sample lowered the test score by {tradeoff['estimated_score_loss']:.4f},"
+                    f" so the full data would likely gain at most about that much.")
+    if 'inertia_increase' in tradeoff:
+        message += (f" Chose k={tradeoff['k']} by silhouette score; mini-batch clustering is"
+                    f" {tradeoff['inertia_increase']:.1%} less compact than full K-Means on the sample.")
+    st.info(message)
+
+def show_analysis_jobs():
+    """Progress, results and cancel buttons for this session's analysis jobs"""
+    if not st.session_state.ml_jobs:
+        return
+    from ml.jobs import get_job_runner
+    from ml.model_store import get_model_store
+
+    runner = get_job_runner()
+    outcomes = st.session_state.ml_job_outcomes
+    st.subheader("Analyses")
+    running = False
+    for job_id in list(st.session_state.ml_jobs):
+        if job_id in outcomes:
+            job, result = outcomes[job_id]
+        else:
+            job = runner.status(job_id)
+            result = None
+            if job['status'] == 'done':
+                result = runner.result(job_id)
+                if result.get('model_key'):
+                    # Restore this analysis from memory next time instead of unpickling it
+                    get_model_store().remember(result['model_key'], result['model_entry'])
+            if job['status'] in ('done', 'failed', 'cancelled'):
+                outcomes[job_id] = (job, result)
+        with st.expander(f"{job['label'] or job_id} ({job['status']})", expanded=job['status'] != 'cancelled'):
+            if job['status'] in ('queued', 'running'):
+                running = True
+                st.progress(job['fraction'], text=job['message'] or job['status'].capitalize())
+                # A single Prophet, ARIMA or K-Means fit step cannot be interrupted
+                if st.button("Cancel", key=f"cancel_{job_id}",
+                             help="Training stops at its next checkpoint: after the current epoch (LSTM), "
+                                  "batch of trees (Random Forest) or fit step (Prophet, ARIMA, K-Means)"):
+                    runner.cancel(job_id)
+            elif job['status'] == 'done':
+                if result['score'] is not None:
+                    st.write(f"Model Score: {result['score']:.4f}")
+                show_tradeoff(result.get('tradeoff'))
+                st.plotly_chart(result['figure'])
+                if job['elapsed'] is not None:
+                    st.caption(f"Finished in {job['elapsed']:.1f}s")
+            elif job['status'] == 'failed':
+                st.error(f"Analysis failed: {job['error'].splitlines()[0] if job['error'] else 'unknown error'}")
+            else:
+                st.info("Analysis cancelled" if job['status'] == 'cancelled' else "Result no longer available")
+            if job['status'] not in ('queued', 'running') and st.button("Remove", key=f"remove_{job_id}"):
+                runner.forget(job_id)
+                st.session_state.ml_jobs.remove(job_id)
+                outcomes.pop(job_id, None)
+                st.experimental_rerun()
+
+    if running:
+        # Poll until every job of this session has finished
+        schedule_rerun(ANALYSIS_POLL_SECONDS)
 
 def show_ai_suggestions():
     st.title("AI Analysis Suggestions")
     
     try:
-        snowflake_conn = SnowflakeConnection()
+        snowflake_conn = SnowflakeConnection(session_id=current_session_id())
         
-        # Get schema info if not cached
-        if not st.session_state.get('schema_info'):
-            with st.spinner("Loading schema information..."):
-                st.session_state.schema_info = snowflake_conn.get_schema_info()
+        # Get schema info through the fingerprint-validated cache
+        load_schema_info(snowflake_conn)
         
         suggestion_engine = MLSuggestionEngine()
         
@@ -276,6 +439,15 @@ def show_ai_suggestions():
             with st.expander(f"Analysis Suggestions for {table_name}", expanded=True):
                 # Create sample dataframe from schema info
                 df = pd.DataFrame(details['sample_data'])
+                pushdown = PushdownBuilder(table_name, details['columns'])
+                if st.button("Summarize full table", key=f"summary_btn_{table_idx}_{table_name}"):
+                    try:
+                        summary = snowflake_conn.execute_query(
+                            pushdown.summary([col['name'] for col in details['columns']])
+                        )
+                        st.dataframe(PushdownBuilder.summary_frame(summary))
+                    except Exception as e:
+                        st.error(f"Query execution failed: {str(e)}")
                 if not df.empty:
                     suggestions = suggestion_engine.analyze_data(df)
                     
@@ -288,25 +460,20 @@ def show_ai_suggestions():
                                 for algo in analysis_details['algorithms']:
                                     st.write(f"- {algo}")
                                 
-                                # Generate and show sample query
+                                # Aggregate or sample in the warehouse so only a compact frame comes back
                                 if isinstance(analysis_details['suggested_columns'], dict):
                                     time_cols = analysis_details['suggested_columns']['time_columns']
                                     value_cols = analysis_details['suggested_columns']['value_columns']
-                                    sample_query = f"""
-                                        SELECT 
-                                            {', '.join(time_cols)},
-                                            {', '.join(value_cols)}
-                                        FROM {table_name}
-                                        ORDER BY {time_cols[0]}
-                                        LIMIT 1000
-                                    """
+                                    grain = DEFAULT_TIME_GRAIN
+                                    if pushdown.is_temporal(time_cols[0]):
+                                        grain = st.selectbox(
+                                            "Resample to", TIME_GRAINS, index=TIME_GRAINS.index(DEFAULT_TIME_GRAIN),
+                                            key=f"grain_{table_idx}_{analysis_idx}_{table_name}"
+                                        )
+                                    sample_query = pushdown.time_series(time_cols[0], value_cols, grain=grain)
                                 else:
                                     cols = analysis_details['suggested_columns']
-                                    sample_query = f"""
-                                        SELECT {', '.join(cols)}
-                                        FROM {table_name}
-                                        LIMIT 1000
-                                    """
+                                    sample_query = pushdown.sample(cols, rows=PUSHDOWN_SAMPLE_ROWS)
                                 
                                 st.write("**Suggested Query:**")
                                 st.code(sample_query.strip(), language='sql')
@@ -322,19 +489,18 @@ def show_ai_suggestions():
                                         # Cache results for ML analysis
                                         st.session_state.query_results = results
                                         st.session_state.generated_sql = sample_query
-                                        
-                                        # Add download button with unique key
-                                        if not results.empty:
-                                            csv = results.to_csv(index=False).encode('utf-8')
-                                            st.download_button(
-                                                "Download Results",
-                                                csv,
-                                                f"{table_name}_{analysis_type.lower()}_results.csv",
-                                                "text/csv",
-                                                key=f"download_btn_{table_idx}_{analysis_idx}_{table_name}_{analysis_type}"
-                                            )
                                     except Exception as e:
                                         st.error(f"Query execution failed: {str(e)}")
+
+                                # Export the results of this query while they are the session's current ones
+                                results = st.session_state.query_results
+                                if (st.session_state.generated_sql == sample_query
+                                        and results is not None and not results.empty):
+                                    export_buttons(
+                                        results,
+                                        f"{table_name}_{analysis_type.lower()}_results",
+                                        f"download_btn_{table_idx}_{analysis_idx}_{table_name}_{analysis_type}"
+                                    )
                                 
                                 st.write("**Relevant Columns:**")
                                 if isinstance(analysis_details['suggested_columns'], dict):
@@ -0,0 +1,223 @@
+import snowflake.connector
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+def connect_from_env():
+    """Open a new Snowflake connection from the SNOWFLAKE_* environment variables"""
+    return snowflake.connector.connect(
+        user=os.getenv('SNOWFLAKE_USER'),
+        password=os.getenv('SNOWFLAKE_PASSWORD'),
+        account=os.getenv('SNOWFLAKE_ACCOUNT'),
+        warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
+        database=os.getenv('SNOWFLAKE_DATABASE'),
+        schema=os.getenv('SNOWFLAKE_SCHEMA', 'PUBLIC')
+    )
+
+class _PoolEntry:
+    def __init__(self, conn):
+        self.conn = conn
+        self.last_used = time.monotonic()
+        self.last_checked = self.last_used
+        self.owner = None
+
+class ConnectionPool:
+    """Bounded pool of warehouse connections shared by every Streamlit session.
+
+    Connections are health-checked on checkout when they have been idle for
+    longer than ``health_check_interval`` and closed once idle for longer
+    than ``idle_timeout``. ``acquire`` blocks while ``max_size`` connections
+    are checked out.
+    """
+    def __init__(self, connect: Callable = connect_from_env, max_size: int = 4,
+                 idle_timeout: float = 600, health_check_interval: float = 60,
+                 acquire_timeout: float = 30):
+        self.connect = connect
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.acquire_timeout = acquire_timeout
+        self._idle: List[_PoolEntry] = []
+        self._in_use: Dict[int, _PoolEntry] = {}
+        self._lock = threading.Condition()
+        self._metrics = {
+            'handshakes': 0,
+            'handshakes_avoided': 0,
+            'waits': 0,
+            'wait_seconds': 0.0,
+            'max_wait_seconds': 0.0,
+            'health_check_failures': 0,
+            'idle_evictions': 0
+        }
+
+    def acquire(self, owner: Optional[str] = None):
+        """Check out a connection, preferring the one last used by ``owner``"""
+        start = time.monotonic()
+        waited = False
+        while True:
+            timed_out = False
+            placeholder = None
+            with self._lock:
+                expired = self._evict_idle()
+                entry = self._take_idle(owner)
+                if entry is not None:
+                    # Checked out before the health check, so the slot stays taken while it runs
+                    self._checkout(entry, owner)
+                elif len(self._in_use) < self.max_size:
+                    # Reserve the slot before the handshake so concurrent callers respect max_size
+                    placeholder = _PoolEntry(None)
+                    self._in_use[id(placeholder)] = placeholder
+                else:
+                    waited = True
+                    remaining = self.acquire_timeout - (time.monotonic() - start)
+                    timed_out = remaining <= 0 or not self._lock.wait(remaining)
+
+            # Closing and health checks are network calls; they never run under the pool lock
+            for stale in expired:
+                self._close(stale)
+            if timed_out:
+                raise Exception(
+                    f"Timed out after {self.acquire_timeout}s waiting for a Snowflake connection"
+                )
+            if placeholder is not None:
+                break
+            if entry is None:
+                continue
+
+            if self._is_healthy(entry):
+                with self._lock:
+                    self._metrics['handshakes_avoided'] += 1
+                    if waited:
+                        self._record_wait(time.monotonic() - start)
+                return entry.conn
+
+            with self._lock:
+                self._in_use.pop(id(entry.conn), None)
+                self._metrics['health_check_failures'] += 1
+                self._lock.notify()
+            self._close(entry)
+
+        if waited:
+            with self._lock:
+                self._record_wait(time.monotonic() - start)
+
+        try:
+            conn = self.connect()
+        except Exception:
+            with self._lock:
+                del self._in_use[id(placeholder)]
+                self._lock.notify()
+            raise
+
+        with self._lock:
+            del self._in_use[id(placeholder)]
+            entry = _PoolEntry(conn)
+            self._metrics['handshakes'] += 1
+            self._checkout(entry, owner)
+        return conn
+
+    def release(self, conn, discard: bool = False):
+        """Return a connection to the pool, or close it when ``discard`` is set"""
+        with self._lock:
+            entry = self._in_use.pop(id(conn), None)
+            if entry is None:
+                return
+            discard = discard or self._is_closed(conn)
+            if not discard:
+                entry.last_used = time.monotonic()
+                self._idle.append(entry)
+            self._lock.notify()
+        if discard:
+            self._close(entry)
+
+    def close_all(self):
+        """Close idle connections; checked-out ones are closed when released"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for entry in idle:
+            self._close(entry)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._metrics)
+            stats['in_use'] = len(self._in_use)
+            stats['idle'] = len(self._idle)
+            stats['max_size'] = self.max_size
+            return stats
+
+    def _checkout(self, entry: _PoolEntry, owner: Optional[str]):
+        entry.owner = owner
+        self._in_use[id(entry.conn)] = entry
+
+    def _take_idle(self, owner: Optional[str]) -> Optional[_PoolEntry]:
+        if not self._idle:
+            return None
+        if owner is not None:
+            for i, entry in enumerate(self._idle):
+                if entry.owner == owner:
+                    return self._idle.pop(i)
+        # Most recently used first: it is the least likely to have timed out
+        return self._idle.pop()
+
+    def _evict_idle(self) -> List[_PoolEntry]:
+        """Remove idle-expired entries; the caller closes them outside the lock"""
+        now = time.monotonic()
+        keep, expired = [], []
+        for entry in self._idle:
+            if now - entry.last_used > self.idle_timeout:
+                self._metrics['idle_evictions'] += 1
+                expired.append(entry)
+            else:
+                keep.append(entry)
+        self._idle = keep
+        return expired
+
+    def _is_healthy(self, entry: _PoolEntry) -> bool:
+        if self._is_closed(entry.conn):
+            return False
+        now = time.monotonic()
+        if now - entry.last_checked < self.health_check_interval:
+            return True
+        try:
+            cursor = entry.conn.cursor()
+            try:
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            finally:
+                cursor.close()
+        except Exception:
+            return False
+        entry.last_checked = now
+        return True
+
+    def _record_wait(self, seconds: float):
+        self._metrics['waits'] += 1
+        self._metrics['wait_seconds'] += seconds
+        self._metrics['max_wait_seconds'] = max(self._metrics['max_wait_seconds'], seconds)
+
+    @staticmethod
+    def _is_closed(conn) -> bool:
+        is_closed = getattr(conn, 'is_closed', None)
+        return bool(is_closed()) if callable(is_closed) else False
+
+    @staticmethod
+    def _close(entry: _PoolEntry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide pool, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                max_size=int(os.getenv('SNOWFLAKE_POOL_SIZE', '4')),
+                idle_timeout=float(os.getenv('SNOWFLAKE_POOL_IDLE_TIMEOUT', '600'))
+            )
+        return _pool
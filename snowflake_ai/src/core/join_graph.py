@@ -0,0 +1,81 @@
+import re
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+_KEY_NAME_RE = re.compile(r'(^|_)(id|key|code|no|num|number)$|[a-z0-9]id$', re.IGNORECASE)
+# Types that rarely make sense as join keys
+_NON_KEY_TYPES = ('FLOAT', 'DOUBLE', 'REAL', 'BOOLEAN', 'DATE', 'TIME', 'TIMESTAMP', 'VARIANT', 'OBJECT', 'ARRAY')
+
+class JoinGraph:
+    """Candidate joins between tables that share a column name.
+
+    An inverted index maps each column name to the tables that have it, so
+    only tables that actually share a column are ever compared. Each edge is
+    scored by how much the column looks like a key on either side: the
+    uniqueness of its sample values, its name and its type. Columns found in
+    more than ``max_tables_per_column`` tables (audit columns, generic IDs)
+    only link the few tables where they look like a key to the others
+    instead of producing every pair.
+    """
+    def __init__(self, schema_info: Dict, max_tables_per_column: int = 25, owners_per_column: int = 3,
+                 min_owner_score: float = 0.6):
+        self.max_tables_per_column = max_tables_per_column
+        self.owners_per_column = owners_per_column
+        self.min_owner_score = min_owner_score
+        # lower-case column name -> [(table, column name as defined, key likelihood)]
+        self.index: Dict[str, List[Tuple[str, str, float]]] = defaultdict(list)
+        for table_name, details in schema_info.items():
+            samples = details.get('sample_data') or []
+            for col in details.get('columns', []):
+                likelihood = self.key_likelihood(col['name'], col.get('type', ''), samples)
+                self.index[col['name'].lower()].append((table_name, col['name'], likelihood))
+        self.capped_columns: List[str] = []
+        self.edges = self._build_edges()
+
+    @staticmethod
+    def key_likelihood(column_name: str, column_type: str, samples: List[Dict]) -> float:
+        """0..1 score of how likely a column is a primary or foreign key"""
+        values = [row.get(column_name) for row in samples]
+        values = [v for v in values if v is not None]
+        if values:
+            try:
+                uniqueness = len(set(values)) / len(values)
+            except TypeError:
+                uniqueness = len({repr(v) for v in values}) / len(values)
+        else:
+            uniqueness = 0.5
+        score = 0.6 * uniqueness + (0.4 if _KEY_NAME_RE.search(column_name) else 0.0)
+        if any(t in (column_type or '').upper() for t in _NON_KEY_TYPES):
+            score *= 0.3
+        return round(min(score, 1.0), 3)
+
+    def _build_edges(self) -> List[Dict]:
+        edges = []
+        for column, entries in self.index.items():
+            if len(entries) < 2:
+                continue
+            if len(entries) <= self.max_tables_per_column:
+                pairs = [(a, b) for i, a in enumerate(entries) for b in entries[i + 1:]]
+            else:
+                self.capped_columns.append(column)
+                ranked = sorted(entries, key=lambda e: -e[2])
+                owners = [e for e in ranked[:self.owners_per_column] if e[2] >= self.min_owner_score]
+                pairs = [(owner, other) for owner in owners for other in entries if other[0] != owner[0]]
+            for (left, left_col, left_score), (right, right_col, right_score) in pairs:
+                # One side should look like a key; both sides alike is a weaker signal
+                score = max(left_score, right_score) * (0.5 + 0.5 * min(left_score, right_score))
+                if right_score > left_score:
+                    left, left_col, right, right_col = right, right_col, left, left_col
+                edges.append({
+                    'left': left, 'left_column': left_col,
+                    'right': right, 'right_column': right_col,
+                    'score': round(score, 3)
+                })
+        edges.sort(key=lambda e: (-e['score'], e['left'], e['right']))
+        return edges
+
+    def top_edges(self, limit: int) -> List[Dict]:
+        return self.edges[:limit]
+
+    def neighbors(self, table_name: str) -> List[Dict]:
+        return [e for e in self.edges if table_name in (e['left'], e['right'])]
@@ -1,37 +1,104 @@
 import openai
 import os
 import json
-from typing import Dict
+import re
+import time
+from typing import Dict, Iterator, List, Optional
+from core.schema_index import get_schema_index
+from utils.tracing import record, span
 
 class QueryGenerator:
-    def __init__(self):
+    def __init__(self, top_k: int = 8, token_budget: int = 3000):
         openai.api_key = os.getenv('OPENAI_API_KEY')
         self.model = "gpt-3.5-turbo"
+        # Only the top_k tables most relevant to the prompt go into the system prompt,
+        # encoded compactly within roughly token_budget tokens
+        self.top_k = top_k
+        self.token_budget = token_budget
 
-    def generate_sql(self, prompt: str, schema_info: Dict) -> str:
-        schema_context = self._format_schema_context(schema_info)
-        
+    def generate_sql(self, prompt: str, schema_info: Dict, temperature: float = 0.3,
+                     feedback: Optional[List[str]] = None) -> str:
+        try:
+            messages = self._build_messages(prompt, schema_info, feedback)
+            with span('openai.generate_sql', model=self.model):
+                response = openai.ChatCompletion.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature
+                )
+            return response.choices[0].message['content'].strip()
+        except Exception as e:
+            raise Exception(f"Query generation failed: {str(e)}")
+
+    def stream_sql(self, prompt: str, schema_info: Dict, temperature: float = 0.3,
+                   feedback: Optional[List[str]] = None) -> Iterator[str]:
+        """Yield content deltas as the model produces them; time to first token is traced"""
+        started_at = time.time()
+        start = time.perf_counter()
+        first_token = True
+        status = 'ok'
         try:
+            messages = self._build_messages(prompt, schema_info, feedback)
             response = openai.ChatCompletion.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": f"""You are a SQL expert. 
-                    Use this schema information:
-                    {schema_context}
-                    Rules:
-                    1. Strictly Use the schema as reference no column or table outside of the schema.
-                    2. Include WHERE clauses where appropriate
-                    3. Include joins, aggregations, and subqueries as needed
-                    4. Include window functions as needed
-                    5. Try to generate sql where on resultset machine learning model can be applied
-                    6. Generate only SQL, no explanations"""},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
+                messages=messages,
+                temperature=temperature,
+                stream=True
             )
-            return response.choices[0].message['content'].strip()
+            for chunk in response:
+                content = chunk['choices'][0]['delta'].get('content')
+                if content:
+                    if first_token:
+                        record('openai.stream_sql.first_token', started_at,
+                               (time.perf_counter() - start) * 1000, model=self.model)
+                        first_token = False
+                    yield content
+        except GeneratorExit:
+            # The engine stops reading once the statement is complete
+            status = 'cancelled'
+            raise
         except Exception as e:
+            status = 'error'
             raise Exception(f"Query generation failed: {str(e)}")
+        finally:
+            record('openai.stream_sql', started_at, (time.perf_counter() - start) * 1000,
+                   status=status, model=self.model)
+
+    def _build_messages(self, prompt: str, schema_info: Dict,
+                        feedback: Optional[List[str]] = None) -> List[Dict]:
+        with span('openai.build_prompt', tables=len(schema_info)):
+            schema_context = self._format_schema_context(schema_info, prompt)
+        user_content = self._with_feedback(prompt, feedback)
+        return [
+            {"role": "system", "content": f"""You are a SQL expert. 
+            Use this schema information:
+            {schema_context}
+            Rules:
+            1. Strictly Use the schema as reference no column or table outside of the schema.
+            2. Include WHERE clauses where appropriate
+            3. Include joins, aggregations, and subqueries as needed
+            4. Include window functions as needed
+            5. Try to generate sql where on resultset machine learning model can be applied
+            6. Generate only SQL, no explanations"""},
+            {"role": "user", "content": user_content}
+        ]
+
+    @staticmethod
+    def _with_feedback(prompt: str, feedback: Optional[List[str]]) -> str:
+        """Append reasons earlier attempts were rejected so the model can avoid them"""
+        if not feedback:
+            return prompt
+        reasons = "\n".join(f"- {reason}" for reason in feedback)
+        return f"{prompt}\n\nPrevious attempts were rejected for these reasons, avoid them:\n{reasons}"
+
+    @staticmethod
+    def clean_sql(sql: str) -> str:
+        """Strip markdown code fences the model sometimes wraps SQL in"""
+        # Keep only the fenced block when the model adds prose around it
+        fenced = re.search(r'```(?:sql)?\s*(.*?)```', sql, re.DOTALL | re.IGNORECASE)
+        if fenced:
+            return fenced.group(1).strip()
+        return sql.replace('```sql', '').replace('```', '').strip()
 
     def _add_limit_clause(self, sql: str) -> str:
         """Add LIMIT 1 to query for validation"""
@@ -42,7 +109,11 @@ class QueryGenerator:
         return sql
     
 
-    def _format_schema_context(self, schema_info: Dict) -> str:
+    def _format_schema_context(self, schema_info: Dict, prompt: Optional[str] = None) -> str:
+        if prompt is not None:
+            index = get_schema_index(schema_info)
+            return index.encode(index.top_k(prompt, self.top_k), self.token_budget)
+
         context = []
         for table_name, details in schema_info.items():
             context.append(f"\n{table_name}:")
@@ -0,0 +1,162 @@
+import contextvars
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from core.sql_validator import SQLValidator
+from utils.tracing import span
+
+class SuggestionPreflight:
+    """Validate and cost-estimate canned SQL suggestions in the background.
+
+    Every suggestion is first checked offline by ``SQLValidator``; the ones
+    that pass are sent to the warehouse as ``EXPLAIN USING TABULAR`` in
+    batches. Each batch runs on its own connection from
+    ``connection_factory``, with its statements submitted asynchronously so
+    they overlap. Results are kept per schema fingerprint, so reruns and
+    other sessions on the same schema read them without any round-trip.
+    """
+    def __init__(self, batch_size: int = 10, max_workers: int = 2, batch_timeout: float = 60,
+                 max_entries: int = 8):
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.batch_timeout = batch_timeout
+        self.max_entries = max_entries
+        # schema fingerprint -> {'status', 'checked', 'total', 'results', 'started', 'finished'}
+        self._runs: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, schema_fingerprint: str, suggestions: List[Dict], schema_info: Dict,
+              connection_factory: Callable) -> Dict:
+        """Start checking ``suggestions`` unless this fingerprint was already checked or is running"""
+        with self._lock:
+            run = self._runs.get(schema_fingerprint)
+            if run is not None:
+                self._runs.move_to_end(schema_fingerprint)
+                return run
+            queries = list(dict.fromkeys(s['query'] for s in suggestions))
+            run = {'status': 'running', 'checked': 0, 'total': len(queries), 'results': {},
+                   'started': time.time(), 'finished': None}
+            self._runs[schema_fingerprint] = run
+            while len(self._runs) > self.max_entries:
+                self._runs.popitem(last=False)
+        # Spans from the background thread keep the page and parent span of the caller
+        threading.Thread(target=contextvars.copy_context().run,
+                         args=(self._run, run, queries, schema_info, connection_factory),
+                         name='suggestion-preflight', daemon=True).start()
+        return run
+
+    def status(self, schema_fingerprint: str) -> Optional[Dict]:
+        """The run for ``schema_fingerprint``; ``results`` maps query text to its check"""
+        with self._lock:
+            return self._runs.get(schema_fingerprint)
+
+    def forget(self, schema_fingerprint: str):
+        with self._lock:
+            self._runs.pop(schema_fingerprint, None)
+
+    def _run(self, run: Dict, queries: List[str], schema_info: Dict, connection_factory: Callable):
+        try:
+            with span('preflight.run', queries=len(queries)):
+                validator = SQLValidator(schema_info)
+                to_explain = []
+                for query in queries:
+                    errors = validator.validate(query.strip())
+                    if errors:
+                        self._store(run, {query: self._check(False, "; ".join(errors))})
+                    else:
+                        to_explain.append(query)
+                batches = [to_explain[i:i + self.batch_size]
+                           for i in range(0, len(to_explain), self.batch_size)]
+                if batches:
+                    with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                        # One context copy per batch: a context cannot be entered by two threads at once
+                        futures = [executor.submit(contextvars.copy_context().run, self._explain_batch,
+                                                   batch, connection_factory)
+                                   for batch in batches]
+                        for future in futures:
+                            self._store(run, future.result())
+            run['status'] = 'done'
+        except Exception as e:
+            run.update({'status': 'failed', 'error': str(e)})
+        run['finished'] = time.time()
+
+    def _store(self, run: Dict, checks: Dict[str, Dict]):
+        with self._lock:
+            run['results'].update(checks)
+            run['checked'] = len(run['results'])
+
+    def _explain_batch(self, queries: List[str], connection_factory: Callable) -> Dict[str, Dict]:
+        with span('preflight.batch', queries=len(queries)):
+            snowflake_conn = connection_factory()
+            try:
+                plans = snowflake_conn.execute_many(
+                    [f"EXPLAIN USING TABULAR {query.strip().rstrip(';')}" for query in queries],
+                    timeout=self.batch_timeout, use_cache=False
+                )
+            except Exception as e:
+                return {query: self._check(False, str(e)) for query in queries}
+            finally:
+                snowflake_conn.close()
+        checks = {}
+        for query, plan in zip(queries, plans):
+            if isinstance(plan, Exception):
+                checks[query] = self._check(False, str(plan))
+            else:
+                checks[query] = self._check(True, None, **self.plan_cost(plan))
+        return checks
+
+    @staticmethod
+    def _check(valid: bool, error: Optional[str], bytes_assigned: Optional[int] = None,
+               partitions_assigned: Optional[int] = None, partitions_total: Optional[int] = None) -> Dict:
+        return {'valid': valid, 'error': error, 'bytes_assigned': bytes_assigned,
+                'partitions_assigned': partitions_assigned, 'partitions_total': partitions_total}
+
+    @staticmethod
+    def plan_cost(plan: pd.DataFrame) -> Dict:
+        """Bytes and partitions to scan, from the GlobalStats row of a tabular EXPLAIN"""
+        plan = plan.rename(columns=lambda c: str(c).lower())
+        if plan.empty or 'operation' not in plan.columns:
+            return {}
+        stats = plan[plan['operation'] == 'GlobalStats']
+        if stats.empty:
+            return {}
+        row = stats.iloc[0]
+
+        def number(column: str) -> Optional[int]:
+            value = row.get(column)
+            return None if value is None or pd.isna(value) else int(value)
+
+        return {'bytes_assigned': number('bytesassigned'),
+                'partitions_assigned': number('partitionsassigned'),
+                'partitions_total': number('partitionstotal')}
+
+def rank_suggestions(suggestions: List[Dict], results: Dict[str, Dict],
+                     include_invalid: bool = False) -> List[Dict]:
+    """Cheapest suggestions first, unchecked ones after them and, optionally, invalid ones last"""
+    def sort_key(suggestion: Dict):
+        check = results.get(suggestion['query'])
+        if check is None:
+            return (1, 0)
+        if not check['valid']:
+            return (2, 0)
+        return (0, check['bytes_assigned'] if check['bytes_assigned'] is not None else 0)
+
+    kept = [s for s in suggestions
+            if include_invalid or results.get(s['query'], {}).get('valid', True)]
+    return sorted(kept, key=sort_key)
+
+_preflight = None
+_preflight_lock = threading.Lock()
+
+def get_preflight() -> SuggestionPreflight:
+    """Process-wide pre-flight checker shared by every Streamlit session"""
+    global _preflight
+    with _preflight_lock:
+        if _preflight is None:
+            _preflight = SuggestionPreflight()
+        return _preflight
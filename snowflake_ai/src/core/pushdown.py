@@ -0,0 +1,91 @@
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+TIME_GRAINS = ['HOUR', 'DAY', 'WEEK', 'MONTH', 'QUARTER', 'YEAR']
+_NUMERIC_TYPES = ('INT', 'FLOAT', 'NUMBER', 'DECIMAL', 'DOUBLE', 'REAL', 'NUMERIC')
+_TEMPORAL_TYPES = ('DATE', 'TIMESTAMP')
+
+class PushdownBuilder:
+    """Build queries that aggregate or sample in the warehouse.
+
+    Instead of pulling raw rows and analysing them in pandas, these queries
+    return compact frames: one row per time bucket, per category or per
+    column summary, or a bounded random sample for models that need points.
+    """
+    def __init__(self, table_name: str, columns: List[Dict]):
+        self.table_name = table_name
+        self.column_types = {col['name'].upper(): (col.get('type') or '').upper() for col in columns}
+
+    def is_temporal(self, column: str) -> bool:
+        return any(t in self.column_types.get(column.upper(), '') for t in _TEMPORAL_TYPES)
+
+    def is_numeric(self, column: str) -> bool:
+        return any(t in self.column_types.get(column.upper(), '') for t in _NUMERIC_TYPES)
+
+    def time_series(self, time_col: str, value_cols: List[str], grain: str = 'DAY',
+                    aggregate: str = 'AVG') -> str:
+        """One row per time bucket with the bucket's row count and aggregated values.
+
+        Columns that are not DATE/TIMESTAMP (e.g. a YEAR number) are grouped on as-is.
+        """
+        grain = grain.upper()
+        if grain not in TIME_GRAINS:
+            raise ValueError(f"Unsupported time grain: {grain}")
+        bucket = f"DATE_TRUNC('{grain}', {time_col}) AS {time_col}" if self.is_temporal(time_col) else time_col
+        values = ",\n    ".join(f"{aggregate}({col}) AS {col}" for col in value_cols if col != time_col)
+        return (
+            f"SELECT\n    {bucket},\n    COUNT(*) AS ROW_COUNT"
+            + (f",\n    {values}" if values else "")
+            + f"\nFROM {self.table_name}\nWHERE {time_col} IS NOT NULL\nGROUP BY 1\nORDER BY 1"
+        )
+
+    def grouped(self, category_col: str, value_cols: List[str], limit: int = 1000) -> str:
+        """Per-category counts and summary statistics, largest groups first"""
+        stats = []
+        for col in value_cols:
+            if col == category_col:
+                continue
+            stats += [f"AVG({col}) AS AVG_{col}", f"SUM({col}) AS SUM_{col}",
+                      f"MIN({col}) AS MIN_{col}", f"MAX({col}) AS MAX_{col}"]
+        select = ",\n    ".join([category_col, "COUNT(*) AS ROW_COUNT"] + stats)
+        return (f"SELECT\n    {select}\nFROM {self.table_name}\nGROUP BY {category_col}\n"
+                f"ORDER BY ROW_COUNT DESC\nLIMIT {limit}")
+
+    def summary(self, columns: List[str]) -> str:
+        """Single-row summary statistics for every column over the whole table"""
+        select = ["COUNT(*) AS ROW_COUNT"]
+        for col in columns:
+            select += [f"COUNT({col}) AS {col}__NON_NULL",
+                       f"APPROX_COUNT_DISTINCT({col}) AS {col}__DISTINCT"]
+            if self.is_numeric(col):
+                select += [f"MIN({col}) AS {col}__MIN", f"MAX({col}) AS {col}__MAX",
+                           f"AVG({col}) AS {col}__AVG", f"STDDEV({col}) AS {col}__STDDEV",
+                           f"APPROX_PERCENTILE({col}, 0.5) AS {col}__MEDIAN"]
+            elif self.is_temporal(col):
+                select += [f"MIN({col}) AS {col}__MIN", f"MAX({col}) AS {col}__MAX"]
+        return "SELECT\n    " + ",\n    ".join(select) + f"\nFROM {self.table_name}"
+
+    def sample(self, columns: List[str], rows: int = 10000, where: Optional[str] = None) -> str:
+        """A random sample of at most ``rows`` rows, drawn by the warehouse"""
+        query = f"SELECT {', '.join(columns)}\nFROM {self.table_name} SAMPLE ({int(rows)} ROWS)"
+        if where:
+            query += f"\nWHERE {where}"
+        return query
+
+    @staticmethod
+    def summary_frame(result: pd.DataFrame) -> pd.DataFrame:
+        """Reshape the single row returned by ``summary`` into one row per column"""
+        if result.empty:
+            return pd.DataFrame()
+        row = result.iloc[0]
+        stats: Dict[str, Dict] = {}
+        for name, value in row.items():
+            if '__' not in str(name):
+                continue
+            column, stat = str(name).rsplit('__', 1)
+            stats.setdefault(column, {})[stat.lower()] = value
+        frame = pd.DataFrame.from_dict(stats, orient='index')
+        frame.index.name = 'column'
+        frame.insert(0, 'rows', row.get('ROW_COUNT'))
+        return frame.reset_index()
@@ -0,0 +1,122 @@
+import json
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+_TOKEN_RE = re.compile(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+')
+
+def tokenize(text: str) -> List[str]:
+    """Split identifiers and prose into lowercase terms (CUST_ID, custId -> cust, id)"""
+    terms = []
+    for word in _TOKEN_RE.findall(text or ''):
+        word = word.lower()
+        # Cheap plural folding so "orders" matches ORDER_ID
+        if len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+        terms.append(word)
+    return terms
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text and SQL identifiers
+    return (len(text) + 3) // 4
+
+class SchemaIndex:
+    """BM25 index over table names, column names and column descriptions"""
+    TABLE_NAME_WEIGHT = 3
+
+    def __init__(self, schema_info: Dict, k1: float = 1.5, b: float = 0.75):
+        self.schema_info = schema_info
+        self.k1 = k1
+        self.b = b
+        self.tables = list(schema_info.keys())
+        self.term_freqs = []
+        doc_freq = Counter()
+        for table_name, details in schema_info.items():
+            terms = tokenize(table_name) * self.TABLE_NAME_WEIGHT
+            for col in details.get('columns', []):
+                terms += tokenize(col['name'])
+                terms += tokenize(col.get('description') or '')
+            freqs = Counter(terms)
+            self.term_freqs.append(freqs)
+            doc_freq.update(freqs.keys())
+
+        self.doc_lengths = [sum(freqs.values()) for freqs in self.term_freqs]
+        self.avg_length = sum(self.doc_lengths) / len(self.doc_lengths) if self.doc_lengths else 0
+        n = len(self.tables)
+        self.idf = {
+            term: math.log(1 + (n - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+
+    def score(self, query: str) -> List[float]:
+        terms = set(tokenize(query))
+        scores = []
+        for freqs, length in zip(self.term_freqs, self.doc_lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            for term in terms:
+                tf = freqs.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            scores.append(score)
+        return scores
+
+    def top_k(self, query: str, k: int) -> List[str]:
+        """Most relevant table names; schema order when nothing in the prompt matches"""
+        scores = self.score(query)
+        ranked = sorted(range(len(self.tables)), key=lambda i: (-scores[i], i))
+        return [self.tables[i] for i in ranked[:k]]
+
+    def encode(self, tables: List[str], token_budget: int, sample_rows: int = 1) -> str:
+        """Compact per-table encoding that fits ``token_budget``.
+
+        Tables are added in the given order; a sample row is included only
+        while it still fits, and tables that no longer fit are dropped.
+        """
+        lines = []
+        used = 0
+        for table_name in tables:
+            details = self.schema_info[table_name]
+            columns = ", ".join(f"{col['name']} {col['type']}" for col in details.get('columns', []))
+            line = f"{table_name}({columns})"
+            descriptions = [
+                f"{col['name']}: {col['description']}"
+                for col in details.get('columns', []) if col.get('description')
+            ]
+            if descriptions:
+                line += "\n  -- " + "; ".join(descriptions)
+            samples = [
+                "\n  -- sample: " + json.dumps(row, default=str)
+                for row in details.get('sample_data', [])[:sample_rows]
+            ]
+
+            cost = estimate_tokens(line) + 1
+            if used + cost > token_budget:
+                continue
+            sample_cost = sum(estimate_tokens(sample) for sample in samples)
+            if used + cost + sample_cost <= token_budget:
+                line += "".join(samples)
+                cost += sample_cost
+            lines.append(line)
+            used += cost
+        return "\n".join(lines)
+
+_index_cache: 'OrderedDict[int, tuple]' = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+def get_schema_index(schema_info: Dict, max_entries: int = 4) -> SchemaIndex:
+    """Reuse the index for the same schema_info object (e.g. across reruns of a session)"""
+    key = id(schema_info)
+    with _index_cache_lock:
+        cached: Optional[tuple] = _index_cache.get(key)
+        # The cached tuple keeps schema_info alive, so its id cannot be reused by another dict
+        if cached is not None and cached[0] is schema_info:
+            _index_cache.move_to_end(key)
+            return cached[1]
+        index = SchemaIndex(schema_info)
+        _index_cache[key] = (schema_info, index)
+        while len(_index_cache) > max_entries:
+            _index_cache.popitem(last=False)
+        return index
@@ -1,47 +1,90 @@
-import snowflake.connector
 import pandas as pd
-from typing import Dict, List
-import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from snowflake.connector.errors import MissingDependencyError, NotSupportedError
+from typing import Dict, Iterator, List, Optional, Tuple
+from core.connection_pool import ConnectionPool, get_pool
+from utils.result_cache import QueryResultCache, get_result_cache
+from utils.tracing import record, span, traced
+
+# Seconds between status checks of asynchronous queries, growing up to the maximum
+POLL_INTERVAL = 0.1
+MAX_POLL_INTERVAL = 1.0
+
+class QueryCancelled(Exception):
+    """Raised when a query was cancelled before it finished"""
+
+class QueryTimeout(QueryCancelled):
+    """Raised when a query ran past its timeout and was cancelled"""
 
 class SnowflakeConnection:
-    def __init__(self):
-        self.conn = snowflake.connector.connect(
-            user=os.getenv('SNOWFLAKE_USER'),
-            password=os.getenv('SNOWFLAKE_PASSWORD'),
-            account=os.getenv('SNOWFLAKE_ACCOUNT'),
-            warehouse=os.getenv('SNOWFLAKE_WAREHOUSE'),
-            database=os.getenv('SNOWFLAKE_DATABASE'),
-            schema=os.getenv('SNOWFLAKE_SCHEMA', 'PUBLIC')
-        )
+    """Thin handle over a connection checked out of the process-wide pool.
+
+    ``close`` returns the connection to the pool instead of logging out, so
+    Streamlit reruns reuse warm sessions. Passing ``conn`` bypasses the pool
+    and, unless ``result_cache`` is given, the process-wide result cache.
+    """
+    def __init__(self, conn=None, max_workers: int = 8, pool: Optional[ConnectionPool] = None,
+                 session_id: Optional[str] = None, result_cache: Optional[QueryResultCache] = None):
+        self.pool = None if conn is not None else (pool or get_pool())
+        self.conn = conn if conn is not None else self.pool.acquire(owner=session_id)
+        self.result_cache = result_cache if conn is not None else (result_cache or get_result_cache())
+        # Set by the pages once the schema is loaded; part of every result cache key
+        self.schema_fingerprint = None
         self.cursor = self.conn.cursor()
+        # Upper bound on cursors used concurrently for sample fetches
+        self.max_workers = max_workers
+        self.truncated = False
 
-    def get_schema_info(self) -> Dict:
+    def get_table_fingerprints(self) -> Dict[str, str]:
+        """Return a cheap change fingerprint for every object in the current schema"""
+        try:
+            self.cursor.execute("""
+                SELECT t.table_name, t.table_type, t.last_altered,
+                       COUNT(c.column_name), HASH_AGG(c.column_name, c.data_type)
+                FROM information_schema.tables t
+                LEFT JOIN information_schema.columns c
+                  ON c.table_schema = t.table_schema
+                 AND c.table_name = t.table_name
+                WHERE t.table_schema = CURRENT_SCHEMA()
+                GROUP BY t.table_name, t.table_type, t.last_altered
+            """)
+            return {
+                table_name: f"{table_type}|{last_altered}|{column_count}|{column_hash}"
+                for table_name, table_type, last_altered, column_count, column_hash
+                in self.cursor.fetchall()
+            }
+        except Exception as e:
+            raise Exception(f"Failed to get table fingerprints: {str(e)}")
+
+    @traced('snowflake.get_schema_info')
+    def get_schema_info(self, tables: Optional[List[str]] = None) -> Dict:
+        """Introspect the current schema, or only ``tables`` when given"""
         schema_info = {}
+        if tables is not None and not tables:
+            return schema_info
+        table_filter = self._table_filter(tables)
         try:
             # Get list of views/tables
-            self.cursor.execute("""\
-                SELECT table_name, table_type 
-                FROM information_schema.tables 
-                WHERE table_schema = CURRENT_SCHEMA()
+            self.cursor.execute(f"""\
+                SELECT table_name, table_type
+                FROM information_schema.tables
+                WHERE table_schema = CURRENT_SCHEMA(){table_filter}
             """)
             objects = self.cursor.fetchall()
+            if not objects:
+                return schema_info
 
-            for obj_name, obj_type in objects:
-                # Get column information
-                self.cursor.execute(f"""
-                    SELECT column_name, data_type, is_nullable
-                    FROM information_schema.columns
-                    WHERE table_name = '{obj_name}'
-                    AND table_schema = CURRENT_SCHEMA()
-                    ORDER BY ordinal_position
-                """)
-                columns = self.cursor.fetchall()
-
-                # Get sample data
-                self.cursor.execute(f"SELECT * FROM {obj_name} LIMIT 5")
-                sample_data = self.cursor.fetchall()
-                sample_columns = [desc[0] for desc in self.cursor.description]
+            # Get column information for all requested tables in one round-trip
+            columns_by_table = self._get_columns(self.cursor, table_filter)
 
+            # Get sample data concurrently, one cursor per worker
+            table_names = [obj_name for obj_name, _ in objects]
+            samples = self._get_samples(table_names)
+
+            for obj_name, obj_type in objects:
+                sample_columns, sample_data = samples[obj_name]
                 schema_info[obj_name] = {
                     'type': obj_type,
                     'columns': [
@@ -49,10 +92,10 @@ class SnowflakeConnection:
                             'name': col[0],
                             'type': col[1],
                             'nullable': col[2]
-                        } for col in columns
+                        } for col in columns_by_table.get(obj_name, [])
                     ],
                     'sample_data': [
-                        dict(zip(sample_columns, row)) 
+                        dict(zip(sample_columns, row))
                         for row in sample_data
                     ]
                 }
@@ -61,17 +104,351 @@ class SnowflakeConnection:
         except Exception as e:
             raise Exception(f"Failed to get schema info: {str(e)}")
 
-    def execute_query(self, query: str) -> pd.DataFrame:
+    @staticmethod
+    def _table_filter(tables: Optional[List[str]]) -> str:
+        if tables is None:
+            return ""
+        names = ", ".join("'" + name.replace("'", "''") + "'" for name in tables)
+        return f"\n                AND table_name IN ({names})"
+
+    def _get_columns(self, cursor, table_filter: str = "") -> Dict[str, List[Tuple]]:
+        """Fetch column metadata for the current schema in a single query"""
+        cursor.execute(f"""
+            SELECT table_name, column_name, data_type, is_nullable
+            FROM information_schema.columns
+            WHERE table_schema = CURRENT_SCHEMA(){table_filter}
+            ORDER BY table_name, ordinal_position
+        """)
+        columns_by_table = {}
+        for table_name, column_name, data_type, is_nullable in cursor.fetchall():
+            columns_by_table.setdefault(table_name, []).append(
+                (column_name, data_type, is_nullable)
+            )
+        return columns_by_table
+
+    def _get_samples(self, table_names: List[str]) -> Dict[str, Tuple[List[str], List[Tuple]]]:
+        """Fetch sample rows for each table on a bounded pool of cursors"""
+        workers = max(1, min(self.max_workers, len(table_names)))
+        chunks = [table_names[i::workers] for i in range(workers)]
+
+        def fetch_chunk(chunk):
+            cursor = self.conn.cursor()
+            try:
+                samples = {}
+                for obj_name in chunk:
+                    cursor.execute(f"SELECT * FROM {obj_name} LIMIT 5")
+                    sample_data = cursor.fetchall()
+                    sample_columns = [desc[0] for desc in cursor.description]
+                    samples[obj_name] = (sample_columns, sample_data)
+                return samples
+            finally:
+                cursor.close()
+
+        samples = {}
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for chunk_samples in executor.map(fetch_chunk, chunks):
+                samples.update(chunk_samples)
+        return samples
+
+    def execute_query(self, query: str, use_cache: bool = True, timeout: Optional[float] = None,
+                      cancel_event: Optional[threading.Event] = None) -> pd.DataFrame:
+        """Run ``query`` and return its result.
+
+        With a ``timeout`` (seconds) or a ``cancel_event``, the query is
+        submitted asynchronously and polled, and cancelled in the warehouse
+        when it runs too long (``QueryTimeout``) or the event is set
+        (``QueryCancelled``).
+        """
+        with span('snowflake.execute_query') as current:
+            cache_key = self._cache_key(query) if use_cache else None
+            if cache_key is not None:
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    current.set(cache_hit=True, rows=len(cached))
+                    return cached
+            if timeout is not None or cancel_event is not None:
+                result = self.wait_for_query(self.submit_query(query), timeout, cancel_event)
+            else:
+                try:
+                    self.cursor.execute(query)
+                    result = self._fetch_frame(self.cursor)
+                except Exception as e:
+                    raise Exception(f"Query execution failed: {str(e)}")
+            current.set(cache_hit=False, rows=len(result))
+            if cache_key is not None:
+                self.result_cache.put(cache_key, result)
+            return result
+
+    def submit_query(self, query: str) -> str:
+        """Start ``query`` in the warehouse without waiting for it; returns its query ID"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute_async(query)
+            return cursor.sfqid
+        except Exception as e:
+            raise Exception(f"Query submission failed: {str(e)}")
+        finally:
+            cursor.close()
+
+    def query_state(self, query_id: str) -> str:
+        """One of running, done, failed or cancelled"""
+        try:
+            status = self.conn.get_query_status(query_id)
+        except Exception as e:
+            raise Exception(f"Failed to get query status: {str(e)}")
+        if self.conn.is_still_running(status):
+            return 'running'
+        if status.name in ('ABORTING', 'ABORTED'):
+            return 'cancelled'
+        if self.conn.is_an_error(status):
+            return 'failed'
+        return 'done'
+
+    def cancel_query(self, query_id: str):
+        """Ask the warehouse to stop a running query"""
+        with span('snowflake.cancel_query', query_id=query_id) as current:
+            cursor = self.conn.cursor()
+            try:
+                cursor.execute("SELECT SYSTEM$CANCEL_QUERY(%s)", (query_id,))
+            except Exception as e:
+                current.set(error=str(e))
+                raise Exception(f"Failed to cancel query {query_id}: {str(e)}")
+            finally:
+                cursor.close()
+
+    def cached_result(self, query: str) -> Optional[pd.DataFrame]:
+        """Result of ``query`` from the result cache, without touching the warehouse"""
+        cache_key = self._cache_key(query)
+        return self.result_cache.get(cache_key) if cache_key is not None else None
+
+    def fetch_query_result(self, query_id: str, query: Optional[str] = None) -> pd.DataFrame:
+        """Result of a finished asynchronous query; raises with the warehouse error if it failed.
+
+        Passing the query text stores the result in the result cache.
+        """
+        cursor = self.conn.cursor()
+        try:
+            cursor.get_results_from_sfqid(query_id)
+            result = self._fetch_frame(cursor)
+        except Exception as e:
+            raise Exception(f"Query execution failed: {str(e)}")
+        finally:
+            cursor.close()
+        cache_key = self._cache_key(query) if query is not None else None
+        if cache_key is not None:
+            self.result_cache.put(cache_key, result)
+        return result
+
+    def wait_for_query(self, query_id: str, timeout: Optional[float] = None,
+                       cancel_event: Optional[threading.Event] = None) -> pd.DataFrame:
+        """Poll an asynchronous query until it finishes, cancelling it on timeout or request"""
+        return self.wait_for_queries([query_id], timeout, cancel_event)[0]
+
+    def wait_for_queries(self, query_ids: List[str], timeout: Optional[float] = None,
+                         cancel_event: Optional[threading.Event] = None,
+                         return_exceptions: bool = False) -> List:
+        """Poll several asynchronous queries at once; results come back in ``query_ids`` order.
+
+        Queries still running after ``timeout`` seconds, or when
+        ``cancel_event`` is set, are cancelled. With ``return_exceptions``
+        a failed or cancelled query yields its exception instead of raising.
+        """
+        start = time.monotonic()
+        outcomes: Dict[str, object] = {}
+        pending = list(query_ids)
+        interval = POLL_INTERVAL
+        while pending:
+            for query_id in list(pending):
+                state = self.query_state(query_id)
+                if state == 'running':
+                    continue
+                pending.remove(query_id)
+                if state == 'cancelled':
+                    outcomes[query_id] = QueryCancelled(f"Query {query_id} was cancelled")
+                    continue
+                try:
+                    outcomes[query_id] = self.fetch_query_result(query_id)
+                except Exception as e:
+                    outcomes[query_id] = e
+            if not pending:
+                break
+            elapsed = time.monotonic() - start
+            stop = None
+            if cancel_event is not None and cancel_event.is_set():
+                stop = QueryCancelled
+            elif timeout is not None and elapsed >= timeout:
+                stop = QueryTimeout
+            if stop is not None:
+                for query_id in pending:
+                    try:
+                        self.cancel_query(query_id)
+                    except Exception:
+                        # Recorded on the failed snowflake.cancel_query span; the caller still
+                        # gets the timeout or cancellation below
+                        pass
+                    outcomes[query_id] = stop(
+                        f"Query {query_id} timed out after {timeout:g}s" if stop is QueryTimeout
+                        else f"Query {query_id} was cancelled"
+                    )
+                break
+            wait = interval if timeout is None else min(interval, max(0.0, timeout - elapsed))
+            if cancel_event is not None:
+                cancel_event.wait(wait)
+            else:
+                time.sleep(wait)
+            # Back off for long-running queries, like the connector's own polling
+            interval = min(interval * 1.5, MAX_POLL_INTERVAL)
+
+        results = [outcomes[query_id] for query_id in query_ids]
+        if not return_exceptions:
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
+        return results
+
+    def execute_many(self, queries: List[str], timeout: Optional[float] = None,
+                     cancel_event: Optional[threading.Event] = None, use_cache: bool = True) -> List:
+        """Run several queries concurrently in the warehouse.
+
+        Returns one DataFrame or exception per query, in order. ``timeout``
+        applies to the whole batch.
+        """
+        with span('snowflake.execute_many', queries=len(queries)):
+            results: List = [None] * len(queries)
+            cache_keys = [self._cache_key(query) if use_cache else None for query in queries]
+            submitted = {}
+            for idx, (query, cache_key) in enumerate(zip(queries, cache_keys)):
+                cached = self.result_cache.get(cache_key) if cache_key is not None else None
+                if cached is not None:
+                    results[idx] = cached
+                    continue
+                try:
+                    submitted[idx] = self.submit_query(query)
+                except Exception as e:
+                    results[idx] = e
+            if submitted:
+                outcomes = self.wait_for_queries(list(submitted.values()), timeout, cancel_event,
+                                                 return_exceptions=True)
+                for idx, outcome in zip(submitted, outcomes):
+                    results[idx] = outcome
+                    if cache_keys[idx] is not None and isinstance(outcome, pd.DataFrame):
+                        self.result_cache.put(cache_keys[idx], outcome)
+            return results
+
+    def _cache_key(self, query: str) -> Optional[str]:
+        if self.result_cache is None or not QueryResultCache.is_cacheable(query):
+            return None
+        return self.result_cache.make_key(query, self.schema_fingerprint)
+
+    def stream_query(self, query: str, max_rows: Optional[int] = None,
+                     max_bytes: Optional[int] = None, batch_rows: int = 10000,
+                     use_cache: bool = True) -> Iterator[pd.DataFrame]:
+        """Yield the result as DataFrame chunks, stopping once a row or byte cap is hit.
+
+        ``self.truncated`` is set when a cap cut the result short. Complete
+        results are stored in the result cache; a cached result is yielded as
+        a single chunk. Time to the first chunk and to the end of the stream
+        are traced separately.
+        """
+        started_at = time.time()
+        start = time.perf_counter()
+        first_chunk = True
+        rows = 0
+        status = 'ok'
+        try:
+            for batch in self._stream_batches(query, max_rows, max_bytes, batch_rows, use_cache):
+                if first_chunk:
+                    record('snowflake.stream_query.first_chunk', started_at,
+                           (time.perf_counter() - start) * 1000)
+                    first_chunk = False
+                rows += len(batch)
+                yield batch
+        except GeneratorExit:
+            status = 'cancelled'
+            raise
+        except Exception:
+            status = 'error'
+            raise
+        finally:
+            record('snowflake.stream_query', started_at, (time.perf_counter() - start) * 1000,
+                   status=status, rows=rows, truncated=self.truncated)
+
+    def _stream_batches(self, query: str, max_rows: Optional[int], max_bytes: Optional[int],
+                        batch_rows: int, use_cache: bool) -> Iterator[pd.DataFrame]:
+        self.truncated = False
+        cache_key = self._cache_key(query) if use_cache else None
+        if cache_key is not None:
+            cached = self.result_cache.get(cache_key)
+            if cached is not None:
+                self.truncated = max_rows is not None and len(cached) > max_rows
+                yield cached.iloc[:max_rows] if self.truncated else cached
+                return
         try:
             self.cursor.execute(query)
-            result = self.cursor.fetchall()
-            columns = [desc[0] for desc in self.cursor.description]
-            return pd.DataFrame(result, columns=columns)
+            batches = iter(self._fetch_batches(self.cursor, batch_rows))
         except Exception as e:
             raise Exception(f"Query execution failed: {str(e)}")
 
+        rows = 0
+        size = 0
+        chunks = []
+        for batch in batches:
+            if max_rows is not None and rows + len(batch) > max_rows:
+                self.truncated = True
+                yield batch.iloc[:max_rows - rows]
+                return
+            rows += len(batch)
+            size += int(batch.memory_usage(deep=True).sum())
+            if cache_key is not None:
+                chunks.append(batch)
+            yield batch
+            if (max_rows is not None and rows == max_rows) or (max_bytes is not None and size >= max_bytes):
+                # At a cap: the result is only cut short if more rows follow
+                if any(len(more) for more in batches):
+                    self.truncated = True
+                    return
+                break
+            if cache_key is not None and size > self.result_cache.max_memory_bytes:
+                # Too large to cache: stop holding on to the chunks
+                cache_key = None
+                chunks = []
+
+        if cache_key is not None and chunks:
+            self.result_cache.put(cache_key, pd.concat(chunks, ignore_index=True))
+
+    def _fetch_frame(self, cursor) -> pd.DataFrame:
+        """Fetch a whole result, via Arrow when the result set supports it"""
+        try:
+            return cursor.fetch_pandas_all()
+        except (NotSupportedError, MissingDependencyError):
+            # Non-Arrow results (SHOW, DESCRIBE, ...) only support row fetches
+            result = cursor.fetchall()
+            columns = [desc[0] for desc in cursor.description]
+            return pd.DataFrame(result, columns=columns)
+
+    def _fetch_batches(self, cursor, batch_rows: int) -> Iterator[pd.DataFrame]:
+        try:
+            return cursor.fetch_pandas_batches()
+        except (NotSupportedError, MissingDependencyError):
+            return self._fetch_row_batches(cursor, batch_rows)
+
+    @staticmethod
+    def _fetch_row_batches(cursor, batch_rows: int) -> Iterator[pd.DataFrame]:
+        columns = [desc[0] for desc in cursor.description]
+        while True:
+            rows = cursor.fetchmany(batch_rows)
+            if not rows:
+                return
+            yield pd.DataFrame(rows, columns=columns)
+
     def close(self):
         if self.cursor:
             self.cursor.close()
+            self.cursor = None
         if self.conn:
-            self.conn.close()
+            if self.pool is not None:
+                self.pool.release(self.conn)
+            else:
+                self.conn.close()
+            self.conn = None
+
@@ -0,0 +1,178 @@
+import contextvars
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+from core.openai_client import QueryGenerator
+from core.snowflake import QueryCancelled
+from core.sql_validator import SQLValidator, statement_complete
+from utils.tracing import span
+
+class SQLGenerationEngine:
+    """Generate SQL candidates concurrently and keep the first that returns rows.
+
+    Each round asks the model for ``candidates`` queries at spread
+    temperatures. Candidates are first checked offline by ``SQLValidator``,
+    then with a LIMIT-ed query on their own connection from
+    ``connection_factory``. As soon as one validation returns rows the
+    remaining candidates are cancelled, including their running warehouse
+    queries. Rejection reasons are fed back into
+    the next round's prompt.
+
+    At most ``max_connections`` candidates hold a connection at once, so one
+    session's candidates cannot take the whole shared pool; the others wait
+    for a slot after generating. Connections are requested for
+    ``session_id``.
+    """
+    MAX_FEEDBACK = 5
+
+    def __init__(self, connection_factory: Callable, query_generator: Optional[QueryGenerator] = None,
+                 candidates: int = 3, max_rounds: int = 3, schema_fingerprint: Optional[str] = None,
+                 max_connections: Optional[int] = None, session_id: Optional[str] = None):
+        self.connection_factory = connection_factory
+        self.query_generator = query_generator or QueryGenerator()
+        self.candidates = candidates
+        self.max_rounds = max_rounds
+        self.schema_fingerprint = schema_fingerprint
+        self.max_connections = max(1, min(max_connections or candidates, candidates))
+        self.session_id = session_id
+        self._connection_slots = threading.BoundedSemaphore(self.max_connections)
+        # One entry per finished candidate: {'round', 'candidate', 'sql', 'status', 'error'}
+        self.attempts: List[Dict] = []
+
+    def generate(self, prompt: str, schema_info: Dict,
+                 on_token: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """Return the first candidate whose validation query returns rows.
+
+        With ``on_token``, the first candidate of each round is streamed in the
+        calling thread and ``on_token`` receives the text generated so far;
+        the other candidates still run in the background.
+        """
+        self.attempts = []
+        with span('sql_engine.generate', candidates=self.candidates, connections=self.max_connections,
+                  session=self.session_id) as current:
+            validator = SQLValidator(schema_info)
+            for round_idx in range(1, self.max_rounds + 1):
+                current.set(rounds=round_idx)
+                sql = self._run_round(round_idx, prompt, schema_info, validator, self._feedback(), on_token)
+                if sql is not None:
+                    return sql
+            return None
+
+    def _feedback(self) -> List[str]:
+        """Most recent distinct rejection reasons from earlier attempts"""
+        reasons = [a['error'] for a in self.attempts if a['error']]
+        reasons += ["The query returned no rows" for a in self.attempts if a['status'] == 'empty']
+        return list(dict.fromkeys(reversed(reasons)))[:self.MAX_FEEDBACK]
+
+    def _temperature(self, candidate_idx: int) -> float:
+        # Spread temperatures so parallel candidates are not near-identical
+        return min(1.0, 0.3 + 0.3 * candidate_idx)
+
+    def _run_round(self, round_idx: int, prompt: str, schema_info: Dict, validator: SQLValidator,
+                   feedback: List[str], on_token: Optional[Callable[[str], None]]) -> Optional[str]:
+        stop = threading.Event()
+        first_background = 1 if on_token is not None else 0
+        executor = ThreadPoolExecutor(max_workers=max(1, self.candidates - first_background))
+        try:
+            # Each worker runs in a copy of this context so its spans keep the page and parent
+            pending = {
+                executor.submit(contextvars.copy_context().run, self._attempt, prompt, schema_info, validator, feedback,
+                                self._temperature(i), stop): i
+                for i in range(first_background, self.candidates)
+            }
+            if on_token is not None:
+                attempt = self._attempt(prompt, schema_info, validator, feedback,
+                                        self._temperature(0), stop, on_token)
+                if self._record(round_idx, 0, attempt):
+                    return attempt['sql']
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    candidate_idx = pending.pop(future)
+                    attempt = future.result()
+                    if self._record(round_idx, candidate_idx, attempt):
+                        return attempt['sql']
+            return None
+        finally:
+            stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _record(self, round_idx: int, candidate_idx: int, attempt: Optional[Dict]) -> bool:
+        """Log a finished attempt; True when it is the winner"""
+        if attempt is None:
+            return False
+        attempt.update({'round': round_idx, 'candidate': candidate_idx + 1})
+        self.attempts.append(attempt)
+        return attempt['status'] == 'ok'
+
+    def _attempt(self, prompt: str, schema_info: Dict, validator: SQLValidator, feedback: List[str],
+                 temperature: float, stop: threading.Event,
+                 on_token: Optional[Callable[[str], None]] = None) -> Optional[Dict]:
+        """Generate and validate one candidate; returns None when cancelled"""
+        if stop.is_set():
+            return None
+        sql = None
+        try:
+            if on_token is None:
+                raw_sql = self.query_generator.generate_sql(prompt, schema_info, temperature=temperature,
+                                                            feedback=feedback)
+            else:
+                raw_sql = self._stream(prompt, schema_info, feedback, temperature, stop, on_token)
+                if raw_sql is None:
+                    return None
+            sql = self.query_generator.clean_sql(raw_sql)
+            with span('sql_engine.validate_local'):
+                errors = validator.validate(sql)
+            if errors:
+                # Rejected locally: no warehouse round-trip
+                return {'sql': sql, 'status': 'rejected', 'error': "; ".join(errors)}
+            if not self._take_connection_slot(stop):
+                return None
+            try:
+                with span('sql_engine.validate_query'):
+                    snowflake_conn = self.connection_factory(session_id=self.session_id)
+                    try:
+                        snowflake_conn.schema_fingerprint = self.schema_fingerprint
+                        # Submitted asynchronously so a winner elsewhere cancels this query in the
+                        # warehouse and hands its pooled connection back right away
+                        result = snowflake_conn.execute_query(self.query_generator._add_limit_clause(sql),
+                                                              cancel_event=stop)
+                    finally:
+                        snowflake_conn.close()
+            finally:
+                self._connection_slots.release()
+            if result.empty:
+                return {'sql': sql, 'status': 'empty', 'error': None}
+            # Let the streamed candidate stop early when a background one wins
+            stop.set()
+            return {'sql': sql, 'status': 'ok', 'error': None}
+        except QueryCancelled:
+            return None
+        except Exception as e:
+            return {'sql': sql, 'status': 'error', 'error': str(e)}
+
+    def _take_connection_slot(self, stop: threading.Event, poll: float = 0.05) -> bool:
+        """Wait for one of ``max_connections`` slots; False once the round is stopped"""
+        while not stop.is_set():
+            if self._connection_slots.acquire(timeout=poll):
+                return True
+        return False
+
+    def _stream(self, prompt: str, schema_info: Dict, feedback: List[str], temperature: float,
+                stop: threading.Event, on_token: Callable[[str], None]) -> Optional[str]:
+        """Stream one candidate, stopping as soon as the statement is complete"""
+        text = ""
+        deltas = self.query_generator.stream_sql(prompt, schema_info, temperature=temperature,
+                                                 feedback=feedback)
+        try:
+            for delta in deltas:
+                text += delta
+                on_token(text)
+                if statement_complete(text):
+                    # Validate now rather than waiting for trailing tokens
+                    break
+                if stop.is_set():
+                    return None
+        finally:
+            deltas.close()
+        return text
@@ -0,0 +1,196 @@
+import sqlparse
+from sqlparse import sql as sql_tokens
+from sqlparse import tokens as T
+from typing import Dict, List
+
+def is_valid_sql(query: str) -> bool:
+    # Basic SQL validation
+    if not query or len(query.strip()) == 0:
+        return False
+
+    # Check for basic SQL structure
+    valid_starts = ['SELECT', 'WITH']
+    if not any(query.strip().upper().startswith(start) for start in valid_starts):
+        return False
+
+    # A single read-only statement: rejects "SELECT 1; DROP TABLE x" and WITH ... DELETE
+    statements = [s for s in sqlparse.parse(query) if s.token_first(skip_cm=True) is not None]
+    return len(statements) == 1 and statements[0].get_type() == 'SELECT'
+
+def statement_complete(text: str) -> bool:
+    """True once streamed model output holds a finished statement.
+
+    A statement is finished at a top-level ``;`` outside quotes, parentheses
+    and ``--`` or ``/* */`` comments, or when a markdown code fence has been
+    closed.
+    """
+    if text.count('```') >= 2:
+        return True
+    body = text.replace('```sql', '').replace('```', '')
+    depth = 0
+    quote = None
+    i = 0
+    while i < len(body):
+        char = body[i]
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in ("'", '"'):
+            quote = char
+        elif body.startswith('--', i):
+            newline = body.find('\n', i)
+            if newline == -1:
+                return False
+            i = newline
+        elif body.startswith('/*', i):
+            end = body.find('*/', i + 2)
+            if end == -1:
+                return False
+            i = end + 1
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        elif char == ';' and depth == 0:
+            return bool(body[:i].strip())
+        i += 1
+    return False
+
+class SQLValidator:
+    """Offline check of generated SQL against the cached schema info.
+
+    Catches non-SELECT statements, unknown tables and unknown columns before
+    a query is sent to the warehouse. Qualified references (``alias.col``)
+    are always checked; unqualified ones only for single-table queries, where
+    they cannot be ambiguous.
+    """
+    def __init__(self, schema_info: Dict):
+        self.tables = {name.upper(): name for name in (schema_info or {})}
+        self.columns = {
+            name.upper(): {col['name'].upper() for col in details.get('columns', [])}
+            for name, details in (schema_info or {}).items()
+        }
+
+    def validate(self, sql: str) -> List[str]:
+        """Return a list of problems; an empty list means the query looks valid"""
+        if not is_valid_sql(sql):
+            return ["Only a single SELECT or WITH statement is allowed"]
+        if not self.tables:
+            return []
+
+        scope = {
+            'aliases': {},     # alias/table name -> schema table name
+            'derived': set(),  # CTE and subquery names
+            'column_aliases': set(),
+            'qualified': [],
+            'unqualified': [],
+            'errors': []
+        }
+        self._walk(sqlparse.parse(sql)[0], scope)
+
+        errors = scope['errors']
+        for qualifier, column in scope['qualified']:
+            table = scope['aliases'].get(qualifier)
+            if table is not None and column not in self.columns[table]:
+                errors.append(f"Column {column} does not exist in table {self.tables[table]}")
+
+        sources = set(scope['aliases'].values())
+        if len(sources) == 1 and not scope['derived']:
+            table = sources.pop()
+            known = self.columns[table] | scope['column_aliases']
+            for column in scope['unqualified']:
+                if column not in known:
+                    errors.append(f"Column {column} does not exist in table {self.tables[table]}")
+
+        # Keep the first occurrence of each message, in order
+        return list(dict.fromkeys(errors))
+
+    def _walk(self, group, scope: Dict):
+        # FROM/JOIN name a table only in a statement or subquery; inside function
+        # arguments they are syntax, as in EXTRACT(YEAR FROM col) or TRIM(' ' FROM col)
+        query_level = isinstance(group, sql_tokens.Statement) or any(t.ttype is T.DML for t in group.tokens)
+        expect_source = False
+        expect_cte = False
+        for token in group.tokens:
+            if token.is_whitespace or token.ttype in T.Comment:
+                continue
+            if token.ttype is T.Keyword.CTE:
+                expect_cte = True
+                continue
+            if token.is_keyword:
+                keyword = token.normalized
+                expect_source = query_level and (keyword == 'FROM' or keyword.endswith('JOIN'))
+                expect_cte = False
+                continue
+
+            if expect_cte and isinstance(token, (sql_tokens.Identifier, sql_tokens.IdentifierList)):
+                for cte in self._identifiers(token):
+                    scope['derived'].add(cte.get_name().upper())
+                    self._walk(cte, scope)
+                continue
+            if expect_source and isinstance(token, (sql_tokens.Identifier, sql_tokens.IdentifierList)):
+                for source in self._identifiers(token):
+                    self._add_source(source, scope)
+                expect_source = False
+                continue
+
+            self._visit(token, scope)
+
+    def _visit(self, token, scope: Dict):
+        if isinstance(token, sql_tokens.Identifier):
+            self._add_reference(token, scope)
+        elif isinstance(token, sql_tokens.Function):
+            # Skip the function name itself, check its arguments and OVER clause
+            for child in token.tokens:
+                if child.is_group and not isinstance(child, sql_tokens.Identifier):
+                    self._visit(child, scope)
+        elif token.is_group:
+            self._walk(token, scope)
+
+    @staticmethod
+    def _identifiers(token) -> List[sql_tokens.Identifier]:
+        if isinstance(token, sql_tokens.IdentifierList):
+            return [t for t in token.get_identifiers() if isinstance(t, sql_tokens.Identifier)]
+        return [token]
+
+    def _add_source(self, source: sql_tokens.Identifier, scope: Dict):
+        alias = source.get_alias()
+        nested = [t for t in source.tokens if isinstance(t, (sql_tokens.Parenthesis, sql_tokens.Function))]
+        if nested:
+            # Subquery or table function: its columns are not in the schema
+            for token in nested:
+                self._visit(token, scope)
+            if alias:
+                scope['derived'].add(alias.upper())
+            return
+
+        name = source.get_real_name().upper()
+        alias = (alias or source.get_real_name()).upper()
+        if name in scope['derived']:
+            scope['derived'].add(alias)
+        elif name in self.tables:
+            scope['aliases'][alias] = name
+            scope['aliases'].setdefault(name, name)
+        else:
+            scope['errors'].append(f"Table {source.get_real_name()} does not exist in the schema")
+
+    def _add_reference(self, identifier: sql_tokens.Identifier, scope: Dict):
+        alias = identifier.get_alias()
+        if alias:
+            scope['column_aliases'].add(alias.upper())
+
+        nested = [t for t in identifier.tokens if t.is_group and not isinstance(t, sql_tokens.Identifier)]
+        if nested:
+            # Expressions such as COUNT(col) AS n: check the columns inside
+            for token in nested:
+                self._visit(token, scope)
+            return
+
+        name = identifier.get_real_name()
+        if not name or name == '*':
+            return
+        parent = identifier.get_parent_name()
+        if parent:
+            scope['qualified'].append((parent.upper(), name.upper()))
+        else:
+            scope['unqualified'].append(name.upper())
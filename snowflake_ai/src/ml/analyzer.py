@@ -1,43 +1,143 @@
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestRegressor
-from sklearn.cluster import KMeans
-import plotly.express as px
-import plotly.graph_objects as go
-import statsmodels.api as sm
-import streamlit as st
-from prophet import Prophet
-from statsmodels.tsa.arima.model import ARIMA
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
+from typing import Dict, Optional
+from ml.downsample import POINT_BUDGET, line_trace, scatter_traces
+from ml.model_store import ModelStore, get_model_store
+from utils.tracing import span
+
+# scikit-learn, statsmodels, Prophet, TensorFlow and plotly are imported inside
+# the methods that use them, so each backend is loaded only when its algorithm
+# is selected and pages that never train a model do not pay for any of them.
+
+class AutoregressiveModel:
+    """Linear autoregressive model fitted with least squares.
+
+    Stands in for the LSTM on short series, where a network does not beat a
+    linear fit and TensorFlow is not worth loading. ``predict`` takes the same
+    (samples, look_back, 1) windows as the Keras model.
+    """
+    def __init__(self, ridge: float = 1e-3):
+        self.ridge = ridge
+        self.coef = None
+
+    def _design(self, X: np.ndarray) -> np.ndarray:
+        X = X.reshape(len(X), -1)
+        return np.hstack([X, np.ones((len(X), 1))])
+
+    def fit(self, X: np.ndarray, y: np.ndarray) -> 'AutoregressiveModel':
+        A = self._design(X)
+        # Small ridge term keeps the solve stable on flat or very short series
+        gram = A.T @ A + self.ridge * np.eye(A.shape[1])
+        self.coef = np.linalg.solve(gram, A.T @ y.reshape(-1))
+        return self
+
+    def predict(self, X: np.ndarray, verbose: int = 0) -> np.ndarray:
+        return (self._design(X) @ self.coef).reshape(-1, 1)
 
 class MLAnalyzer:
-    def __init__(self):
+    # Everything plot_results needs from a trained analyzer
+    STATE_ATTRIBUTES = ('model', 'scaler', 'forecast', 'model_fit', 'look_back', 'labels', 'tradeoff')
+
+    def __init__(self, lstm_look_back: int = 10, lstm_epochs: int = 100, lstm_batch_size: int = 32,
+                 lstm_patience: int = 5, lstm_min_samples: int = 500, fast_mode: bool = False,
+                 sample_size: int = 100_000, k_range: tuple = (2, 8), point_budget: int = POINT_BUDGET):
         self.model = None
-        self.scaler = StandardScaler()
+        self.scaler = None
+        self.forecast = None
+        self.model_fit = None
+        # Cluster of every input row; set by K-Means
+        self.labels = None
+        # Fast mode: what was given up for speed, e.g. {'rows_used', 'rows_total', 'score', ...}
+        self.tradeoff = None
+        self.fast_mode = fast_mode
+        # Fast mode trains Random Forest and searches k on at most this many rows
+        self.sample_size = sample_size
+        self.k_range = k_range
+        # Most points a figure from plot_results sends to the browser
+        self.point_budget = point_budget
+        self.lstm_look_back = lstm_look_back
+        self.lstm_epochs = lstm_epochs
+        self.lstm_batch_size = lstm_batch_size
+        self.lstm_patience = lstm_patience
+        # Series with fewer windows than this use AutoregressiveModel instead of Keras
+        self.lstm_min_samples = lstm_min_samples
+        self.look_back = lstm_look_back
+        # Set by run_analysis when training inside a JobRunner worker
+        self.job = None
+        # Parallelism of Random Forest and the k search; run_analysis caps it at the job's CPU budget
+        self.n_jobs = -1
+        # Model store key of the last train_or_restore
+        self.model_key = None
+
+    @staticmethod
+    def _new_scaler():
+        from sklearn.preprocessing import StandardScaler
+        return StandardScaler()
+
+    def params(self, algorithm: str) -> Dict:
+        """Hyperparameters that change the model trained for ``algorithm``"""
+        if algorithm == 'LSTM':
+            return {'look_back': self.lstm_look_back, 'epochs': self.lstm_epochs,
+                    'batch_size': self.lstm_batch_size, 'patience': self.lstm_patience,
+                    'min_samples': self.lstm_min_samples}
+        if algorithm in ('Random Forest', 'K-Means') and self.fast_mode:
+            return {'fast_mode': True, 'sample_size': self.sample_size, 'k_range': list(self.k_range)}
+        return {}
+
+    def get_state(self) -> Dict:
+        return {name: getattr(self, name, None) for name in self.STATE_ATTRIBUTES}
+
+    def set_state(self, state: Dict):
+        for name in self.STATE_ATTRIBUTES:
+            setattr(self, name, state.get(name))
+
+    def restore(self, df: pd.DataFrame, algorithm: str, target_col: str = None, feature_cols: list = None,
+                store: Optional[ModelStore] = None) -> Optional[Dict]:
+        """Load a previously trained model for this data and configuration.
+
+        Returns ``{'result': ...}`` with what ``train_model`` returned, or
+        None when the analysis has not been run before.
+        """
+        store = store or get_model_store()
+        cached = store.get(store.make_key(df, algorithm, target_col, feature_cols, self.params(algorithm)))
+        if cached is None:
+            return None
+        self.set_state(cached['state'])
+        return {'result': cached['result']}
+
+    def train_or_restore(self, df: pd.DataFrame, algorithm: str, target_col: str = None,
+                         feature_cols: list = None, store: Optional[ModelStore] = None):
+        """``train_model`` through the model store"""
+        store = store or get_model_store()
+        self.model_key = store.make_key(df, algorithm, target_col, feature_cols, self.params(algorithm))
+        with span('ml.restore_model', algorithm=algorithm) as current:
+            restored = self.restore(df, algorithm, target_col, feature_cols, store)
+            current.set(hit=restored is not None)
+        if restored is not None:
+            return restored['result']
+        with span('ml.train_model', algorithm=algorithm, rows=len(df)):
+            result = self.train_model(df, algorithm, target_col, feature_cols)
+        store.put(self.model_key, {'state': self.get_state(), 'result': result})
+        return result
 
     def train_model(self, df: pd.DataFrame, algorithm: str, target_col: str = None, feature_cols: list = None):
         if algorithm in ['Prophet', 'ARIMA', 'LSTM']:
             # Ensure proper DataFrame format for time series
-            #st.dataframe(df.head())
-            st.write("feat cols: ", feature_cols)
-            st.write("target col: ", target_col)
-            st.write(df[feature_cols])
             ts_df = pd.DataFrame({
                 'ds': pd.to_datetime(df[feature_cols]),  
                 'y': df[target_col]
             }).sort_values('ds')
-            st.dataframe(ts_df)
             
             if algorithm == 'Prophet':
+                from prophet import Prophet
                 self.model = Prophet(
                     daily_seasonality=True,
                     weekly_seasonality=True,
                     yearly_seasonality=True
                 )
+                self._checkpoint(0.1, "Fitting Prophet")
                 self.model.fit(ts_df)
+                self._checkpoint(0.7, "Forecasting")
                 
                 # Make predictions
                 future = self.model.make_future_dataframe(periods=30)
@@ -45,8 +145,11 @@ class MLAnalyzer:
                 return self.forecast
                 
             elif algorithm == 'ARIMA':
+                from statsmodels.tsa.arima.model import ARIMA
                 self.model = ARIMA(ts_df['y'].values, order=(1,1,1))
+                self._checkpoint(0.1, "Fitting ARIMA")
                 self.model_fit = self.model.fit()
+                self._checkpoint(0.8, "Forecasting")
                 self.forecast = pd.DataFrame({
                     'ds': ts_df['ds'],
                     'yhat': self.model_fit.fittedvalues
@@ -54,32 +157,10 @@ class MLAnalyzer:
                 return self.forecast
                 
             elif algorithm == 'LSTM':
-                # Prepare data for LSTM
-                values = ts_df['y'].values.reshape(-1, 1)
-                self.scaler = StandardScaler()
-                scaled = self.scaler.fit_transform(values)
-                
-                # Create sequences
-                X, y = [], []
-                for i in range(len(scaled) - 1):
-                    X.append(scaled[i:i+1])
-                    y.append(scaled[i + 1])
-                X = np.array(X)
-                y = np.array(y)
-                
-                # Build and train LSTM model
-                self.model = Sequential([
-                    LSTM(50, input_shape=(1, 1), return_sequences=False),
-                    Dense(1)
-                ])
-                self.model.compile(optimizer='adam', loss='mse')
-                self.model.fit(X, y, epochs=100, batch_size=1, verbose=0)
-                
-                # Make predictions
-                predictions = self.model.predict(X)
+                predictions = self._fit_lstm(ts_df['y'].values)
                 self.forecast = pd.DataFrame({
-                    'ds': ts_df['ds'],
-                    'yhat': self.scaler.inverse_transform(predictions).flatten()
+                    'ds': ts_df['ds'].iloc[self.look_back:].values,
+                    'yhat': predictions
                 })
                 return self.forecast
         else:
@@ -102,7 +183,16 @@ class MLAnalyzer:
             elif algorithm == 'K-Means':
                 return self._train_kmeans(X)
 
+    def _checkpoint(self, fraction: float, message: str):
+        """Report progress and stop if the job was cancelled; does nothing outside JobRunner"""
+        if self.job is not None:
+            self.job.report(fraction, message)
+            self.job.check()
+
     def _train_linear_regression(self, X, y):
+        import statsmodels.api as sm
+        from sklearn.model_selection import train_test_split
+        self.scaler = self._new_scaler()
         X_scaled = self.scaler.fit_transform(X)
         X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2)
         
@@ -117,16 +207,95 @@ class MLAnalyzer:
         return self.model.rsquared
 
     def _train_random_forest(self, X, y):
+        from sklearn.model_selection import train_test_split
+        self.scaler = self._new_scaler()
         X_scaled = self.scaler.fit_transform(X)
         X_train, X_test, y_train, y_test = train_test_split(X_scaled, y, test_size=0.2)
-        self.model = RandomForestRegressor(n_estimators=100)
-        self.model.fit(X_train, y_train)
-        return self.model.score(X_test, y_test)
+        self.tradeoff = None
+        if not self.fast_mode or len(X_train) <= self.sample_size:
+            self.model = self._fit_forest(X_train, y_train, 0.1, 0.85)
+            return self.model.score(X_test, y_test)
+
+        rows = self._stratified_sample(np.asarray(y_train), self.sample_size)
+        # Half-size model for a learning-curve estimate of the score lost by sampling
+        half_model = self._fit_forest(X_train[rows[::2]], np.asarray(y_train)[rows[::2]], 0.1, 0.3)
+        self.model = self._fit_forest(X_train[rows], np.asarray(y_train)[rows], 0.3, 0.85)
+        score = self.model.score(X_test, y_test)
+        half_score = half_model.score(X_test, y_test)
+        self.tradeoff = {
+            'rows_used': len(rows),
+            'rows_total': len(X_train),
+            'score': score,
+            'half_sample_score': half_score,
+            # Doubling the sample gained this much; more data is unlikely to gain more than that again
+            'estimated_score_loss': max(0.0, score - half_score)
+        }
+        return score
+
+    def _fit_forest(self, X, y, start: float, end: float, n_estimators: int = 100, step: int = 10):
+        """Random forest grown ``step`` trees at a time inside a job, so cancelling stops between batches"""
+        from sklearn.ensemble import RandomForestRegressor
+        step = step if self.job is not None else n_estimators
+        model = RandomForestRegressor(n_estimators=min(step, n_estimators), n_jobs=self.n_jobs, warm_start=True)
+        while True:
+            model.fit(X, y)
+            grown = model.n_estimators
+            self._checkpoint(start + (end - start) * grown / n_estimators,
+                             f"Random Forest: {grown}/{n_estimators} trees")
+            if grown >= n_estimators:
+                return model
+            model.n_estimators = min(n_estimators, grown + step)
+
+    @staticmethod
+    def _stratified_sample(y: np.ndarray, size: int, bins: int = 10, seed: int = 0) -> np.ndarray:
+        """Row positions of a sample that keeps the target's distribution across quantile bins"""
+        rng = np.random.default_rng(seed)
+        strata = pd.qcut(pd.Series(y).rank(method='first'), q=bins, labels=False).to_numpy()
+        fraction = size / len(y)
+        rows = [
+            rng.choice(members, size=max(1, int(round(len(members) * fraction))), replace=False)
+            for members in (np.flatnonzero(strata == s) for s in range(bins)) if len(members)
+        ]
+        return np.sort(np.concatenate(rows))
 
     def _train_kmeans(self, X):
+        self.scaler = self._new_scaler()
         X_scaled = self.scaler.fit_transform(X)
-        self.model = KMeans(n_clusters=3)
-        return self.model.fit_predict(X_scaled)
+        self.tradeoff = None
+        self._checkpoint(0.1, "Clustering")
+        if not self.fast_mode:
+            from sklearn.cluster import KMeans
+            self.model = KMeans(n_clusters=3)
+            self.labels = self.model.fit_predict(X_scaled)
+            return self.labels
+
+        from joblib import Parallel, delayed
+        from sklearn.cluster import KMeans, MiniBatchKMeans
+
+        rng = np.random.default_rng(0)
+        sample = X_scaled[rng.choice(len(X_scaled), size=min(len(X_scaled), self.sample_size), replace=False)]
+        k_values = list(range(self.k_range[0], self.k_range[1] + 1))
+        silhouettes = Parallel(n_jobs=self.n_jobs)(delayed(_silhouette_for_k)(sample, k) for k in k_values)
+        best_k = k_values[int(np.argmax(silhouettes))]
+        self._checkpoint(0.4, f"Clustering all rows with k={best_k}")
+
+        self.model = MiniBatchKMeans(n_clusters=best_k, batch_size=4096, n_init=3, random_state=0)
+        self.model.fit(X_scaled)
+        # Labels for every row, not only those seen in the last mini-batch
+        self.labels = self.model.predict(X_scaled)
+        self._checkpoint(0.7, "Comparing against full K-Means")
+
+        # Compare against full-batch KMeans on the sample to report what mini-batches cost
+        exact = KMeans(n_clusters=best_k, n_init=3, random_state=0).fit(sample)
+        approx_inertia = float(-self.model.score(sample))
+        self.tradeoff = {
+            'rows_used': len(sample),
+            'rows_total': len(X_scaled),
+            'k': best_k,
+            'silhouette_by_k': dict(zip(k_values, [float(v) for v in silhouettes])),
+            'inertia_increase': approx_inertia / exact.inertia_ - 1 if exact.inertia_ else 0.0
+        }
+        return self.labels
 
     def _train_time_series(self, df: pd.DataFrame, algorithm: str, target_col: str, date_col: str) -> dict:
         # Convert to datetime
@@ -140,6 +309,7 @@ class MLAnalyzer:
         }).sort_values('ds')
         
         if algorithm == 'Prophet':
+            from prophet import Prophet
             model = Prophet(
                 daily_seasonality=True,
                 weekly_seasonality=True,
@@ -160,50 +330,84 @@ class MLAnalyzer:
             }
 
         elif algorithm == 'ARIMA':
+            from statsmodels.tsa.arima.model import ARIMA
             self.model = ARIMA(prophet_df['y'], order=(1,1,1))
             self.model_fit = self.model.fit()
             return self.model_fit.fittedvalues
 
         elif algorithm == 'LSTM':
-            # Prepare data for LSTM
-            values = prophet_df['y'].values.reshape(-1, 1)
-            scaled = self.scaler.fit_transform(values)
-            X, y = self._prepare_lstm_data(scaled, look_back=1)
-            
-            # Build LSTM model
+            return self._fit_lstm(prophet_df['y'].values)
+
+    def _prepare_lstm_data(self, data, look_back=1):
+        """Sliding windows of ``look_back`` values and the value that follows each"""
+        windows = np.lib.stride_tricks.sliding_window_view(np.asarray(data).ravel(), look_back + 1)
+        return windows[:, :-1].reshape(-1, look_back, 1), windows[:, -1:]
+
+    def _fit_lstm(self, values: np.ndarray) -> np.ndarray:
+        """Fit the LSTM (or the NumPy fallback) on a series.
+
+        Returns one-step-ahead predictions for every point after the first
+        ``self.look_back``, in the series' original units.
+        """
+        values = np.asarray(values, dtype=float).reshape(-1, 1)
+        if len(values) < 3:
+            raise ValueError("LSTM needs at least 3 observations")
+        self.look_back = max(1, min(self.lstm_look_back, len(values) // 2))
+        self.scaler = self._new_scaler()
+        scaled = self.scaler.fit_transform(values)
+        X, y = self._prepare_lstm_data(scaled, look_back=self.look_back)
+
+        if len(X) < self.lstm_min_samples:
+            self.model = AutoregressiveModel().fit(X, y)
+        else:
+            from tensorflow.keras.callbacks import EarlyStopping
+            from tensorflow.keras.layers import LSTM, Dense
+            from tensorflow.keras.models import Sequential
+
             self.model = Sequential([
-                LSTM(50, input_shape=(1, 1)),
+                LSTM(50, input_shape=(self.look_back, 1)),
                 Dense(1)
             ])
             self.model.compile(optimizer='adam', loss='mse')
-            self.model.fit(X, y, epochs=100, batch_size=1, verbose=0)
-            return self.model.predict(X)
+            callbacks = [EarlyStopping(monitor='val_loss', patience=self.lstm_patience,
+                                       restore_best_weights=True)]
+            if self.job is not None:
+                from tensorflow.keras.callbacks import LambdaCallback
+                callbacks.append(LambdaCallback(on_epoch_end=lambda epoch, logs: self._epoch_done(epoch)))
+            self.model.fit(
+                X, y,
+                epochs=self.lstm_epochs,
+                batch_size=self.lstm_batch_size,
+                validation_split=0.1,
+                callbacks=callbacks,
+                verbose=0
+            )
+        predictions = self.model.predict(X, verbose=0)
+        return self.scaler.inverse_transform(predictions).flatten()
 
-    def _prepare_lstm_data(self, data, look_back=1):
-        X, y = [], []
-        for i in range(len(data) - look_back):
-            X.append(data[i:(i + look_back)])
-            y.append(data[i + look_back])
-        return np.array(X).reshape(-1, look_back, 1), np.array(y)
+    def _epoch_done(self, epoch: int):
+        self._checkpoint(0.1 + 0.8 * (epoch + 1) / self.lstm_epochs, f"Epoch {epoch + 1}/{self.lstm_epochs}")
 
     def plot_results(self, df: pd.DataFrame, algorithm: str, target_col: str = None, feature_cols: list = None):
         if algorithm in ['Prophet', 'ARIMA', 'LSTM']:
+            import plotly.graph_objects as go
             fig = go.Figure()
             
             # Plot actual values
-            fig.add_trace(go.Scatter(
-                x=df[feature_cols],
-                y=df[target_col],
+            fig.add_trace(line_trace(
+                df[feature_cols],
+                df[target_col],
                 name='Actual',
+                point_budget=self.point_budget // 2,
                 mode='markers+lines'
             ))
             
             # Plot predictions
-            fig.add_trace(go.Scatter(
-                x=self.forecast['ds'],
-                y=self.forecast['yhat'],
+            fig.add_trace(line_trace(
+                self.forecast['ds'],
+                self.forecast['yhat'],
                 name='Forecast',
-                mode='lines',
+                point_budget=self.point_budget // 2,
                 line=dict(dash='dash')
             ))
             
@@ -226,17 +430,22 @@ class MLAnalyzer:
                 return self._plot_clusters(df, feature_cols)
 
     def _plot_regression(self, df, target_col, feature_col):
+        import plotly.graph_objects as go
+        import statsmodels.api as sm
         X = df[[feature_col]]
         X_sm = sm.add_constant(self.scaler.transform(X))
         predictions = self.model.predict(X_sm)
 
-        fig = px.scatter(df, x=feature_col, y=target_col, 
-                        title=f'{target_col} vs {feature_col}')
+        fig = go.Figure(scatter_traces(df[feature_col], df[target_col], name=target_col,
+                                       point_budget=self.point_budget))
+        fig.update_layout(title=f'{target_col} vs {feature_col}', xaxis_title=feature_col,
+                          yaxis_title=target_col)
         fig.add_traces(
-            go.Scatter(
-                x=df[feature_col],
-                y=predictions,
+            line_trace(
+                df[feature_col],
+                predictions,
                 name='Regression Line',
+                point_budget=self.point_budget // 10,
                 line=dict(color='red')
             )
         )
@@ -260,6 +469,7 @@ class MLAnalyzer:
         return fig
 
     def _plot_feature_importance(self, feature_cols):
+        import plotly.express as px
         importances = pd.DataFrame({
             'feature': feature_cols,
             'importance': self.model.feature_importances_
@@ -269,28 +479,27 @@ class MLAnalyzer:
                      title='Feature Importance')
 
     def _plot_clusters(self, df, feature_cols):
+        import plotly.graph_objects as go
         if len(feature_cols) < 2:
             feature_cols = feature_cols * 2  # Duplicate single feature for visualization
         
-        df_plot = df.copy()
-        df_plot['Cluster'] = self.model.labels_
-        
-        return px.scatter(
-            df_plot, 
-            x=feature_cols[0], 
-            y=feature_cols[1],
-            color='Cluster',
-            title='K-Means Clustering Results'
-        )
+        labels = self.labels if self.labels is not None else self.model.labels_
+        fig = go.Figure(scatter_traces(df[feature_cols[0]], df[feature_cols[1]], name='Cluster',
+                                       point_budget=self.point_budget, color=labels))
+        fig.update_layout(title='K-Means Clustering Results', xaxis_title=feature_cols[0],
+                          yaxis_title=feature_cols[1])
+        return fig
 
     def _plot_time_series(self, df, algorithm, target_col, date_col):
+        import plotly.graph_objects as go
         fig = go.Figure()
         
         # Plot actual values
-        fig.add_trace(go.Scatter(
-            x=df[date_col],
-            y=df[target_col],
+        fig.add_trace(line_trace(
+            df[date_col],
+            df[target_col],
             name='Actual',
+            point_budget=self.point_budget // 2,
             mode='lines+markers'
         ))
         
@@ -310,36 +519,37 @@ class MLAnalyzer:
             fig = go.Figure()
             
             # Plot actual values
-            fig.add_trace(go.Scatter(
-                x=df[date_col],
-                y=df[target_col],
+            fig.add_trace(line_trace(
+                df[date_col],
+                df[target_col],
                 name='Actual',
+                point_budget=self.point_budget // 4,
                 mode='markers+lines'
             ))
             
             # Plot predictions
-            fig.add_trace(go.Scatter(
-                x=forecast['ds'],
-                y=forecast['yhat'],
+            fig.add_trace(line_trace(
+                forecast['ds'],
+                forecast['yhat'],
                 name='Forecast',
-                mode='lines',
+                point_budget=self.point_budget // 4,
                 line=dict(dash='dash')
             ))
             
             # Add confidence intervals
-            fig.add_trace(go.Scatter(
-                x=forecast['ds'],
-                y=forecast['yhat_upper'],
+            fig.add_trace(line_trace(
+                forecast['ds'],
+                forecast['yhat_upper'],
+                point_budget=self.point_budget // 4,
                 fill=None,
-                mode='lines',
                 line=dict(color='rgba(0,100,80,0.2)'),
                 name='Upper Bound'
             ))
-            fig.add_trace(go.Scatter(
-                x=forecast['ds'],
-                y=forecast['yhat_lower'],
+            fig.add_trace(line_trace(
+                forecast['ds'],
+                forecast['yhat_lower'],
+                point_budget=self.point_budget // 4,
                 fill='tonexty',
-                mode='lines',
                 line=dict(color='rgba(0,100,80,0.2)'),
                 name='Lower Bound'
             ))
@@ -353,12 +563,19 @@ class MLAnalyzer:
             return fig
             
         elif algorithm in ['ARIMA', 'LSTM']:
-            predictions = self.model_fit.fittedvalues if algorithm == 'ARIMA' else self.model.predict(df[target_col].values.reshape(-1,1,1))
-            fig.add_trace(go.Scatter(
-                x=df[date_col],
-                y=predictions,
+            dates = df[date_col]
+            if algorithm == 'ARIMA':
+                predictions = self.model_fit.fittedvalues
+            else:
+                X, _ = self._prepare_lstm_data(
+                    self.scaler.transform(df[target_col].values.reshape(-1, 1)), look_back=self.look_back)
+                predictions = self.scaler.inverse_transform(self.model.predict(X, verbose=0)).flatten()
+                dates = dates.iloc[self.look_back:]
+            fig.add_trace(line_trace(
+                dates,
+                predictions,
                 name='Forecast',
-                mode='lines'
+                point_budget=self.point_budget // 2
             ))
         
         fig.update_layout(
@@ -367,3 +584,32 @@ class MLAnalyzer:
             yaxis_title=target_col
         )
         return fig
+
+def _silhouette_for_k(sample: np.ndarray, k: int) -> float:
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.metrics import silhouette_score
+
+    labels = MiniBatchKMeans(n_clusters=k, batch_size=4096, n_init=3, random_state=0).fit_predict(sample)
+    if len(set(labels)) < 2:
+        return -1.0
+    return silhouette_score(sample, labels, sample_size=min(len(sample), 10000), random_state=0)
+
+def run_analysis(job, df: pd.DataFrame, algorithm: str, target_col: str, feature_cols, **analyzer_options) -> Dict:
+    """JobRunner entry point: train ``algorithm`` and build its figure in a worker process"""
+    from threadpoolctl import threadpool_limits
+
+    analyzer = MLAnalyzer(**analyzer_options)
+    analyzer.job = job
+    # Sibling jobs share the machine: keep joblib workers and BLAS/OpenMP threads to this job's share
+    analyzer.n_jobs = job.cpu_budget
+    job.report(0.05, f"Training {algorithm}")
+    with threadpool_limits(limits=job.cpu_budget):
+        result = analyzer.train_or_restore(df, algorithm, target_col=target_col, feature_cols=feature_cols)
+    job.check()
+    job.report(0.9, "Plotting results")
+    with span('ml.plot_results', algorithm=algorithm):
+        fig = analyzer.plot_results(df, algorithm, target_col=target_col, feature_cols=feature_cols)
+    # The trained model goes back to the app too, so its in-memory model tier is filled
+    return {'score': result if isinstance(result, float) else None, 'figure': fig,
+            'tradeoff': analyzer.tradeoff, 'model_key': analyzer.model_key,
+            'model_entry': ModelStore.encode({'state': analyzer.get_state(), 'result': result})}
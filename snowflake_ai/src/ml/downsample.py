@@ -0,0 +1,120 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Most points a single figure sends to the browser
+POINT_BUDGET = 10_000
+# Above this many points a trace is drawn with WebGL instead of SVG
+SVG_POINT_LIMIT = 2_000
+
+def _as_float(values) -> np.ndarray:
+    """Numeric view of an axis for geometry; datetimes become nanoseconds"""
+    series = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        if getattr(series.dt, 'tz', None) is not None:
+            series = series.dt.tz_convert(None)
+        return series.astype('int64').to_numpy(dtype=float)
+    return pd.to_numeric(series, errors='coerce').to_numpy(dtype=float)
+
+def _is_numeric(values) -> bool:
+    series = pd.Series(values)
+    return pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series)
+
+def lttb(x, y, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: positions of ``n_out`` points that keep the line's shape.
+
+    ``x`` must be sorted. The first and last points are always kept.
+    """
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:max(n_out, 0)], dtype=np.int64)
+    xs = _as_float(x)
+    xs = xs - xs[0]
+    ys = _as_float(y)
+    # n_out - 2 buckets between the fixed first and last points
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = xs[next_start:next_end].mean()
+        avg_y = ys[next_start:next_end].mean()
+        # Twice the triangle area between the last kept point, each candidate and the next bucket's mean
+        area = np.abs((xs[a] - avg_x) * (ys[start:end] - ys[a]) - (xs[a] - xs[start:end]) * (avg_y - ys[a]))
+        a = start + int(np.nanargmax(area)) if not np.isnan(area).all() else start
+        selected[i + 1] = a
+    return selected
+
+def _scatter_class(points: int):
+    import plotly.graph_objects as go
+    return go.Scattergl if points > SVG_POINT_LIMIT else go.Scatter
+
+def line_trace(x, y, name: str, point_budget: int = POINT_BUDGET, **kwargs):
+    """Line trace sorted by x and reduced with LTTB to at most ``point_budget`` points"""
+    frame = pd.DataFrame({'x': np.asarray(x), 'y': np.asarray(y)}).dropna()
+    if _is_numeric(frame['x']):
+        frame = frame.sort_values('x', kind='stable')
+    if len(frame) > point_budget and _is_numeric(frame['x']) and _is_numeric(frame['y']):
+        frame = frame.iloc[lttb(frame['x'].to_numpy(), frame['y'].to_numpy(), point_budget)]
+    elif len(frame) > point_budget:
+        frame = frame.iloc[np.linspace(0, len(frame) - 1, point_budget).astype(np.int64)]
+    trace = _scatter_class(len(frame))
+    kwargs.setdefault('mode', 'lines')
+    return trace(x=frame['x'], y=frame['y'], name=name, **kwargs)
+
+def scatter_traces(x, y, name: str, point_budget: int = POINT_BUDGET, color=None) -> List:
+    """Scatter traces holding at most ``point_budget`` points in total.
+
+    Small inputs are drawn as-is. Larger numeric inputs without ``color`` are
+    binned into a 2-D density grid; otherwise each color group is sampled
+    down proportionally and drawn with WebGL.
+    """
+    frame = pd.DataFrame({'x': np.asarray(x), 'y': np.asarray(y)})
+    if color is not None:
+        frame['color'] = np.asarray(color)
+    frame = frame.dropna(subset=['x', 'y'])
+    if color is None and len(frame) > point_budget and _is_numeric(frame['x']) and _is_numeric(frame['y']):
+        return [density_trace(frame['x'], frame['y'], name, point_budget)]
+
+    groups = [(name, frame)] if color is None else [
+        (f"{name} {value}", group) for value, group in frame.groupby('color', sort=True)
+    ]
+    traces = []
+    for group_name, group in groups:
+        budget = max(1, int(point_budget * len(group) / max(len(frame), 1)))
+        if len(group) > budget:
+            group = group.sample(n=budget, random_state=0).sort_index()
+        trace = _scatter_class(min(len(frame), point_budget))
+        traces.append(trace(x=group['x'], y=group['y'], name=group_name, mode='markers'))
+    return traces
+
+def density_trace(x, y, name: str, point_budget: int = POINT_BUDGET, bins: Optional[int] = None):
+    """Non-empty cells of a 2-D histogram, drawn as markers colored by count"""
+    xs, ys = _as_float(x), _as_float(y)
+    bins = bins or max(2, int(np.sqrt(point_budget)))
+    counts, x_edges, y_edges = np.histogram2d(xs, ys, bins=bins)
+    cell_x, cell_y = np.nonzero(counts)
+    x_centers = (x_edges[:-1] + x_edges[1:]) / 2
+    y_centers = (y_edges[:-1] + y_edges[1:]) / 2
+    x_values = x_centers[cell_x]
+    if pd.api.types.is_datetime64_any_dtype(pd.Series(x)):
+        x_values = pd.to_datetime(x_values.astype(np.int64))
+    y_values = y_centers[cell_y]
+    if pd.api.types.is_datetime64_any_dtype(pd.Series(y)):
+        y_values = pd.to_datetime(y_values.astype(np.int64))
+    trace = _scatter_class(len(cell_x))
+    return trace(
+        x=x_values,
+        y=y_values,
+        name=f"{name} (density)",
+        mode='markers',
+        marker=dict(color=counts[cell_x, cell_y], colorscale='Viridis', showscale=True,
+                    colorbar=dict(title='Rows')),
+        text=[f"{int(c)} rows" for c in counts[cell_x, cell_y]],
+        hovertemplate='%{x}, %{y}: %{text}<extra></extra>'
+    )
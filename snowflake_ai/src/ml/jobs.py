@@ -0,0 +1,199 @@
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from utils.tracing import current_page, set_page, span
+
+class JobCancelled(Exception):
+    """Raised inside a job when its cancellation was requested"""
+
+class JobContext:
+    """Handed to every job function for progress reporting and cancellation checks"""
+    def __init__(self, job_id: str, progress, cancel_requests, cpu_budget: int = 1):
+        self.job_id = job_id
+        # Cores this job may use without oversubscribing the machine, see JobRunner
+        self.cpu_budget = cpu_budget
+        self._progress = progress
+        self._cancel_requests = cancel_requests
+
+    def report(self, fraction: float, message: str = ""):
+        self._progress[self.job_id] = {'fraction': max(0.0, min(1.0, fraction)), 'message': message}
+
+    def cancelled(self) -> bool:
+        return self.job_id in self._cancel_requests
+
+    def check(self):
+        """Stop the job at a safe point if cancellation was requested"""
+        if self.cancelled():
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+def _run_job(job_id: str, fn: Callable, args: tuple, kwargs: Dict, progress, cancel_requests,
+             results_dir: str, page: Optional[str] = None, cpu_budget: int = 1) -> str:
+    """Worker-process entry point: run ``fn`` and pickle its outcome to disk"""
+    job = JobContext(job_id, progress, cancel_requests, cpu_budget)
+    # Spans recorded by the job count towards the page that submitted it
+    set_page(page)
+    try:
+        job.check()
+        with span('ml.job', job_id=job_id, function=getattr(fn, '__name__', str(fn))):
+            result = fn(job, *args, **kwargs)
+        outcome = {'status': 'done', 'result': result, 'error': None}
+    except JobCancelled:
+        outcome = {'status': 'cancelled', 'result': None, 'error': None}
+    except Exception as e:
+        outcome = {'status': 'failed', 'result': None, 'error': f"{str(e)}\n{traceback.format_exc()}"}
+    outcome['finished'] = time.time()
+    path = os.path.join(results_dir, f"{job_id}.pkl")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(outcome, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+    return outcome['status']
+
+class JobRunner:
+    """Run long analyses in worker processes so the Streamlit script never blocks.
+
+    Jobs are identified by an ID the page keeps in ``st.session_state``. Job
+    functions take a ``JobContext`` first and may call ``report`` and
+    ``check`` on it. Outcomes are pickled to ``results_dir``, so a job's
+    result is still available after reruns or a restart of the app.
+
+    The pool already runs ``max_workers`` jobs in parallel, so each job gets
+    ``cpu_count // max_workers`` cores (``JobContext.cpu_budget``) for its
+    own threads and processes.
+    """
+    def __init__(self, max_workers: Optional[int] = None,
+                 results_dir: str = os.path.join('.cache', 'ml_jobs'),
+                 result_ttl: int = 24 * 3600):
+        self.results_dir = results_dir
+        self.result_ttl = result_ttl
+        os.makedirs(results_dir, exist_ok=True)
+        # Forking a Streamlit server with live threads is unsafe; start clean interpreters
+        context = multiprocessing.get_context('spawn')
+        self._manager = context.Manager()
+        self._progress = self._manager.dict()
+        self._cancel_requests = self._manager.dict()
+        max_workers = max_workers or os.cpu_count() or 1
+        self.cpu_budget = max(1, (os.cpu_count() or 1) // max_workers)
+        self._executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
+        self._jobs: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._prune_results()
+
+    def submit(self, fn: Callable, *args, label: str = "", **kwargs) -> str:
+        """Queue ``fn(job_context, *args, **kwargs)``; returns the job ID"""
+        job_id = uuid.uuid4().hex[:12]
+        future = self._executor.submit(_run_job, job_id, fn, args, kwargs, self._progress,
+                                       self._cancel_requests, self.results_dir, current_page(), self.cpu_budget)
+        with self._lock:
+            self._jobs[job_id] = {'future': future, 'label': label, 'submitted': time.time()}
+        return job_id
+
+    def status(self, job_id: str) -> Dict:
+        """{'id', 'label', 'status', 'fraction', 'message', 'error', 'elapsed'} for a job.
+
+        ``status`` is one of queued, running, done, failed, cancelled or unknown.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        progress = self._progress.get(job_id) or {'fraction': 0.0, 'message': ''}
+        info = {'id': job_id, 'label': job['label'] if job else '', 'fraction': progress['fraction'],
+                'message': progress['message'], 'error': None, 'elapsed': None}
+
+        if job is not None and not job['future'].done():
+            info['status'] = 'running' if job['future'].running() else 'queued'
+            if job_id in self._cancel_requests:
+                info['message'] = 'Cancelling...'
+            info['elapsed'] = time.time() - job['submitted']
+            return info
+
+        outcome = self._load(job_id)
+        if outcome is None:
+            if job is not None and job['future'].cancelled():
+                info['status'] = 'cancelled'
+            elif job is not None and job['future'].exception() is not None:
+                # The worker died before it could write its outcome
+                info.update({'status': 'failed', 'error': str(job['future'].exception())})
+            else:
+                info['status'] = 'unknown'
+            return info
+        info.update({'status': outcome['status'], 'error': outcome['error']})
+        if outcome['status'] == 'done':
+            info['fraction'] = 1.0
+        if job is not None:
+            info['elapsed'] = outcome['finished'] - job['submitted']
+        return info
+
+    def result(self, job_id: str) -> Any:
+        """Result of a finished job, read back from disk"""
+        outcome = self._load(job_id)
+        if outcome is None or outcome['status'] != 'done':
+            raise Exception(f"Job {job_id} has no result")
+        return outcome['result']
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued job, or ask a running one to stop at its next check"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job['future'].done():
+            return False
+        if job['future'].cancel():
+            return True
+        self._cancel_requests[job_id] = True
+        return True
+
+    def active_jobs(self) -> List[str]:
+        with self._lock:
+            return [job_id for job_id, job in self._jobs.items() if not job['future'].done()]
+
+    def forget(self, job_id: str):
+        """Drop a finished job and its persisted result"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        self._progress.pop(job_id, None)
+        self._cancel_requests.pop(job_id, None)
+        try:
+            os.remove(self._path(job_id))
+        except FileNotFoundError:
+            pass
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._manager.shutdown()
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.results_dir, f"{job_id}.pkl")
+
+    def _load(self, job_id: str) -> Optional[Dict]:
+        try:
+            with open(self._path(job_id), 'rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _prune_results(self):
+        cutoff = time.time() - self.result_ttl
+        for name in os.listdir(self.results_dir):
+            path = os.path.join(self.results_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError as e:
+                print(f"Job result cleanup error: {str(e)}")
+
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+def get_job_runner() -> JobRunner:
+    """Return the process-wide job runner, created on first use"""
+    global _job_runner
+    with _job_runner_lock:
+        if _job_runner is None:
+            max_workers = os.getenv('ML_JOB_WORKERS')
+            _job_runner = JobRunner(max_workers=int(max_workers) if max_workers else None)
+        return _job_runner
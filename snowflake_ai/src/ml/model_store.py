@@ -0,0 +1,239 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Union
+
+import pandas as pd
+
+class SavedModel:
+    """Picklable stand-in for a model that pickle cannot handle reliably.
+
+    Keras models are kept as the bytes of an HDF5 file written by
+    ``model.save`` and Prophet models as ``model_to_json`` output.
+    ``ModelStore.decode`` turns it back into the model.
+    """
+    def __init__(self, kind: str, payload: Union[bytes, str]):
+        self.kind = kind
+        self.payload = payload
+
+    @classmethod
+    def wrap(cls, model: Any) -> Optional['SavedModel']:
+        module = type(model).__module__
+        if module.startswith(('keras', 'tensorflow')) and hasattr(model, 'save'):
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, 'model.h5')
+                model.save(path)
+                with open(path, 'rb') as f:
+                    return cls('keras', f.read())
+        if module.startswith('prophet'):
+            from prophet.serialize import model_to_json
+            return cls('prophet', model_to_json(model))
+        return None
+
+    def load(self) -> Any:
+        if self.kind == 'keras':
+            from tensorflow.keras.models import load_model
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                path = os.path.join(tmp_dir, 'model.h5')
+                with open(path, 'wb') as f:
+                    f.write(self.payload)
+                return load_model(path)
+        if self.kind == 'prophet':
+            from prophet.serialize import model_from_json
+            return model_from_json(self.payload)
+        raise ValueError(f"Unknown saved model kind: {self.kind}")
+
+class ModelStore:
+    """Two-tier (memory, then pickle on disk) cache of trained models.
+
+    Keys hash the values of the columns a model was trained on together with
+    the algorithm, the column roles and the hyperparameters, so re-running
+    the same analysis on the same data restores the model instead of
+    retraining it. The disk tier is shared by the app and JobRunner workers;
+    models trained in a worker reach the app's memory tier through
+    ``remember``. Keras and Prophet models are stored in their own formats
+    (see ``SavedModel``) because pickling them often fails.
+    """
+    def __init__(self, cache_dir: str = os.path.join('.cache', 'models'),
+                 max_memory_entries: int = 32,
+                 max_disk_bytes: int = 1024 * 1024 * 1024,
+                 ttl: timedelta = timedelta(days=7)):
+        self.cache_dir = cache_dir
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(df: pd.DataFrame, algorithm: str, target_col: Optional[str],
+                 feature_cols: Union[str, List[str], None], params: Optional[Dict] = None) -> str:
+        if isinstance(feature_cols, str):
+            feature_cols = [feature_cols]
+        columns = list(dict.fromkeys([c for c in [target_col] + list(feature_cols or []) if c is not None]))
+        digest = hashlib.sha256()
+        # Row order matters for time series, the index does not
+        digest.update(pd.util.hash_pandas_object(df[columns], index=False).values.tobytes())
+        digest.update(json.dumps({
+            'algorithm': algorithm,
+            'target': target_col,
+            'features': feature_cols,
+            'dtypes': [str(df[c].dtype) for c in columns],
+            'params': params or {}
+        }, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            value = None
+            if entry is not None:
+                value, stored_at = entry
+                if now - stored_at <= self.ttl.total_seconds():
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                else:
+                    del self._memory[key]
+                    value = None
+        if value is not None:
+            decoded = self.decode(value)
+            if decoded is not value:
+                # Entries handed over by ``remember`` are rebuilt once, on first use
+                with self._lock:
+                    if key in self._memory:
+                        self._memory[key] = (decoded, self._memory[key][1])
+            return decoded
+
+        value = self._read_disk(key, now)
+        with self._lock:
+            if value is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['disk_hits'] += 1
+            self._store_memory(key, value, os.path.getmtime(self._path(key)))
+        return value
+
+    def put(self, key: str, value: Any):
+        with self._lock:
+            self._store_memory(key, value, time.time())
+        self._write_disk(key, value)
+
+    def remember(self, key: str, value: Any):
+        """Fill the memory tier with a model trained elsewhere, e.g. in a JobRunner worker.
+
+        ``value`` may be the output of ``encode``; it is decoded on first use.
+        """
+        with self._lock:
+            if key not in self._memory:
+                self._store_memory(key, value, time.time())
+
+    @classmethod
+    def encode(cls, value: Any) -> Any:
+        """Copy of ``value`` with Keras and Prophet models replaced by ``SavedModel``"""
+        if isinstance(value, dict):
+            return {k: cls.encode(v) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            return type(value)(cls.encode(v) for v in value)
+        saved = SavedModel.wrap(value)
+        return saved if saved is not None else value
+
+    @classmethod
+    def decode(cls, value: Any) -> Any:
+        """Inverse of ``encode``; returns ``value`` itself when it holds no ``SavedModel``"""
+        if isinstance(value, SavedModel):
+            return value.load()
+        if isinstance(value, dict):
+            decoded = {k: cls.decode(v) for k, v in value.items()}
+            return value if all(decoded[k] is v for k, v in value.items()) else decoded
+        if isinstance(value, (list, tuple)):
+            decoded = [cls.decode(v) for v in value]
+            return value if all(d is v for d, v in zip(decoded, value)) else type(value)(decoded)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.pkl'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def _store_memory(self, key: str, value: Any, stored_at: float):
+        self._memory.pop(key, None)
+        self._memory[key] = (value, stored_at)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def _read_disk(self, key: str, now: float) -> Optional[Any]:
+        path = self._path(key)
+        try:
+            if now - os.path.getmtime(path) > self.ttl.total_seconds():
+                os.remove(path)
+                return None
+            with open(path, 'rb') as f:
+                value = self.decode(pickle.load(f))
+            # Bump atime for LRU ordering without touching mtime, which tracks the TTL
+            os.utime(path, (now, os.path.getmtime(path)))
+            return value
+        except Exception:
+            return None
+
+    def _write_disk(self, key: str, value: Any):
+        tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(self.encode(value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+            self._evict_disk()
+        except Exception as e:
+            # Models pickle cannot handle and SavedModel does not cover stay in the memory tier only
+            print(f"Failed to persist model: {str(e)}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_atime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+            with self._lock:
+                self._stats['evictions'] += 1
+
+_model_store = None
+_model_store_lock = threading.Lock()
+
+def get_model_store() -> ModelStore:
+    """Return the process-wide model store, created on first use"""
+    global _model_store
+    with _model_store_lock:
+        if _model_store is None:
+            _model_store = ModelStore()
+        return _model_store
@@ -0,0 +1,118 @@
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Column-name hints for time columns, in the order they are suggested
+DATE_NAME_HINTS = ('date', 'month', 'year')
+# Larger frames get cardinality estimated from a sample of this many rows
+CARDINALITY_SAMPLE_ROWS = 100_000
+# Larger frames are only memoized by identity; hashing them costs about as much as profiling
+HASH_ROW_LIMIT = 200_000
+
+class DataProfile:
+    """Per-column facts about a frame, computed in one vectorized pass"""
+    def __init__(self, df: pd.DataFrame):
+        self.rows = len(df)
+        self.columns: List[str] = list(df.columns)
+        self.dtypes: Dict[str, str] = {col: str(dtype) for col, dtype in df.dtypes.items()}
+        self.numeric_cols: List[str] = df.select_dtypes(include=[np.number]).columns.tolist()
+        self.datetime_cols: List[str] = [
+            col for col, dtype in df.dtypes.items() if pd.api.types.is_datetime64_any_dtype(dtype)
+        ]
+        self.null_counts: Dict[str, int] = {col: int(n) for col, n in df.isna().sum().items()}
+
+        inf_counts = np.zeros(len(self.numeric_cols), dtype=np.int64)
+        if self.numeric_cols and self.rows:
+            values = df[self.numeric_cols].to_numpy(dtype=float, na_value=np.nan)
+            inf_counts = np.isinf(values).sum(axis=0)
+        self.inf_counts: Dict[str, int] = dict(zip(self.numeric_cols, (int(n) for n in inf_counts)))
+        self.cardinality: Dict[str, int] = self._cardinality(df)
+
+        # Real datetime columns first, then columns named like dates, without duplicates
+        lowered = {col: str(col).lower() for col in self.columns}
+        named = [col for hint in DATE_NAME_HINTS for col in self.columns if hint in lowered[col]]
+        self.date_cols: List[str] = list(dict.fromkeys(self.datetime_cols + named))
+
+    def _cardinality(self, df: pd.DataFrame) -> Dict[str, int]:
+        """Distinct non-null values per column; estimated from a sample on large frames"""
+        self.cardinality_exact = len(df) <= CARDINALITY_SAMPLE_ROWS
+        sample = df if self.cardinality_exact else df.sample(n=CARDINALITY_SAMPLE_ROWS, random_state=0)
+        try:
+            counts = sample.nunique(dropna=True)
+        except TypeError:
+            # Unhashable cell values (lists, dicts from VARIANT columns): count their text form
+            counts = sample.astype(str).nunique(dropna=True)
+        if self.cardinality_exact:
+            return {col: int(n) for col, n in counts.items()}
+        # Columns that look unique in the sample are scaled up; low-cardinality ones are taken as seen
+        scale = len(df) / len(sample)
+        return {
+            col: int(n * scale) if n >= 0.95 * len(sample) else int(n)
+            for col, n in counts.items()
+        }
+
+    @property
+    def inf_cols(self) -> List[str]:
+        return [col for col in self.numeric_cols if self.inf_counts[col]]
+
+    @property
+    def finite_numeric_cols(self) -> List[str]:
+        return [col for col in self.numeric_cols if not self.inf_counts[col]]
+
+def frame_hash(df: pd.DataFrame) -> str:
+    digest = hashlib.sha256()
+    digest.update(repr([(str(col), str(dtype)) for col, dtype in df.dtypes.items()]).encode('utf-8'))
+    try:
+        digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    except TypeError:
+        digest.update(pd.util.hash_pandas_object(df.astype(str), index=True).values.tobytes())
+    return digest.hexdigest()
+
+_by_identity: 'OrderedDict[int, tuple]' = OrderedDict()
+_by_hash: 'OrderedDict[str, DataProfile]' = OrderedDict()
+_profile_lock = threading.Lock()
+
+def profile_frame(df: pd.DataFrame, max_frames: int = 32, max_entries: int = 32) -> DataProfile:
+    """Profile ``df``, reusing an earlier profile of the same object or identical data.
+
+    Frames up to ``HASH_ROW_LIMIT`` rows are also matched by content, so the
+    sample frames rebuilt on every rerun of AI Suggestions hit the cache.
+
+    Frames are assumed not to be modified in place after they were profiled,
+    which holds for query results kept in ``st.session_state``.
+    """
+    key = id(df)
+    with _profile_lock:
+        cached: Optional[tuple] = _by_identity.get(key)
+        # Frames are held weakly; a dead reference means the id now belongs to another frame
+        if cached is not None and cached[0]() is df:
+            _by_identity.move_to_end(key)
+            return cached[1]
+
+    digest = frame_hash(df) if len(df) <= HASH_ROW_LIMIT else None
+    profile = None
+    if digest is not None:
+        with _profile_lock:
+            profile = _by_hash.get(digest)
+            if profile is not None:
+                _by_hash.move_to_end(digest)
+    if profile is None:
+        profile = DataProfile(df)
+
+    with _profile_lock:
+        if digest is not None:
+            _by_hash[digest] = profile
+        _by_identity[key] = (weakref.ref(df), profile)
+        # Entries of frames that were garbage collected cannot hit again
+        for dead in [k for k, (ref, _) in _by_identity.items() if ref() is None]:
+            del _by_identity[dead]
+        while len(_by_identity) > max_frames:
+            _by_identity.popitem(last=False)
+        while len(_by_hash) > max_entries:
+            _by_hash.popitem(last=False)
+    return profile
@@ -1,35 +1,25 @@
 import pandas as pd
-import numpy as np
 from typing import Dict, List, Tuple
+from ml.profiler import DataProfile, profile_frame
+from utils.tracing import traced
 
 class MLSuggestionEngine:
-    def _clean_numeric_data(self, df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
-        """Clean numeric data by filling nan with 0"""
-        df = df.copy()
-        for col in columns:
-            df[col] = df[col].fillna(0)
-        return df
-
-    def _validate_numeric_data(self, df: pd.DataFrame, columns: List[str]) -> Tuple[bool, List[str]]:
+    def _validate_numeric_data(self, profile: DataProfile) -> Tuple[bool, List[str]]:
         """Validate numeric columns for inf values only"""
-        problematic_cols = []
-        for col in columns:
-            if np.isinf(df[col]).any():
-                problematic_cols.append(col)
+        problematic_cols = profile.inf_cols
         return len(problematic_cols) == 0, problematic_cols
 
+    @traced('ml.analyze_data')
     def analyze_data(self, df: pd.DataFrame) -> Dict:
         suggestions = {}
         
-        # Get column information
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-        date_cols = df.select_dtypes(include=['datetime64']).columns.tolist()   
-
-        # Clean nan values
-        df = self._clean_numeric_data(df, numeric_cols)
+        # Get column information from the shared, memoized profile
+        profile = profile_frame(df)
+        numeric_cols = list(profile.numeric_cols)
+        date_cols = list(profile.date_cols)
 
         # Validate for inf values
-        is_valid, problematic_cols = self._validate_numeric_data(df, numeric_cols)
+        is_valid, problematic_cols = self._validate_numeric_data(profile)
         if not is_valid:
             suggestions['warnings'] = {
                 'message': 'Some columns contain infinite values',
@@ -37,11 +27,7 @@ class MLSuggestionEngine:
                 'recommendation': 'Consider handling infinite values before analysis'
             }
             # Filter out problematic columns
-            numeric_cols = [col for col in numeric_cols if col not in problematic_cols]
-
-        date_cols.extend([col for col in df.columns if 'date' in col.lower()])
-        date_cols.extend([col for col in df.columns if 'month' in col.lower()])
-        date_cols.extend([col for col in df.columns if 'year' in col.lower()])
+            numeric_cols = profile.finite_numeric_cols
         
         # Only suggest analysis if we have valid columns
         if len(numeric_cols) >= 2:
@@ -74,10 +60,10 @@ class MLSuggestionEngine:
 
     def validate_columns(self, df: pd.DataFrame) -> bool:
         """Validate if dataframe has sufficient columns for analysis"""
-        numeric_cols = df.select_dtypes(include=[np.number]).columns.tolist()
-        if len(numeric_cols) < 2 or len(df) < 10:
+        profile = profile_frame(df)
+        if len(profile.numeric_cols) < 2 or profile.rows < 10:
             return False
             
-        # Check for inf/nan values
-        is_valid, _ = self._validate_numeric_data(df, numeric_cols)
-        return is_valid and len(numeric_cols) >= 2 and len(df) >= 10
+        # Check for inf values
+        is_valid, _ = self._validate_numeric_data(profile)
+        return is_valid
@@ -0,0 +1,52 @@
+import streamlit as st
+import time
+from utils.tracing import get_trace_sink, latency_summary
+
+# Look-back windows offered on the dashboard, in hours
+WINDOWS = {'Last hour': 1, 'Last 24 hours': 24, 'Last 7 days': 24 * 7}
+
+def render_latency_dashboard_page():
+    st.title("Latency Dashboard")
+
+    sink = get_trace_sink()
+    if sink is None:
+        st.info("Tracing is disabled. Unset TRACE_SINK or set it to sqlite or jsonl to record spans.")
+        return
+
+    window = st.selectbox("Window", list(WINDOWS))
+    try:
+        spans = sink.load(since=time.time() - WINDOWS[window] * 3600)
+    except Exception as e:
+        st.error(f"Failed to load traces: {str(e)}")
+        return
+    if spans.empty:
+        st.info("No spans recorded in this window yet.")
+        return
+
+    pages = sorted(spans['page'].fillna('(background)').unique())
+    selected_pages = st.multiselect("Pages", pages, default=pages)
+    spans = spans[spans['page'].fillna('(background)').isin(selected_pages)]
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Spans", len(spans))
+    col2.metric("Errors", int((spans['status'] == 'error').sum()))
+    col3.metric("Dropped", sink.dropped)
+
+    st.subheader("Per stage")
+    st.dataframe(latency_summary(spans, by=['name']), use_container_width=True)
+
+    st.subheader("Per stage and page")
+    st.dataframe(latency_summary(spans), use_container_width=True)
+
+    st.subheader("Page renders")
+    st.dataframe(latency_summary(spans[spans['name'] == 'page.render'], by=['page']),
+                 use_container_width=True)
+
+    with st.expander("Slowest spans"):
+        slowest = spans.nlargest(50, 'duration_ms')[
+            ['name', 'page', 'duration_ms', 'status', 'attributes', 'started_at']
+        ].copy()
+        slowest['started_at'] = slowest['started_at'].map(
+            lambda t: time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t))
+        )
+        st.dataframe(slowest, use_container_width=True)
@@ -1,33 +1,63 @@
+import hashlib
 import streamlit as st
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from core.join_graph import JoinGraph
+from core.preflight import get_preflight, rank_suggestions
+from core.pushdown import PushdownBuilder
 from core.snowflake import SnowflakeConnection
+from utils.export import export_buttons
+from utils.session import current_session_id, load_schema_info, schedule_rerun
 import pandas as pd
 
+# Join suggestions shown, best scored first
+MAX_JOIN_SUGGESTIONS = 100
+
+# Seconds a suggestion query may run before it is cancelled, and how often running ones are polled
+SUGGESTION_QUERY_TIMEOUT = 300
+SUGGESTION_POLL_SECONDS = 1.0
+
+_suggestion_cache: 'OrderedDict[str, List[Dict]]' = OrderedDict()
+_suggestion_cache_lock = threading.Lock()
+
+def get_sql_suggestions(schema_info: Dict, schema_fingerprint: Optional[str] = None,
+                        max_entries: int = 8) -> List[Dict]:
+    """generate_sql_suggestions, memoized per schema fingerprint"""
+    if schema_fingerprint is None:
+        return generate_sql_suggestions(schema_info)
+    with _suggestion_cache_lock:
+        cached = _suggestion_cache.get(schema_fingerprint)
+        if cached is not None:
+            _suggestion_cache.move_to_end(schema_fingerprint)
+            return cached
+    suggestions = generate_sql_suggestions(schema_info)
+    with _suggestion_cache_lock:
+        _suggestion_cache[schema_fingerprint] = suggestions
+        while len(_suggestion_cache) > max_entries:
+            _suggestion_cache.popitem(last=False)
+    return suggestions
+
 def generate_sql_suggestions(schema_info):
     suggestions = []
     
-    # Find tables with common columns for joins
-    tables = list(schema_info.keys())
-    for i, table1 in enumerate(tables):
-        for table2 in tables[i+1:]:
-            cols1 = {col['name'].lower(): col for col in schema_info[table1]['columns']}
-            cols2 = {col['name'].lower(): col for col in schema_info[table2]['columns']}
-            
-            # Find common column names that could be join keys
-            common_cols = set(cols1.keys()) & set(cols2.keys())
-            
-            if common_cols:
-                for col in common_cols:
-                    suggestions.append({
-                        'type': 'Join Analysis',
-                        'title': f'Join {table1} and {table2}',
-                        'description': f'Analyze relationship between {table1} and {table2} using {col}',
-                        'query': f'''
-                            SELECT a.*, b.*
-                            FROM {table1} a
-                            JOIN {table2} b ON a.{col} = b.{col}
-                            LIMIT 1000
-                        '''
-                    })
+    # Find tables with common columns for joins, most key-like first
+    join_graph = JoinGraph(schema_info)
+    for edge in join_graph.top_edges(MAX_JOIN_SUGGESTIONS):
+        table1, table2 = edge['left'], edge['right']
+        suggestions.append({
+            'type': 'Join Analysis',
+            'title': f'Join {table1} and {table2}',
+            'description': (f"Analyze relationship between {table1} and {table2} using "
+                            f"{edge['left_column']} (join score {edge['score']:.2f})"),
+            'query': f'''
+                SELECT a.*, b.*
+                FROM {table1} a
+                JOIN {table2} b ON a.{edge['left_column']} = b.{edge['right_column']}
+                LIMIT 1000
+            '''
+        })
     
     # Generate aggregation suggestions for numeric columns
     for table, details in schema_info.items():
@@ -46,19 +76,7 @@ def generate_sql_suggestions(schema_info):
                         'type': 'Aggregate Analysis',
                         'title': f'Aggregate {num_col} by {cat_col}',
                         'description': f'Calculate summary statistics for {num_col} grouped by {cat_col}',
-                        'query': f'''
-                            SELECT 
-                                {cat_col},
-                                COUNT(*) as count,
-                                AVG({num_col}) as avg_{num_col},
-                                SUM({num_col}) as total_{num_col},
-                                MIN({num_col}) as min_{num_col},
-                                MAX({num_col}) as max_{num_col}
-                            FROM {table}
-                            GROUP BY {cat_col}
-                            ORDER BY count DESC
-                            LIMIT 1000
-                        '''
+                        'query': PushdownBuilder(table, details['columns']).grouped(cat_col, [num_col])
                     })
         
         # Window functions suggestions
@@ -84,19 +102,84 @@ def generate_sql_suggestions(schema_info):
     
     return suggestions
 
+def _cost_label(check: Optional[Dict]) -> str:
+    """Short pre-flight summary shown next to a suggestion's title"""
+    if check is None:
+        return ""
+    if not check['valid']:
+        return " (invalid)"
+    if check['bytes_assigned'] is None:
+        return ""
+    size = float(check['bytes_assigned'])
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            break
+        size /= 1024
+    else:
+        unit = 'TB'
+    return f" (~{size:.1f} {unit} to scan)"
+
+def _submit_suggestion(snowflake_conn: SnowflakeConnection, query: str):
+    """Start a suggestion query in the warehouse; cached results are shown without running it"""
+    cached = snowflake_conn.cached_result(query)
+    entry = {'query_id': None, 'submitted': time.time(), 'status': 'running', 'error': None}
+    if cached is not None:
+        entry['status'] = 'done'
+        st.session_state.generated_sql = query
+        st.session_state.query_results = cached
+    else:
+        entry['query_id'] = snowflake_conn.submit_query(query)
+    st.session_state.suggestion_queries[query] = entry
+
+def _poll_suggestion(snowflake_conn: SnowflakeConnection, query: str, entry: Dict):
+    """Advance a running suggestion query: fetch its result, or cancel it once past the timeout"""
+    if entry['status'] != 'running':
+        return
+    state = snowflake_conn.query_state(entry['query_id'])
+    if state == 'running':
+        if time.time() - entry['submitted'] > SUGGESTION_QUERY_TIMEOUT:
+            snowflake_conn.cancel_query(entry['query_id'])
+            entry.update({'status': 'cancelled',
+                          'error': f"Timed out after {SUGGESTION_QUERY_TIMEOUT}s and was cancelled"})
+        return
+    if state == 'cancelled':
+        entry['status'] = 'cancelled'
+        return
+    try:
+        # Stored in the result cache; the entry itself keeps no rows
+        result = snowflake_conn.fetch_query_result(entry['query_id'], query)
+        entry['status'] = 'done'
+        st.session_state.generated_sql = query
+        st.session_state.query_results = result
+    except Exception as e:
+        entry.update({'status': 'failed', 'error': str(e)})
+
+def _suggestion_result(snowflake_conn: SnowflakeConnection, query: str, entry: Dict) -> Optional[pd.DataFrame]:
+    """Rows of a finished suggestion from the bounded result cache, fetched again by query ID once evicted"""
+    result = snowflake_conn.cached_result(query)
+    if result is None and entry['query_id'] is not None:
+        result = snowflake_conn.fetch_query_result(entry['query_id'], query)
+    return result
+
+def _widget_key(query: str) -> str:
+    """Stable widget key for a suggestion; list positions change as pre-flight re-ranks them"""
+    return hashlib.sha1(query.strip().encode('utf-8')).hexdigest()[:12]
+
 def render_sql_suggestions_page():
     st.title("AI SQL Query Suggestions")
+    if 'suggestion_queries' not in st.session_state:
+        # query text -> {'query_id', 'submitted', 'status', 'error'}; rows stay in the result cache
+        st.session_state.suggestion_queries = {}
+    preflight_run = None
     
     try:
-        snowflake_conn = SnowflakeConnection()
+        snowflake_conn = SnowflakeConnection(session_id=current_session_id())
         
-        # Get schema info if not cached
-        if not st.session_state.get('schema_info'):
-            with st.spinner("Loading schema information..."):
-                st.session_state.schema_info = snowflake_conn.get_schema_info()
+        # Get schema info through the fingerprint-validated cache
+        load_schema_info(snowflake_conn)
         
         # Generate suggestions
-        suggestions = generate_sql_suggestions(st.session_state.schema_info)
+        suggestions = get_sql_suggestions(st.session_state.schema_info, st.session_state.schema_fingerprint)
         
         # Group suggestions by type
         suggestion_types = list(set(s['type'] for s in suggestions))
@@ -105,36 +188,120 @@ def render_sql_suggestions_page():
         selected_type = st.selectbox("Select Analysis Type", suggestion_types)
         
         filtered_suggestions = [s for s in suggestions if s['type'] == selected_type]
+
+        # EXPLAIN every suggestion in the background, once per schema fingerprint
+        checks = {}
+        fingerprint = st.session_state.schema_fingerprint
+        if fingerprint is not None:
+            preflight = get_preflight()
+            preflight_run = preflight.start(fingerprint, suggestions, st.session_state.schema_info,
+                                            SnowflakeConnection)
+            checks = preflight_run['results']
+            if preflight_run['status'] == 'running':
+                st.progress(preflight_run['checked'] / max(preflight_run['total'], 1),
+                            text=f"Checking suggestions: {preflight_run['checked']}/{preflight_run['total']}")
+            elif preflight_run['status'] == 'failed':
+                st.warning(f"Pre-flight check failed: {preflight_run.get('error')}")
+            show_invalid = st.checkbox("Show invalid suggestions", value=False)
+            hidden = sum(1 for s in filtered_suggestions
+                         if not checks.get(s['query'], {}).get('valid', True))
+            filtered_suggestions = rank_suggestions(filtered_suggestions, checks, include_invalid=show_invalid)
+            if hidden and not show_invalid:
+                st.caption(f"{hidden} suggestions hidden because EXPLAIN rejected them. "
+                           "Suggestions are ordered by estimated bytes scanned.")
+            if preflight_run['status'] != 'running' and st.button("Re-check suggestions"):
+                preflight.forget(fingerprint)
+                st.experimental_rerun()
+
+        # Queries run asynchronously in the warehouse, so several can run at once
+        # and the page stays responsive while they do
+        queries = st.session_state.suggestion_queries
+        for query, entry in queries.items():
+            try:
+                _poll_suggestion(snowflake_conn, query, entry)
+            except Exception as e:
+                entry.update({'status': 'failed', 'error': str(e)})
+        if st.button(f"Execute all {len(filtered_suggestions)} queries"):
+            for suggestion in filtered_suggestions:
+                if queries.get(suggestion['query'], {}).get('status') != 'running':
+                    try:
+                        _submit_suggestion(snowflake_conn, suggestion['query'])
+                    except Exception as e:
+                        st.error(f"Query execution failed: {str(e)}")
         
+        key_counts = {}
         for idx, suggestion in enumerate(filtered_suggestions):
-            with st.expander(f"{suggestion['title']}", expanded=idx == 0):
+            check = checks.get(suggestion['query'])
+            key = _widget_key(suggestion['query'])
+            # The same query text may appear twice; its widgets still need distinct keys
+            key_counts[key] = key_counts.get(key, 0) + 1
+            if key_counts[key] > 1:
+                key = f"{key}_{key_counts[key]}"
+            with st.expander(f"{suggestion['title']}{_cost_label(check)}", expanded=idx == 0):
                 st.write(suggestion['description'])
+                if check is not None and not check['valid']:
+                    st.warning(f"EXPLAIN failed: {check['error']}")
                 st.code(suggestion['query'].strip(), language='sql')
                 
-                if st.button(f"Execute Query {idx + 1}"):
+                entry = queries.get(suggestion['query'])
+                running = entry is not None and entry['status'] == 'running'
+                if not running and st.button(f"Execute Query {idx + 1}", key=f"execute_query_{key}"):
                     try:
-                        with st.spinner("Executing query..."):
-                            results = snowflake_conn.execute_query(suggestion['query'])
-                            st.session_state.generated_sql = suggestion['query']
-                            st.session_state.query_results = results
-                            
-                            st.write("Query Results:")
-                            st.dataframe(results)
-                            
-                            # Add download button
-                            if not results.empty:
-                                csv = results.to_csv(index=False).encode('utf-8')
-                                st.download_button(
-                                    "Download Results",
-                                    csv,
-                                    f"query_results_{idx+1}.csv",
-                                    "text/csv"
-                                )
+                        _submit_suggestion(snowflake_conn, suggestion['query'])
                     except Exception as e:
                         st.error(f"Query execution failed: {str(e)}")
+                    entry = queries.get(suggestion['query'])
+                if entry is None:
+                    continue
+
+                if entry['status'] == 'running':
+                    st.info(f"Running for {time.time() - entry['submitted']:.0f}s "
+                            f"(query ID {entry['query_id']})")
+                    if st.button("Cancel", key=f"cancel_query_{key}"):
+                        try:
+                            snowflake_conn.cancel_query(entry['query_id'])
+                            entry.update({'status': 'cancelled', 'error': None})
+                        except Exception as e:
+                            st.error(str(e))
+                elif entry['status'] == 'done':
+                    try:
+                        results = _suggestion_result(snowflake_conn, suggestion['query'], entry)
+                    except Exception as e:
+                        st.error(f"Failed to load results: {str(e)}")
+                        continue
+                    if results is None:
+                        st.info("The result is no longer cached; execute the query again to see it.")
+                        continue
+                    st.write("Query Results:")
+                    st.dataframe(results)
+                    
+                    # Export is written only when requested
+                    if not results.empty:
+                        export_buttons(results, f"query_results_{key}", f"suggestion_{key}",
+                                       source_query=suggestion['query'])
+                elif entry['status'] == 'failed':
+                    st.error(f"Query execution failed: {entry['error']}")
+                else:
+                    st.info(entry['error'] or "Query cancelled")
+
+        if any(entry['status'] == 'running' for entry in queries.values()):
+            if st.button("Cancel all running queries"):
+                for entry in queries.values():
+                    if entry['status'] == 'running':
+                        try:
+                            snowflake_conn.cancel_query(entry['query_id'])
+                            entry.update({'status': 'cancelled', 'error': None})
+                        except Exception as e:
+                            st.error(str(e))
                         
     except Exception as e:
         st.error(f"Error: {str(e)}")
     finally:
         if 'snowflake_conn' in locals():
-            snowflake_conn.close()
\ No newline at end of file
+            snowflake_conn.close()
+
+    preflight_running = preflight_run is not None and preflight_run['status'] == 'running'
+    if preflight_running or any(entry['status'] == 'running'
+                                for entry in st.session_state.suggestion_queries.values()):
+        # Poll until the pre-flight check and every query of this session have finished
+        schedule_rerun(SUGGESTION_POLL_SECONDS)
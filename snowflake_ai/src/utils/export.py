@@ -0,0 +1,278 @@
+import hashlib
+import hmac
+import os
+import secrets
+import shutil
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional
+
+import pandas as pd
+
+EXPORT_FORMATS = {
+    'CSV': {'extension': 'csv', 'mime': 'text/csv'},
+    'Parquet': {'extension': 'parquet', 'mime': 'application/vnd.apache.parquet'}
+}
+# st.download_button holds the whole file in memory on every rerun; larger spools are served or left on disk
+DOWNLOAD_LIMIT_BYTES = int(os.getenv('EXPORT_DOWNLOAD_LIMIT_MB', '100')) * 1024 * 1024
+# Streamlit's static folder sits next to the main script (src/app.py) and is served at app/static/.
+# It is public, so served exports get unguessable names and a short lifetime.
+STATIC_EXPORT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static', 'exports')
+
+class ResultExporter:
+    """Write query results to a spool file on disk, one chunk at a time.
+
+    Nothing is serialized until an export is requested. Frames are written
+    in slices of ``chunk_rows`` and query results straight from the
+    warehouse stream, so at most one chunk is held in memory besides the
+    source. Spool files older than ``max_age`` seconds are deleted.
+
+    Files handed to ``serve`` live under ``serve_dir`` in a folder per
+    session, named by a keyed hash of the session id, with random names.
+    They are deleted after ``serve_max_age`` seconds or when ``discard`` is
+    called.
+    """
+    def __init__(self, spool_dir: str = os.path.join('.cache', 'exports'), chunk_rows: int = 100_000,
+                 max_age: int = 3600, serve_dir: str = STATIC_EXPORT_DIR, serve_max_age: int = 900):
+        self.spool_dir = spool_dir
+        self.serve_dir = serve_dir
+        self.chunk_rows = chunk_rows
+        self.max_age = max_age
+        self.serve_max_age = serve_max_age
+        # Per-process key, so session folder names cannot be derived from a session id
+        self._serve_key = secrets.token_bytes(32)
+        os.makedirs(spool_dir, exist_ok=True)
+
+    def spool_frame(self, df: pd.DataFrame, fmt: str = 'CSV') -> str:
+        """Write ``df`` to a new spool file; returns its path"""
+        return self.spool_chunks(self._slices(df), fmt)
+
+    def spool_query(self, snowflake_conn, query: str, fmt: str = 'CSV') -> str:
+        """Stream the full, uncapped result of ``query`` into a new spool file"""
+        return self.spool_chunks(snowflake_conn.stream_query(query, use_cache=False), fmt)
+
+    def spool_chunks(self, chunks: Iterable[pd.DataFrame], fmt: str = 'CSV') -> str:
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        self._prune()
+        path = os.path.join(self.spool_dir, f"{uuid.uuid4().hex}.{EXPORT_FORMATS[fmt]['extension']}")
+        tmp_path = f"{path}.tmp"
+        try:
+            if fmt == 'CSV':
+                self._write_csv(chunks, tmp_path)
+            else:
+                self._write_parquet(chunks, tmp_path)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise Exception(f"Export failed: {str(e)}")
+        return path
+
+    def serve(self, path: str, session_id: Optional[str]) -> str:
+        """Move a spool file into the session's served folder; returns its new path"""
+        self._prune_served()
+        session_dir = hmac.new(self._serve_key, (session_id or '').encode('utf-8'), hashlib.sha256).hexdigest()
+        directory = os.path.join(self.serve_dir, session_dir)
+        os.makedirs(directory, exist_ok=True)
+        served = os.path.join(directory, f"{secrets.token_urlsafe(32)}{os.path.splitext(path)[1]}")
+        shutil.move(path, served)
+        # The served lifetime starts now, not when the spool was written
+        os.utime(served)
+        return served
+
+    def served_url(self, served: str) -> str:
+        """Relative URL Streamlit's static file serving answers for a served file"""
+        return "app/static/exports/" + os.path.relpath(served, self.serve_dir).replace(os.sep, '/')
+
+    def discard(self, path: str):
+        """Delete a spool or served file that is no longer offered"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Export cleanup error: {str(e)}")
+
+    def _slices(self, df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        if df.empty:
+            yield df
+            return
+        for start in range(0, len(df), self.chunk_rows):
+            yield df.iloc[start:start + self.chunk_rows]
+
+    @staticmethod
+    def _write_csv(chunks: Iterable[pd.DataFrame], path: str):
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            header = True
+            for chunk in chunks:
+                chunk.to_csv(f, index=False, header=header)
+                header = False
+
+    @staticmethod
+    def _write_parquet(chunks: Iterable[pd.DataFrame], path: str):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for chunk in chunks:
+                if writer is None:
+                    table = pa.Table.from_pandas(chunk, preserve_index=False)
+                    writer = pq.ParquetWriter(path, table.schema)
+                else:
+                    # Later chunks may infer other types (e.g. an all-null column); use the first schema
+                    table = pa.Table.from_pandas(chunk, schema=writer.schema, preserve_index=False)
+                writer.write_table(table)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            pq.write_table(pa.table({}), path)
+
+    def _prune(self):
+        cutoff = time.time() - self.max_age
+        try:
+            for entry in os.scandir(self.spool_dir):
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+        except OSError as e:
+            print(f"Export spool cleanup error: {str(e)}")
+        self._prune_served()
+
+    def _prune_served(self):
+        if not os.path.isdir(self.serve_dir):
+            return
+        cutoff = time.time() - self.serve_max_age
+        try:
+            for session_dir in os.scandir(self.serve_dir):
+                if not session_dir.is_dir():
+                    continue
+                for entry in os.scandir(session_dir.path):
+                    if entry.is_file() and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                if not os.listdir(session_dir.path):
+                    os.rmdir(session_dir.path)
+        except OSError as e:
+            print(f"Served export cleanup error: {str(e)}")
+
+_exporter = None
+_exporter_lock = threading.Lock()
+
+def get_exporter() -> ResultExporter:
+    """Process-wide exporter shared by every Streamlit session"""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = ResultExporter()
+        return _exporter
+
+_frame_digests: 'OrderedDict[int, tuple]' = OrderedDict()
+_digest_lock = threading.Lock()
+
+def source_key(results: pd.DataFrame, query: Optional[str] = None, max_frames: int = 32) -> str:
+    """Stable key for what an export was written from: the query text, else the frame's content.
+
+    Frame digests are memoized per frame object, held weakly, so a frame
+    shown on every rerun is hashed once.
+    """
+    if query is not None:
+        return 'query:' + hashlib.sha256(query.strip().encode('utf-8')).hexdigest()
+    key = id(results)
+    with _digest_lock:
+        cached = _frame_digests.get(key)
+        if cached is not None and cached[0]() is results:
+            _frame_digests.move_to_end(key)
+            return cached[1]
+
+    digest = hashlib.sha256(repr([(str(col), str(dtype)) for col, dtype in results.dtypes.items()]).encode('utf-8'))
+    try:
+        digest.update(pd.util.hash_pandas_object(results, index=True).values.tobytes())
+    except TypeError:
+        digest.update(pd.util.hash_pandas_object(results.astype(str), index=True).values.tobytes())
+    value = 'frame:' + digest.hexdigest()
+
+    with _digest_lock:
+        _frame_digests[key] = (weakref.ref(results), value)
+        for dead in [k for k, (ref, _) in _frame_digests.items() if ref() is None]:
+            del _frame_digests[dead]
+        while len(_frame_digests) > max_frames:
+            _frame_digests.popitem(last=False)
+    return value
+
+def export_buttons(results: pd.DataFrame, file_stem: str, key: str, query: Optional[str] = None,
+                   snowflake_conn=None, source_query: Optional[str] = None):
+    """Format picker, "Prepare export" and, once the spool file exists, a way to download it.
+
+    With ``query`` and ``snowflake_conn`` the export re-streams the full
+    result from the warehouse instead of writing ``results``, e.g. when the
+    displayed result was capped. ``source_query`` names the query
+    ``results`` came from, so frames rebuilt on every rerun (e.g. from the
+    result cache) are matched to their spool without hashing them.
+
+    Spools up to ``DOWNLOAD_LIMIT_BYTES`` get a download button. Larger ones
+    are served from the session's folder under ``static/`` and linked when
+    static serving is on; otherwise they cannot be downloaded from the app.
+    A new export replaces the previous one for the same ``key``.
+    """
+    import streamlit as st
+    from utils.session import current_session_id
+
+    state_key = f"export_{key}"
+    source = source_key(results, query if snowflake_conn is not None else source_query)
+    fmt = st.radio("Export format", list(EXPORT_FORMATS), horizontal=True, key=f"{state_key}_format")
+    if st.button("Prepare export", key=f"{state_key}_prepare"):
+        try:
+            exporter = get_exporter()
+            with st.spinner("Writing export..."):
+                if query is not None and snowflake_conn is not None:
+                    path = exporter.spool_query(snowflake_conn, query, fmt)
+                else:
+                    path = exporter.spool_frame(results, fmt)
+            size = os.path.getsize(path)
+            served = size > DOWNLOAD_LIMIT_BYTES and bool(st.get_option('server.enableStaticServing'))
+            if served:
+                path = exporter.serve(path, current_session_id())
+            elif size > DOWNLOAD_LIMIT_BYTES:
+                # Nothing can fetch it, so it is not kept
+                exporter.discard(path)
+                path = None
+            previous = st.session_state.get(state_key)
+            if previous is not None and previous['path'] is not None:
+                exporter.discard(previous['path'])
+            st.session_state[state_key] = {'path': path, 'size': size, 'format': fmt, 'source': source,
+                                           'served': served}
+        except Exception as e:
+            st.error(str(e))
+
+    spooled: Optional[dict] = st.session_state.get(state_key)
+    # A spool written for other results or another format is not offered
+    if spooled is None or spooled['source'] != source or spooled['format'] != fmt:
+        return
+    spec = EXPORT_FORMATS[fmt]
+    file_name = f"{file_stem}.{spec['extension']}"
+    size_mb = spooled['size'] / 2**20
+    if spooled['path'] is None:
+        st.info(
+            f"The export is {size_mb:,.0f} MB, above the {DOWNLOAD_LIMIT_BYTES // 2**20:,} MB download limit, "
+            "so it cannot be downloaded from the app. Filter or aggregate the query to shrink it, or ask an "
+            "administrator to enable `server.enableStaticServing` for large exports."
+        )
+    elif not os.path.exists(spooled['path']):
+        st.info("The prepared export has expired; prepare it again to download it.")
+    elif spooled['served']:
+        url = get_exporter().served_url(spooled['path'])
+        st.markdown(f'<a href="{url}" download="{file_name}">Download Results</a> ({size_mb:,.0f} MB, '
+                    f'available for {get_exporter().serve_max_age // 60} minutes)', unsafe_allow_html=True)
+    else:
+        with open(spooled['path'], 'rb') as f:
+            st.download_button(
+                "Download Results",
+                f,
+                file_name,
+                spec['mime'],
+                key=f"{state_key}_download"
+            )
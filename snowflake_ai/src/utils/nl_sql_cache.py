@@ -0,0 +1,258 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Numbers keep their sign and decimals ("-1" is not "1"); a hyphen after a word or digit is not a sign
+_NUMBER = r"(?<![a-z0-9.])-?\d+(?:\.\d+)?"
+_LITERAL_RE = re.compile(_NUMBER + r"|'[^']*'|\"[^\"]*\"")
+_TOKEN_RE = re.compile(_NUMBER + r"|'[^']*'|\"[^\"]*\"|[a-z0-9]+")
+# Bump when normalization or the embedding changes; older entries are dropped
+SCHEMA_VERSION = 2
+
+# Filler that can differ between two phrasings of the same question. Negations,
+# comparisons and directions are deliberately not in here.
+_STOPWORDS = frozenset(
+    "a an the of for in on at to by with from and or me us my our i we you please show "
+    "list give get find display return what which who whose how is are was were be been "
+    "all each every some any this that these those it its there their them per".split()
+)
+# Spellings of the same measure or period, mapped to one word before embedding
+_CANONICAL = {
+    'avg': 'average', 'mean': 'average', 'sum': 'total', 'number': 'count', 'many': 'count',
+    'daily': 'day', 'weekly': 'week', 'monthly': 'month', 'quarterly': 'quarter', 'yearly': 'year',
+    'annual': 'year'
+}
+
+# Words that flip the meaning of an otherwise identical question. Prompts
+# only match when they carry the same polarity in every group.
+_NEGATIONS = frozenset(
+    "not no never none nor without except excluding exclude excludes non isn aren wasn weren "
+    "don doesn didn hasn haven".split()
+)
+_POLARITY_GROUPS = {
+    'extreme': ({'max', 'maximum', 'highest', 'largest', 'biggest', 'most', 'top', 'greatest', 'peak'},
+                {'min', 'minimum', 'lowest', 'smallest', 'least', 'bottom', 'fewest'}),
+    'direction': ({'asc', 'ascending', 'increasing', 'oldest', 'earliest', 'first'},
+                  {'desc', 'descending', 'decreasing', 'newest', 'latest', 'last', 'recent'}),
+    'comparison': ({'above', 'over', 'greater', 'more', 'higher', 'exceeding', 'exceeds', 'after', 'since'},
+                   {'below', 'under', 'less', 'fewer', 'lower', 'before', 'until'}),
+    'change': ({'increase', 'increased', 'gain', 'gains', 'growth', 'rise', 'up'},
+               {'decrease', 'decreased', 'loss', 'losses', 'decline', 'drop', 'down'})
+}
+
+class NLSQLCache:
+    """Persistent cache of natural-language prompt -> validated SQL.
+
+    Entries are scoped by a structural schema fingerprint (table and column
+    names and types) and stored in SQLite. Lookups try an exact match on the
+    normalized prompt first, then the most similar cached prompt by cosine
+    similarity of a local hashed embedding of its content words, their
+    bigrams and character trigrams. Content words are singularized and
+    common synonyms merged, so "revenues by regions" matches "revenue by
+    region" and "avg order value per segment" matches "average order value
+    by segment". Bigrams keep "employees by department" apart from
+    "departments by employee".
+
+    Either way a prompt only reuses SQL when it has the same numbers and
+    quoted literals and the same negations, extremes, directions and
+    comparisons. So "above 5%" never reuses the SQL for "above 6%", nor
+    "above -1" the SQL for "above 1", nor "not shipped" the SQL for
+    "shipped", nor "descending" the SQL for "ascending". The default
+    threshold is tuned on the paraphrase pairs in tests/test_nl_sql_cache.py.
+    """
+    def __init__(self, db_path: str = os.path.join('.cache', 'nl_sql_cache.db'),
+                 max_entries: int = 5000, similarity_threshold: float = 0.9, dimensions: int = 512):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self.dimensions = dimensions
+        self._lock = threading.Lock()
+        # schema fingerprint -> (prompt_norm list, guard list, sql list, embedding matrix)
+        self._vectors: Dict[str, Tuple[List[str], List[Tuple], List[str], np.ndarray]] = {}
+        self._stats = {'exact_hits': 0, 'semantic_hits': 0, 'misses': 0}
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        with self._connect() as conn:
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                conn.execute("DROP TABLE IF EXISTS nl_sql_cache")
+                conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS nl_sql_cache (
+                    schema_fingerprint TEXT NOT NULL,
+                    prompt_norm TEXT NOT NULL,
+                    literals TEXT NOT NULL,
+                    sql TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (schema_fingerprint, prompt_norm)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS nl_sql_cache_lru ON nl_sql_cache (last_used)")
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        return " ".join(_TOKEN_RE.findall(prompt.lower()))
+
+    @staticmethod
+    def literals(prompt: str) -> str:
+        return "|".join(_LITERAL_RE.findall(prompt.lower()))
+
+    @staticmethod
+    def content_words(prompt: str) -> List[str]:
+        """Singular, canonical words of ``prompt`` without filler or literals, in order"""
+        words = []
+        for word in _TOKEN_RE.findall(prompt.lower()):
+            if not word.isalnum() or word in _STOPWORDS:
+                continue
+            word = _CANONICAL.get(word, word)
+            if len(word) > 4 and word.endswith('ies'):
+                word = word[:-3] + 'y'
+            elif len(word) > 3 and word.endswith('s') and not word.endswith('ss'):
+                word = word[:-1]
+            words.append(word)
+        return words
+
+    @staticmethod
+    def polarity(prompt: str) -> Tuple:
+        """Negation and, per antonym group, which side(s) the prompt's words fall on"""
+        words = set(_TOKEN_RE.findall(prompt.lower()))
+        return (bool(words & _NEGATIONS),) + tuple(
+            (bool(words & positive), bool(words & negative))
+            for positive, negative in _POLARITY_GROUPS.values()
+        )
+
+    def guard(self, prompt: str, literals: Optional[str] = None) -> Tuple:
+        """What a similar prompt must share with ``prompt`` to reuse its SQL"""
+        return (self.literals(prompt) if literals is None else literals, self.polarity(prompt))
+
+    def embed(self, prompt: str) -> np.ndarray:
+        """Hashed content words, word bigrams and per-word character trigrams, L2-normalized"""
+        words = self.content_words(prompt)
+        # Words and bigrams weigh more than trigrams, which only soften spelling differences
+        features = [(word, 2.0) for word in words]
+        features += [(f"{first} {second}", 2.0) for first, second in zip(words, words[1:])]
+        features += [(padded[i:i + 3], 1.0) for padded in (f"<{word}>" for word in words)
+                     for i in range(len(padded) - 2)]
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, weight in features:
+            digest = hashlib.md5(feature.encode('utf-8')).digest()
+            bucket = int.from_bytes(digest[:4], 'little') % self.dimensions
+            vector[bucket] += weight if digest[4] & 1 else -weight
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, prompt: str, schema_fingerprint: Optional[str]) -> Optional[Tuple[str, str]]:
+        """Return (sql, 'exact' | 'semantic') for a cached prompt, or None"""
+        fingerprint = schema_fingerprint or ''
+        prompt_norm = self.normalize(prompt)
+        wanted = self.guard(prompt)
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT sql, literals FROM nl_sql_cache WHERE schema_fingerprint = ? AND prompt_norm = ?",
+                (fingerprint, prompt_norm)
+            ).fetchone()
+            if row is not None and row[1] == wanted[0]:
+                self._touch(conn, fingerprint, prompt_norm)
+                self._record('exact_hits')
+                return row[0], 'exact'
+
+            prompts, guards, sqls, matrix = self._load_vectors(conn, fingerprint)
+            if prompts:
+                similarities = matrix @ self.embed(prompt)
+                for i in np.argsort(-similarities):
+                    if similarities[i] < self.similarity_threshold:
+                        break
+                    if guards[i] == wanted:
+                        self._touch(conn, fingerprint, prompts[i])
+                        self._record('semantic_hits')
+                        return sqls[i], 'semantic'
+
+        self._record('misses')
+        return None
+
+    def put(self, prompt: str, schema_fingerprint: Optional[str], sql: str):
+        """Store SQL that was validated against the warehouse and returned rows"""
+        fingerprint = schema_fingerprint or ''
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("""
+                INSERT INTO nl_sql_cache
+                    (schema_fingerprint, prompt_norm, literals, sql, embedding, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (schema_fingerprint, prompt_norm)
+                DO UPDATE SET sql = excluded.sql, last_used = excluded.last_used
+            """, (fingerprint, self.normalize(prompt), self.literals(prompt), sql,
+                  self.embed(prompt).tobytes(), now, now))
+            conn.execute("""
+                DELETE FROM nl_sql_cache WHERE rowid IN (
+                    SELECT rowid FROM nl_sql_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+        with self._lock:
+            self._vectors.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['exact_hits'] + stats['semantic_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['exact_hits'] + stats['semantic_hits']) / lookups if lookups else 0.0
+        return stats
+
+    @contextmanager
+    def _connect(self):
+        # A connection per call keeps the cache safe to use from worker threads
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _load_vectors(self, conn: sqlite3.Connection, fingerprint: str):
+        with self._lock:
+            cached = self._vectors.get(fingerprint)
+        if cached is not None:
+            return cached
+        rows = conn.execute(
+            "SELECT prompt_norm, literals, sql, embedding FROM nl_sql_cache WHERE schema_fingerprint = ?",
+            (fingerprint,)
+        ).fetchall()
+        matrix = (np.vstack([np.frombuffer(row[3], dtype=np.float32) for row in rows])
+                  if rows else np.zeros((0, self.dimensions), dtype=np.float32))
+        # prompt_norm keeps every word and literal, so the guard can be rebuilt from it and the stored literals
+        cached = ([row[0] for row in rows], [self.guard(row[0], row[1]) for row in rows],
+                  [row[2] for row in rows], matrix)
+        with self._lock:
+            self._vectors[fingerprint] = cached
+        return cached
+
+    @staticmethod
+    def _touch(conn: sqlite3.Connection, fingerprint: str, prompt_norm: str):
+        conn.execute(
+            "UPDATE nl_sql_cache SET last_used = ?, hits = hits + 1 "
+            "WHERE schema_fingerprint = ? AND prompt_norm = ?",
+            (time.time(), fingerprint, prompt_norm)
+        )
+
+    def _record(self, outcome: str):
+        with self._lock:
+            self._stats[outcome] += 1
+
+_nl_sql_cache = None
+_nl_sql_cache_lock = threading.Lock()
+
+def get_nl_sql_cache() -> NLSQLCache:
+    """Return the process-wide prompt -> SQL cache, created on first use"""
+    global _nl_sql_cache
+    with _nl_sql_cache_lock:
+        if _nl_sql_cache is None:
+            _nl_sql_cache = NLSQLCache()
+        return _nl_sql_cache
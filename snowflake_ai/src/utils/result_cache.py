@@ -0,0 +1,185 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Dict, Optional
+
+import pandas as pd
+import sqlparse
+from sqlparse import tokens as T
+
+class QueryResultCache:
+    """Two-tier (memory, then Parquet on disk) cache of query results.
+
+    Keys are built from the sqlparse-normalized SQL plus the schema
+    fingerprint, so formatting differences share an entry and a schema change
+    invalidates everything. Both tiers evict least recently used entries once
+    their byte budget is exceeded; entries older than ``ttl`` are ignored.
+    Results larger than the memory budget are kept on disk only.
+    """
+    def __init__(self, cache_dir: str = os.path.join('.cache', 'query_results'),
+                 max_memory_bytes: int = 256 * 1024 * 1024,
+                 max_disk_bytes: int = 2 * 1024 * 1024 * 1024,
+                 ttl: timedelta = timedelta(hours=1)):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """Rebuild the query from its tokens with canonical whitespace between them.
+
+        String literals and quoted names are kept verbatim, so ``'a  b'`` and
+        ``'a b'`` never share a key.
+        """
+        formatted = sqlparse.format(query, keyword_case='upper', strip_comments=True)
+        parts = []
+        previous = None
+        spaced = False
+        for statement in sqlparse.parse(formatted):
+            for token in statement.flatten():
+                if token.is_whitespace:
+                    spaced = True
+                    continue
+                # One space between words; none next to punctuation or operators ("a, b" == "a,b")
+                if spaced and previous is not None and not any(
+                        t.ttype in T.Punctuation or t.ttype in T.Operator for t in (previous, token)):
+                    parts.append(' ')
+                parts.append(token.value)
+                previous = token
+                spaced = False
+        return "".join(parts).rstrip(';')
+
+    @staticmethod
+    def is_cacheable(query: str) -> bool:
+        """Only read-only statements are cached"""
+        statements = [s for s in sqlparse.parse(query) if s.token_first() is not None]
+        return len(statements) == 1 and statements[0].get_type() == 'SELECT'
+
+    def make_key(self, query: str, schema_fingerprint: Optional[str] = None) -> str:
+        payload = f"{schema_fingerprint or ''}\n{self.normalize(query)}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                df, size, stored_at = entry
+                if now - stored_at <= self.ttl.total_seconds():
+                    self._memory.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return df.copy(deep=False)
+                self._drop_memory(key)
+
+        df = self._read_disk(key, now)
+        with self._lock:
+            if df is None:
+                self._stats['misses'] += 1
+                return None
+            self._stats['disk_hits'] += 1
+            self._store_memory(key, df, os.path.getmtime(self._path(key)))
+        return df.copy(deep=False)
+
+    def put(self, key: str, df: pd.DataFrame):
+        stored_at = time.time()
+        with self._lock:
+            self._store_memory(key, df, stored_at)
+        self._write_disk(key, df)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith('.parquet'):
+                    os.remove(os.path.join(self.cache_dir, name))
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._memory)
+            stats['memory_bytes'] = self._memory_bytes
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def _store_memory(self, key: str, df: pd.DataFrame, stored_at: float):
+        if key in self._memory:
+            self._drop_memory(key)
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_memory_bytes:
+            # Would evict everything else; the disk tier holds it
+            return
+        self._memory[key] = (df, size, stored_at)
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+            self._stats['evictions'] += 1
+
+    def _drop_memory(self, key: str):
+        _, size, _ = self._memory.pop(key)
+        self._memory_bytes -= size
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    def _read_disk(self, key: str, now: float) -> Optional[pd.DataFrame]:
+        path = self._path(key)
+        try:
+            if now - os.path.getmtime(path) > self.ttl.total_seconds():
+                os.remove(path)
+                return None
+            df = pd.read_parquet(path)
+            # Bump atime for LRU ordering without touching mtime, which tracks the TTL
+            os.utime(path, (now, os.path.getmtime(path)))
+            return df
+        except Exception:
+            return None
+
+    def _write_disk(self, key: str, df: pd.DataFrame):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._path(key)}.tmp"
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self._path(key))
+            self._evict_disk()
+        except Exception as e:
+            print(f"Failed to cache query result: {str(e)}")
+
+    def _evict_disk(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.parquet'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_atime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+            with self._lock:
+                self._stats['evictions'] += 1
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+def get_result_cache() -> QueryResultCache:
+    """Return the process-wide result cache, created on first use"""
+    global _result_cache
+    with _result_cache_lock:
+        if _result_cache is None:
+            _result_cache = QueryResultCache(
+                ttl=timedelta(seconds=int(os.getenv('QUERY_CACHE_TTL_SECONDS', '3600')))
+            )
+        return _result_cache
@@ -1,37 +1,183 @@
+import base64
+import hashlib
 import json
 import os
-from datetime import datetime, timedelta
-from typing import Dict, Optional
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+# Sample values keep their Python type across a cache round-trip, so a warm
+# start profiles columns exactly like a cold one (Decimal stays numeric,
+# dates stay dates)
+_TYPE_TAG = '__type__'
+
+def _encode_value(value: Any):
+    # datetime is checked before date, which it subclasses
+    if isinstance(value, datetime):
+        return {_TYPE_TAG: 'datetime', 'value': value.isoformat()}
+    if isinstance(value, date):
+        return {_TYPE_TAG: 'date', 'value': value.isoformat()}
+    if isinstance(value, time):
+        return {_TYPE_TAG: 'time', 'value': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {_TYPE_TAG: 'decimal', 'value': str(value)}
+    if isinstance(value, timedelta):
+        return {_TYPE_TAG: 'timedelta', 'value': value.total_seconds()}
+    if isinstance(value, (bytes, bytearray)):
+        return {_TYPE_TAG: 'bytes', 'value': base64.b64encode(bytes(value)).decode('ascii')}
+    return str(value)
+
+_DECODERS = {
+    'datetime': datetime.fromisoformat,
+    'date': date.fromisoformat,
+    'time': time.fromisoformat,
+    'decimal': Decimal,
+    'timedelta': lambda seconds: timedelta(seconds=seconds),
+    'bytes': base64.b64decode
+}
+
+def _decode_value(obj: Dict):
+    decoder = _DECODERS.get(obj.get(_TYPE_TAG)) if len(obj) == 2 and 'value' in obj else None
+    return decoder(obj['value']) if decoder else obj
 
 class SchemaCache:
+    """Per-table schema cache validated against warehouse fingerprints.
+
+    Each table is stored with the fingerprint returned by
+    ``SnowflakeConnection.get_table_fingerprints``; a load costs one metadata
+    query and re-introspects only tables whose fingerprint changed.
+    """
+    CACHE_VERSION = 3
+
     def __init__(self, cache_file: str = 'schema_cache.json'):
         self.cache_file = cache_file
-        self.cache_ttl = timedelta(hours=24)  # Cache valid for 24 hours
+        self.cache_ttl = timedelta(hours=24)  # Sample data is refreshed after 24 hours
+        self.fingerprint = None
+        self.structure_fingerprint = None
+        self.refreshed_tables: List[str] = []
+
+    def load(self, snowflake_conn) -> Dict:
+        """Return the schema info, re-introspecting only changed tables"""
+        fingerprints = snowflake_conn.get_table_fingerprints()
+        cached_tables = self._read_tables()
+        now = datetime.now()
+
+        stale = [
+            name for name, fingerprint in fingerprints.items()
+            if name not in cached_tables
+            or cached_tables[name]['fingerprint'] != fingerprint
+            or now - datetime.fromisoformat(cached_tables[name]['timestamp']) > self.cache_ttl
+        ]
+        fresh_info = snowflake_conn.get_schema_info(tables=stale) if stale else {}
+
+        tables = {}
+        for name, fingerprint in fingerprints.items():
+            if name in fresh_info:
+                tables[name] = {
+                    'fingerprint': fingerprint,
+                    'timestamp': now.isoformat(),
+                    'info': fresh_info[name]
+                }
+            elif name in cached_tables and name not in stale:
+                tables[name] = cached_tables[name]
+
+        if stale or set(cached_tables) != set(tables):
+            self._write_tables(tables)
+
+        self.refreshed_tables = stale
+        self.fingerprint = self.schema_fingerprint(fingerprints)
+        schema_info = {name: entry['info'] for name, entry in tables.items()}
+        self.structure_fingerprint = self.schema_structure_fingerprint(schema_info)
+        return schema_info
+
+    def invalidate(self, table_name: Optional[str] = None):
+        """Drop one table, or the whole cache, so the next load re-introspects it"""
+        if table_name is None:
+            if os.path.exists(self.cache_file):
+                os.remove(self.cache_file)
+            return
+        tables = self._read_tables()
+        if tables.pop(table_name, None) is not None:
+            self._write_tables(tables)
+
+    @staticmethod
+    def schema_fingerprint(fingerprints: Dict[str, str]) -> str:
+        """Combine table fingerprints into a single schema-level fingerprint"""
+        digest = hashlib.sha256()
+        for name in sorted(fingerprints):
+            digest.update(f"{name}={fingerprints[name]}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    @staticmethod
+    def schema_structure_fingerprint(schema_info: Dict) -> str:
+        """Fingerprint of table and column names and types only.
+
+        Unlike ``schema_fingerprint`` it survives data loads, so it suits
+        caches whose entries depend on the shape of the schema, not its rows.
+        """
+        digest = hashlib.sha256()
+        for name in sorted(schema_info):
+            columns = sorted((str(col['name']).upper(), str(col.get('type')).upper())
+                             for col in schema_info[name].get('columns', []))
+            digest.update(f"{name.upper()}={columns}\n".encode('utf-8'))
+        return digest.hexdigest()
 
     def get_cached_schema(self) -> Optional[Dict]:
-        if not os.path.exists(self.cache_file):
+        tables = self._read_tables()
+        if not tables:
             return None
 
+        now = datetime.now()
+        if any(now - datetime.fromisoformat(entry['timestamp']) > self.cache_ttl
+               for entry in tables.values()):
+            return None
+
+        return {name: entry['info'] for name, entry in tables.items()}
+
+    def save_schema(self, schema_info: Dict, fingerprints: Optional[Dict[str, str]] = None):
+        fingerprints = fingerprints or {}
+        timestamp = datetime.now().isoformat()
+        self._write_tables({
+            name: {
+                'fingerprint': fingerprints.get(name),
+                'timestamp': timestamp,
+                'info': info
+            } for name, info in schema_info.items()
+        })
+
+    def _read_tables(self) -> Dict:
+        if not os.path.exists(self.cache_file):
+            return {}
+
         try:
             with open(self.cache_file, 'r') as f:
-                cache_data = json.load(f)
-                
-            cached_time = datetime.fromisoformat(cache_data['timestamp'])
-            if datetime.now() - cached_time > self.cache_ttl:
-                return None
-                
-            return cache_data['schema']
+                cache_data = json.load(f, object_hook=_decode_value)
+
+            if cache_data.get('version') != self.CACHE_VERSION:
+                return {}
+
+            return cache_data['tables']
         except Exception:
-            return None
+            return {}
 
-    def save_schema(self, schema_info: Dict):
+    def _write_tables(self, tables: Dict):
         cache_data = {
+            'version': self.CACHE_VERSION,
             'timestamp': datetime.now().isoformat(),
-            'schema': schema_info
+            'tables': tables
         }
-        
+
+        # Written to a temp file in the same directory and swapped in, so a
+        # concurrent session never reads a half-written cache
+        tmp_path = None
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump(cache_data, f, indent=2, default=str)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.cache_file)),
+                                            prefix=f"{os.path.basename(self.cache_file)}.", suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(cache_data, f, indent=2, default=_encode_value)
+            os.replace(tmp_path, self.cache_file)
         except Exception as e:
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
             print(f"Failed to cache schema: {str(e)}")
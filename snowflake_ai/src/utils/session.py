@@ -0,0 +1,37 @@
+import streamlit as st
+import time
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from typing import Dict, Optional
+from utils.schema_cache import SchemaCache
+from utils.tracing import span
+
+def load_schema_info(snowflake_conn) -> Dict:
+    """Populate the session's schema info through the on-disk schema cache"""
+    if not st.session_state.get('schema_info'):
+        with st.spinner("Loading schema information..."), span('session.load_schema_info'):
+            schema_cache = SchemaCache()
+            st.session_state.schema_info = schema_cache.load(snowflake_conn)
+            st.session_state.schema_fingerprint = schema_cache.fingerprint
+            st.session_state.schema_structure = schema_cache.structure_fingerprint
+    snowflake_conn.schema_fingerprint = st.session_state.get('schema_fingerprint')
+    return st.session_state.schema_info
+
+def schedule_rerun(seconds: float):
+    """Rerun the script ``seconds`` from now, e.g. to poll background work.
+
+    The wait happens in ``run_scheduled_rerun`` at the end of the script,
+    outside the ``page.render`` span, so polling is not timed as rendering.
+    """
+    pending = st.session_state.get('rerun_after')
+    st.session_state.rerun_after = seconds if pending is None else min(pending, seconds)
+
+def run_scheduled_rerun():
+    seconds = st.session_state.pop('rerun_after', None)
+    if seconds is not None:
+        time.sleep(seconds)
+        st.experimental_rerun()
+
+def current_session_id() -> Optional[str]:
+    """Streamlit session id, used to give each session its own pooled connection"""
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
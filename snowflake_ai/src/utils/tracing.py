@@ -0,0 +1,285 @@
+import collections
+import contextvars
+import functools
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+
+# Page the current Streamlit run (or job) belongs to, and the innermost open span
+_current_page: contextvars.ContextVar = contextvars.ContextVar('trace_page', default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar('trace_span', default=None)
+
+def set_page(page: Optional[str]):
+    """Tag every span recorded from now on in this context with ``page``"""
+    _current_page.set(page)
+
+def current_page() -> Optional[str]:
+    return _current_page.get()
+
+SPAN_COLUMNS = ['span_id', 'parent_id', 'name', 'page', 'started_at', 'duration_ms', 'status', 'attributes']
+
+class TraceSink:
+    """Buffer finished spans and append them to SQLite or JSONL from a background thread.
+
+    Recording a span only puts a dict on a queue, so tracing adds no I/O to
+    the code being measured. Spans are dropped, not blocked on, when the
+    queue is full.
+
+    The writer also prunes, at most every ``prune_interval`` seconds, spans
+    older than ``max_age`` seconds and all but the newest ``max_spans``.
+    """
+    # JSONL spans are appended as they finish, so a span can sit after spans
+    # that started up to its own duration later; window reads allow this much
+    JSONL_ORDER_SLACK = 3600
+
+    def __init__(self, path: str, fmt: str = 'sqlite', max_queue: int = 10000, flush_interval: float = 1.0,
+                 max_age: float = 7 * 24 * 3600, max_spans: int = 200_000, prune_interval: float = 300):
+        self.path = path
+        self.fmt = fmt
+        self.flush_interval = flush_interval
+        self.max_age = max_age
+        self.max_spans = max_spans
+        self.prune_interval = prune_interval
+        self.dropped = 0
+        self._next_prune = 0.0
+        self._queue: 'queue.Queue[Dict]' = queue.Queue(maxsize=max_queue)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if fmt == 'sqlite':
+            with self._connect() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS spans (
+                        span_id TEXT PRIMARY KEY,
+                        parent_id TEXT,
+                        name TEXT NOT NULL,
+                        page TEXT,
+                        started_at REAL NOT NULL,
+                        duration_ms REAL NOT NULL,
+                        status TEXT NOT NULL,
+                        attributes TEXT
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS spans_started_at ON spans (started_at)")
+        threading.Thread(target=self._writer, name='trace-sink', daemon=True).start()
+
+    def record(self, span: Dict):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def load(self, since: Optional[float] = None) -> pd.DataFrame:
+        """Spans started after ``since`` (epoch seconds), oldest first"""
+        since = since or 0.0
+        if self.fmt == 'sqlite':
+            with self._connect() as conn:
+                return pd.read_sql_query(
+                    "SELECT * FROM spans WHERE started_at >= ? ORDER BY started_at", conn, params=(since,)
+                )
+        if not os.path.exists(self.path):
+            return pd.DataFrame(columns=SPAN_COLUMNS)
+        spans = pd.DataFrame([json.loads(line) for line in self._jsonl_lines(since)])
+        if spans.empty:
+            return pd.DataFrame(columns=SPAN_COLUMNS)
+        # Match the SQLite layout, where attributes are stored as JSON text
+        spans['attributes'] = spans['attributes'].map(lambda a: json.dumps(a, default=str))
+        return spans[spans['started_at'] >= since].sort_values('started_at')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.time() + self.flush_interval
+            while time.time() < deadline:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.time())))
+                except queue.Empty:
+                    break
+            try:
+                self._write(batch)
+                if time.time() >= self._next_prune:
+                    self._next_prune = time.time() + self.prune_interval
+                    self.prune()
+            except Exception as e:
+                print(f"Failed to write traces: {str(e)}")
+
+    def _write(self, batch: List[Dict]):
+        if self.fmt == 'sqlite':
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO spans VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        [(s['span_id'], s['parent_id'], s['name'], s['page'], s['started_at'],
+                          s['duration_ms'], s['status'], json.dumps(s['attributes'], default=str))
+                         for s in batch]
+                    )
+            finally:
+                conn.close()
+        else:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for s in batch:
+                    f.write(json.dumps(s, default=str) + "\n")
+
+    def prune(self):
+        """Delete spans past ``max_age`` and all but the newest ``max_spans``"""
+        cutoff = time.time() - self.max_age
+        if self.fmt == 'sqlite':
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.execute("DELETE FROM spans WHERE started_at < ?", (cutoff,))
+                    conn.execute("""
+                        DELETE FROM spans WHERE started_at < (
+                            SELECT started_at FROM spans ORDER BY started_at DESC LIMIT 1 OFFSET ?
+                        )
+                    """, (self.max_spans - 1,))
+            finally:
+                conn.close()
+            return
+        if not os.path.exists(self.path):
+            return
+        kept: 'collections.deque[str]' = collections.deque(maxlen=self.max_spans)
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip() and json.loads(line)['started_at'] >= cutoff:
+                    kept.append(line)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.writelines(kept)
+        os.replace(tmp_path, self.path)
+
+    def _jsonl_lines(self, since: float) -> Iterator[str]:
+        """Lines of spans started at or after ``since``, reading only the tail of the file that can hold them"""
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            # Binary search for the first line that started within the window, less the ordering slack
+            low, high = 0, f.tell()
+            while low < high:
+                mid = (low + high) // 2
+                f.seek(mid)
+                if mid:
+                    f.readline()
+                line = f.readline()
+                # A line without its newline is still being appended
+                if line.endswith(b'\n') and json.loads(line)['started_at'] < since - self.JSONL_ORDER_SLACK:
+                    low = mid + 1
+                else:
+                    high = mid
+            f.seek(low)
+            if low:
+                f.readline()
+            for line in f:
+                if line.endswith(b'\n') and line.strip() and json.loads(line)['started_at'] >= since:
+                    yield line.decode('utf-8')
+
+_sink = None
+_sink_lock = threading.Lock()
+
+def get_trace_sink() -> Optional[TraceSink]:
+    """Process-wide sink configured by TRACE_SINK (sqlite, jsonl or off) and TRACE_PATH"""
+    global _sink
+    fmt = os.getenv('TRACE_SINK', 'sqlite').lower()
+    if fmt == 'off':
+        return None
+    with _sink_lock:
+        if _sink is None:
+            default_path = os.path.join('.cache', 'traces.jsonl' if fmt == 'jsonl' else 'traces.db')
+            _sink = TraceSink(os.getenv('TRACE_PATH', default_path), fmt=fmt,
+                              max_age=float(os.getenv('TRACE_RETENTION_DAYS', '7')) * 24 * 3600)
+        return _sink
+
+class Span:
+    """Handle yielded by ``span`` for adding attributes while it is open"""
+    def __init__(self, name: str, attributes: Dict):
+        self.name = name
+        self.attributes = attributes
+        self.span_id = uuid.uuid4().hex[:16]
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+def record(name: str, started_at: float, duration_ms: float, status: str = 'ok', **attributes):
+    """Record a span timed by the caller, e.g. across the yields of a generator"""
+    sink = get_trace_sink()
+    if sink is None:
+        return
+    parent = _current_span.get()
+    sink.record({
+        'span_id': uuid.uuid4().hex[:16],
+        'parent_id': parent.span_id if parent else None,
+        'name': name,
+        'page': _current_page.get(),
+        'started_at': started_at,
+        'duration_ms': duration_ms,
+        'status': status,
+        'attributes': attributes
+    })
+
+@contextmanager
+def span(name: str, **attributes):
+    """Time a block and record it, nested under any span already open in this context"""
+    current = Span(name, attributes)
+    parent = _current_span.get()
+    token = _current_span.set(current)
+    started_at = time.time()
+    start = time.perf_counter()
+    status = 'ok'
+    try:
+        yield current
+    except BaseException as e:
+        # GeneratorExit and cancellation are not failures of the traced code
+        status = 'error' if isinstance(e, Exception) else 'cancelled'
+        raise
+    finally:
+        _current_span.reset(token)
+        sink = get_trace_sink()
+        if sink is not None:
+            sink.record({
+                'span_id': current.span_id,
+                'parent_id': parent.span_id if parent else None,
+                'name': name,
+                'page': _current_page.get(),
+                'started_at': started_at,
+                'duration_ms': (time.perf_counter() - start) * 1000,
+                'status': status,
+                'attributes': current.attributes
+            })
+
+def traced(name: Optional[str] = None):
+    """Decorator form of ``span``; the span name defaults to the function's qualified name"""
+    def decorator(fn: Callable) -> Callable:
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def latency_summary(spans: pd.DataFrame, by: List[str] = None) -> pd.DataFrame:
+    """Count, p50, p95 and max duration in ms per group (default: stage name and page)"""
+    by = by or ['name', 'page']
+    if spans.empty:
+        return pd.DataFrame(columns=by + ['count', 'p50_ms', 'p95_ms', 'max_ms', 'errors'])
+    spans = spans.assign(page=spans['page'].fillna('(background)'),
+                         error=(spans['status'] == 'error').astype(int))
+    grouped = spans.groupby(by)
+    summary = grouped['duration_ms'].agg(
+        count='count',
+        p50_ms=lambda d: d.quantile(0.5),
+        p95_ms=lambda d: d.quantile(0.95),
+        max_ms='max'
+    )
+    summary['errors'] = grouped['error'].sum()
+    return summary.reset_index().sort_values('p95_ms', ascending=False)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The app runs with src/ as its root, e.g. "from utils.export import ..."; the
+# fake Snowflake connector and mock OpenAI server live with the benchmarks
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
@@ -0,0 +1,93 @@
+import threading
+
+import pandas as pd
+import pytest
+
+import utils.tracing as tracing
+from fake_connector import FakeConnection, make_tables
+from core.snowflake import QueryCancelled, QueryTimeout, SnowflakeConnection
+
+FAST = "SELECT * FROM TABLE_0"
+SLOW = "SELECT SYSTEM$WAIT(5)"
+
+
+class ListSink:
+    def __init__(self):
+        self.spans = []
+
+    def record(self, span):
+        self.spans.append(span)
+
+
+@pytest.fixture
+def fake():
+    return FakeConnection(make_tables(2), latency=0)
+
+
+@pytest.fixture
+def conn(fake):
+    # Passing the connection bypasses the pool and the result cache
+    return SnowflakeConnection(conn=fake)
+
+
+@pytest.fixture
+def sink(monkeypatch):
+    sink = ListSink()
+    monkeypatch.setattr(tracing, 'get_trace_sink', lambda: sink)
+    return sink
+
+
+def test_submitted_query_runs_to_completion(conn):
+    query_id = conn.submit_query(FAST)
+    result = conn.wait_for_query(query_id, timeout=5)
+    assert conn.query_state(query_id) == 'done'
+    assert len(result) == 5 and list(result.columns)[0] == 'ID'
+
+
+def test_slow_query_reports_running_then_cancelled(conn, fake):
+    query_id = conn.submit_query(SLOW)
+    assert conn.query_state(query_id) == 'running'
+    conn.cancel_query(query_id)
+    assert conn.query_state(query_id) == 'cancelled'
+    assert fake.cancelled_count == 1
+
+
+def test_timeout_cancels_query_in_warehouse(conn, fake):
+    with pytest.raises(QueryTimeout):
+        conn.execute_query(SLOW, timeout=0.2)
+    assert fake.cancelled_count == 1
+
+
+def test_cancel_event_stops_waiting(conn, fake):
+    stop = threading.Event()
+    threading.Timer(0.2, stop.set).start()
+    with pytest.raises(QueryCancelled) as raised:
+        conn.execute_query(SLOW, cancel_event=stop)
+    assert not isinstance(raised.value, QueryTimeout)
+    assert fake.cancelled_count == 1
+
+
+def test_wait_for_queries_keeps_order_and_isolates_timeouts(conn, fake):
+    query_ids = [conn.submit_query(SLOW), conn.submit_query(FAST)]
+    slow, fast = conn.wait_for_queries(query_ids, timeout=0.3, return_exceptions=True)
+    assert isinstance(slow, QueryTimeout)
+    assert isinstance(fast, pd.DataFrame) and len(fast) == 5
+    assert fake.cancelled_count == 1
+
+
+def test_failed_query_raises_warehouse_error(conn):
+    with pytest.raises(Exception, match="cannot run query"):
+        conn.execute_query("SELECT * FROM MISSING_TABLE", timeout=5)
+
+
+def test_failed_cancel_is_traced_and_timeout_still_raised(conn, fake, sink, monkeypatch):
+    def refuse(query_id):
+        raise RuntimeError("warehouse unreachable")
+    monkeypatch.setattr(fake, '_cancel', refuse)
+
+    with pytest.raises(QueryTimeout):
+        conn.execute_query(SLOW, timeout=0.2)
+    cancels = [s for s in sink.spans if s['name'] == 'snowflake.cancel_query']
+    assert len(cancels) == 1
+    assert cancels[0]['status'] == 'error'
+    assert 'warehouse unreachable' in cancels[0]['attributes']['error']
@@ -0,0 +1,55 @@
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from utils.export import ResultExporter, source_key
+
+
+@pytest.fixture
+def exporter(tmp_path):
+    return ResultExporter(spool_dir=str(tmp_path / 'spool'), chunk_rows=3,
+                          serve_dir=str(tmp_path / 'static' / 'exports'), serve_max_age=60)
+
+
+def test_csv_spool_is_written_in_chunks(exporter):
+    df = pd.DataFrame({'a': range(10), 'b': [f"v{i}" for i in range(10)]})
+    path = exporter.spool_frame(df, 'CSV')
+    assert pd.read_csv(path).equals(df)
+
+
+def test_served_files_are_session_scoped_and_unguessable(exporter):
+    first = exporter.serve(exporter.spool_frame(pd.DataFrame({'a': [1]})), 'session-1')
+    second = exporter.serve(exporter.spool_frame(pd.DataFrame({'a': [2]})), 'session-2')
+    first_dir, first_name = os.path.split(os.path.relpath(first, exporter.serve_dir))
+    second_dir, _ = os.path.split(os.path.relpath(second, exporter.serve_dir))
+
+    assert first_dir != second_dir
+    assert 'session-1' not in first_dir
+    assert len(os.path.splitext(first_name)[0]) >= 32
+    assert exporter.served_url(first) == f"app/static/exports/{first_dir}/{first_name}"
+    assert not os.listdir(exporter.spool_dir)
+
+
+def test_expired_served_files_and_their_folders_are_removed(exporter):
+    served = exporter.serve(exporter.spool_frame(pd.DataFrame({'a': [1]})), 'session-1')
+    old = time.time() - 120
+    os.utime(served, (old, old))
+    exporter.spool_frame(pd.DataFrame({'a': [2]}))
+    assert not os.path.exists(served)
+    assert os.listdir(exporter.serve_dir) == []
+
+
+def test_discard_removes_a_file(exporter):
+    path = exporter.spool_frame(pd.DataFrame({'a': [1]}))
+    exporter.discard(path)
+    exporter.discard(path)
+    assert not os.path.exists(path)
+
+
+def test_source_key_follows_content_not_identity():
+    df = pd.DataFrame({'a': [1, 2]})
+    assert source_key(df) == source_key(df.copy())
+    assert source_key(df) != source_key(pd.DataFrame({'a': [1, 3]}))
+    assert source_key(df, "SELECT 1") == source_key(pd.DataFrame(), " SELECT 1 ")
@@ -0,0 +1,77 @@
+import pytest
+
+from utils.nl_sql_cache import NLSQLCache
+
+SCHEMA = 'schema-v1'
+
+# Rewordings that should reuse the cached SQL
+PARAPHRASES = [
+    ("revenue by region", "revenues by regions"),
+    ("how many orders were placed in 2023", "number of orders placed in 2023"),
+    ("average order value by customer segment", "avg order value per customer segment"),
+    ("list all products with their prices", "show products and their prices"),
+    ("count of customers per country", "number of customers by country"),
+    ("total revenue by product category", "total revenues per product categories"),
+    ("orders shipped last month", "orders that shipped last month"),
+    ("sum of sales by store", "total sales by store"),
+]
+
+# Similar wording, different question
+DIFFERENT = [
+    ("revenue by region", "revenue by product"),
+    ("total sales per month", "total sales per year"),
+    ("count of customers per country", "count of orders per country"),
+    ("average order value by customer segment", "average order value by region"),
+    ("orders shipped last month", "orders returned last month"),
+    ("top 10 customers by revenue", "top 10 products by revenue"),
+    ("sum of sales by store", "sum of profit by store"),
+    ("number of employees by department", "number of departments by employee"),
+    ("total revenue by region", "total revenue by region and product"),
+    # Same words, but literals or polarity differ
+    ("orders above 5", "orders above 6"),
+    ("orders above -1", "orders above 1"),
+    ("orders above 1.5", "orders above 15"),
+    ("customers in 'new york'", "customers in 'boston'"),
+    ("orders that shipped", "orders that have not shipped"),
+    ("products with the highest price", "products with the lowest price"),
+    ("orders sorted by date ascending", "orders sorted by date descending"),
+]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return NLSQLCache(db_path=str(tmp_path / 'nl_sql_cache.db'))
+
+
+@pytest.mark.parametrize('cached, asked', PARAPHRASES)
+def test_paraphrase_reuses_sql(cache, cached, asked):
+    cache.put(cached, SCHEMA, 'SELECT 1')
+    assert cache.lookup(asked, SCHEMA) is not None
+
+
+@pytest.mark.parametrize('cached, asked', DIFFERENT)
+def test_different_question_misses(cache, cached, asked):
+    cache.put(cached, SCHEMA, 'SELECT 1')
+    assert cache.lookup(asked, SCHEMA) is None
+
+
+def test_threshold_separates_pairs(cache):
+    lowest_paraphrase = min(float(cache.embed(a) @ cache.embed(b)) for a, b in PARAPHRASES)
+    highest_different = max(float(cache.embed(a) @ cache.embed(b)) for a, b in DIFFERENT[:9])
+    assert highest_different < cache.similarity_threshold <= lowest_paraphrase
+
+
+def test_exact_key_keeps_signs_and_decimals():
+    assert NLSQLCache.normalize("orders above -1") != NLSQLCache.normalize("orders above 1")
+    assert NLSQLCache.normalize("orders above 1.5") != NLSQLCache.normalize("orders above 15")
+    assert NLSQLCache.normalize("sales 2023-01") == "sales 2023 01"
+
+
+def test_exact_hit(cache):
+    cache.put("Revenue by region", SCHEMA, 'SELECT 1')
+    assert cache.lookup("revenue by region?", SCHEMA) == ('SELECT 1', 'exact')
+
+
+def test_entries_are_scoped_by_schema(cache):
+    cache.put("revenue by region", SCHEMA, 'SELECT 1')
+    assert cache.lookup("revenue by region", 'schema-v2') is None
@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+
+from utils.result_cache import QueryResultCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return QueryResultCache(cache_dir=str(tmp_path / 'results'), max_memory_bytes=64 * 1024)
+
+
+def test_formatting_shares_a_key(cache):
+    assert cache.make_key("select a,b from t  where x = 1;") == cache.make_key("SELECT a, b\nFROM t WHERE x=1")
+    assert cache.make_key("select a from t -- note\nwhere x = 1") == cache.make_key("SELECT a FROM t WHERE x = 1")
+
+
+def test_whitespace_inside_literals_is_kept(cache):
+    assert cache.make_key("SELECT * FROM t WHERE name = 'a  b'") != cache.make_key("SELECT * FROM t WHERE name = 'a b'")
+    assert cache.make_key('SELECT "my  col" FROM t') != cache.make_key('SELECT "my col" FROM t')
+
+
+def test_schema_fingerprint_scopes_keys(cache):
+    assert cache.make_key("SELECT 1", 'v1') != cache.make_key("SELECT 1", 'v2')
+
+
+def test_small_result_is_kept_in_memory(cache):
+    df = pd.DataFrame({'a': range(10)})
+    cache.put('small', df)
+    assert cache.get('small').equals(df)
+    assert cache.stats()['memory_hits'] == 1
+
+
+def test_result_over_memory_budget_is_kept_on_disk(cache):
+    pytest.importorskip('pyarrow', exc_type=ImportError)
+    small = pd.DataFrame({'a': range(10)})
+    large = pd.DataFrame({'a': range(100_000)})
+    cache.put('small', small)
+    cache.put('large', large)
+    assert cache.stats()['memory_entries'] == 1
+
+    assert cache.get('large').equals(large)
+    stats = cache.stats()
+    assert stats['disk_hits'] == 1
+    # Reading it back does not push smaller results out of memory
+    assert stats['memory_entries'] == 1
+    assert cache.get('small') is not None
+    assert cache.stats()['memory_hits'] == 1
@@ -0,0 +1,44 @@
+import json
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+from utils.schema_cache import SchemaCache
+
+
+def test_sample_values_keep_their_types(tmp_path):
+    cache = SchemaCache(str(tmp_path / 'schema_cache.json'))
+    tables = {'ORDERS': {'sample_data': [{'AMOUNT': Decimal('1.50'), 'DAY': date(2024, 1, 2),
+                                          'AT': datetime(2024, 1, 2, 3, 4, 5), 'RAW': b'\x00\x01'}]}}
+    cache._write_tables(tables)
+    assert cache._read_tables() == tables
+
+
+def test_concurrent_writes_never_leave_a_partial_file(tmp_path):
+    path = tmp_path / 'schema_cache.json'
+    tables = {f'TABLE_{i}': {'columns': [{'name': f'COL_{c}'} for c in range(50)]} for i in range(50)}
+    stop = threading.Event()
+    failures = []
+
+    def read():
+        while not stop.is_set():
+            if path.exists():
+                try:
+                    json.loads(path.read_text())
+                except ValueError as e:
+                    failures.append(e)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    writers = [threading.Thread(target=lambda: [SchemaCache(str(path))._write_tables(tables) for _ in range(20)])
+               for _ in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    stop.set()
+    reader.join()
+
+    assert failures == []
+    assert SchemaCache(str(path))._read_tables() == tables
+    assert [p.name for p in tmp_path.iterdir()] == ['schema_cache.json']
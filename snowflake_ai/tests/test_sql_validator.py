@@ -0,0 +1,66 @@
+import pytest
+
+from core.sql_validator import SQLValidator, is_valid_sql, statement_complete
+
+SCHEMA = {
+    'ORDERS': {'columns': [{'name': name} for name in ('ORDER_ID', 'CUSTOMER_ID', 'ORDER_DATE', 'AMOUNT', 'STATUS')]},
+    'CUSTOMERS': {'columns': [{'name': name} for name in ('CUSTOMER_ID', 'NAME', 'REGION')]}
+}
+
+
+@pytest.mark.parametrize('sql', [
+    "SELECT ORDER_ID, AMOUNT FROM ORDERS",
+    "SELECT EXTRACT(YEAR FROM ORDER_DATE) AS YR, SUM(AMOUNT) FROM ORDERS GROUP BY 1",
+    "SELECT TRIM(BOTH ' ' FROM NAME) FROM CUSTOMERS",
+    "SELECT SUBSTRING(NAME FROM 1 FOR 3) FROM CUSTOMERS",
+    "SELECT POSITION('a' IN NAME) FROM CUSTOMERS",
+    "SELECT COALESCE((SELECT MAX(AMOUNT) FROM ORDERS), 0) AS TOP_AMOUNT FROM CUSTOMERS",
+    "SELECT c.NAME, SUM(o.AMOUNT) FROM CUSTOMERS c JOIN ORDERS o ON c.CUSTOMER_ID = o.CUSTOMER_ID GROUP BY 1",
+    "WITH recent AS (SELECT ORDER_ID FROM ORDERS) SELECT ORDER_ID FROM recent",
+    "SELECT AMOUNT * 2 AS DOUBLED FROM ORDERS ORDER BY DOUBLED",
+])
+def test_valid_queries(sql):
+    assert SQLValidator(SCHEMA).validate(sql) == []
+
+
+@pytest.mark.parametrize('sql, error', [
+    ("SELECT EXTRACT(YEAR FROM SHIPPED_AT) FROM ORDERS", "Column SHIPPED_AT does not exist in table ORDERS"),
+    ("SELECT * FROM SHIPMENTS", "Table SHIPMENTS does not exist in the schema"),
+    ("SELECT c.EMAIL FROM CUSTOMERS c", "Column EMAIL does not exist in table CUSTOMERS"),
+    ("SELECT 1; DROP TABLE ORDERS", "Only a single SELECT or WITH statement is allowed"),
+    ("DELETE FROM ORDERS", "Only a single SELECT or WITH statement is allowed"),
+])
+def test_invalid_queries(sql, error):
+    assert error in SQLValidator(SCHEMA).validate(sql)
+
+
+def test_without_schema_only_statement_type_is_checked():
+    assert SQLValidator({}).validate("SELECT * FROM ANYTHING") == []
+    assert not is_valid_sql("WITH x AS (SELECT 1) DELETE FROM ORDERS")
+
+
+@pytest.mark.parametrize('text', [
+    "SELECT 1;",
+    "SELECT ';' AS x FROM t;",
+    "SELECT COALESCE(a, 0) FROM t;",
+    "```sql\nSELECT 1\n```",
+    "SELECT 1 -- trailing; comment\n;",
+    "SELECT 1 /* a; b */ FROM t;",
+    "SELECT 1 /* multi\nline; comment */;",
+])
+def test_statement_complete(text):
+    assert statement_complete(text)
+
+
+@pytest.mark.parametrize('text', [
+    "",
+    ";",
+    "SELECT 1",
+    "SELECT ';",
+    "SELECT (1;",
+    "SELECT 1 -- not done;",
+    "SELECT 1 /* not done;",
+    "SELECT 1 /* a; b */",
+])
+def test_statement_incomplete(text):
+    assert not statement_complete(text)
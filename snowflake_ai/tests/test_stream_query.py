@@ -0,0 +1,55 @@
+import pytest
+
+from fake_connector import FakeConnection, make_tables
+from core.snowflake import SnowflakeConnection
+from utils.result_cache import QueryResultCache
+
+QUERY = "SELECT * FROM TABLE_0"
+
+
+@pytest.fixture
+def conn(tmp_path):
+    fake = FakeConnection(make_tables(1, row_count=10), latency=0)
+    return SnowflakeConnection(conn=fake, result_cache=QueryResultCache(cache_dir=str(tmp_path / 'results')))
+
+
+def stream(conn, batch_rows=5, **caps):
+    chunks = list(conn.stream_query(QUERY, batch_rows=batch_rows, **caps))
+    cached = conn.result_cache.get(conn._cache_key(QUERY))
+    return sum(len(chunk) for chunk in chunks), conn.truncated, cached
+
+
+def test_uncapped_result_is_complete_and_cached(conn):
+    rows, truncated, cached = stream(conn)
+    assert (rows, truncated) == (10, False)
+    assert len(cached) == 10
+
+
+def test_cap_inside_a_batch_truncates(conn):
+    rows, truncated, cached = stream(conn, max_rows=7)
+    assert (rows, truncated, cached) == (7, True, None)
+
+
+def test_cap_on_a_batch_boundary_with_more_rows_truncates(conn):
+    rows, truncated, cached = stream(conn, max_rows=5)
+    assert (rows, truncated, cached) == (5, True, None)
+
+
+def test_cap_equal_to_result_size_is_complete_and_cached(conn):
+    rows, truncated, cached = stream(conn, max_rows=10)
+    assert (rows, truncated) == (10, False)
+    assert len(cached) == 10
+
+
+def test_byte_cap_truncates_only_when_rows_remain(conn):
+    rows, truncated, cached = stream(conn, max_bytes=1)
+    assert (rows, truncated, cached) == (5, True, None)
+    # The whole result arrives in the batch that reaches the cap
+    rows, truncated, cached = stream(conn, batch_rows=10, max_bytes=1)
+    assert (rows, truncated, len(cached)) == (10, False, 10)
+
+
+def test_cached_result_honours_the_row_cap(conn):
+    stream(conn)
+    rows, truncated, _ = stream(conn, max_rows=5)
+    assert (rows, truncated) == (5, True)
@@ -0,0 +1,71 @@
+import openai
+import pandas as pd
+import pytest
+
+from mock_openai_server import MockOpenAIServer
+from core.openai_client import QueryGenerator
+from core.sql_engine import SQLGenerationEngine
+
+SCHEMA = {
+    'TABLE_1': {
+        'type': 'BASE TABLE',
+        'columns': [{'name': name, 'type': 'NUMBER', 'nullable': 'YES'} for name in ('ID', 'COL_1', 'COL_2')],
+        'sample_data': []
+    }
+}
+
+
+class RowsConnection:
+    """Stands in for SnowflakeConnection; every validation query returns one row"""
+    opened = 0
+
+    def __init__(self, session_id=None):
+        RowsConnection.opened += 1
+
+    def execute_query(self, query, cancel_event=None):
+        return pd.DataFrame({'ID': [1]})
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    server = MockOpenAIServer(first_token_delay=0, token_delay=0.005).start()
+    monkeypatch.setattr(openai, 'api_base', server.api_base)
+    monkeypatch.setenv('OPENAI_API_KEY', 'mock')
+    RowsConnection.opened = 0
+    yield server
+    server.shutdown()
+
+
+def generate(server, reply):
+    server.reply = reply
+    engine = SQLGenerationEngine(RowsConnection, QueryGenerator(), candidates=1, max_rounds=1)
+    seen = []
+    sql = engine.generate("rows of table 1 with positive col 2", SCHEMA, on_token=seen.append)
+    return engine, sql, seen
+
+
+def test_stream_stops_at_end_of_statement(server):
+    engine, sql, seen = generate(server, "```sql\nSELECT ID, COL_1 FROM TABLE_1\nWHERE COL_2 > 0;\n```\n"
+                                         "This query selects rows with a positive COL_2.")
+    assert sql.rstrip(';').split() == "SELECT ID, COL_1 FROM TABLE_1 WHERE COL_2 > 0".split()
+    # Text grew one delta at a time, and the explanation after the statement was never read
+    assert len(seen) > 3 and all(a in b or b.startswith(a) for a, b in zip(seen, seen[1:]))
+    assert "This query" not in seen[-1]
+    assert [a['status'] for a in engine.attempts] == ['ok']
+
+
+def test_block_comment_does_not_end_statement_early(server):
+    engine, sql, seen = generate(server, "SELECT ID /* keep; going */ FROM TABLE_1; -- done")
+    assert 'FROM TABLE_1' in sql
+    assert [a['status'] for a in engine.attempts] == ['ok']
+
+
+def test_streamed_sql_failing_validation_never_reaches_the_warehouse(server):
+    engine, sql, _ = generate(server, "SELECT MISSING_COLUMN FROM TABLE_1;")
+    assert sql is None
+    assert [a['status'] for a in engine.attempts] == ['rejected']
+    assert 'MISSING_COLUMN' in engine.attempts[0]['error']
+    assert RowsConnection.opened == 0
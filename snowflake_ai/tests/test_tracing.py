@@ -0,0 +1,50 @@
+import time
+
+import pytest
+
+from utils.tracing import TraceSink
+
+
+def spans(started, prefix='s'):
+    return [{'span_id': f"{prefix}{i}", 'parent_id': None, 'name': 'stage', 'page': 'Home',
+             'started_at': t, 'duration_ms': 1.0, 'status': 'ok', 'attributes': {'i': i}}
+            for i, t in enumerate(started)]
+
+
+@pytest.fixture(params=['sqlite', 'jsonl'])
+def make_sink(request, tmp_path):
+    def make(**kwargs):
+        path = tmp_path / ('traces.db' if request.param == 'sqlite' else 'traces.jsonl')
+        return TraceSink(str(path), fmt=request.param, **kwargs)
+    return make
+
+
+def test_prune_drops_spans_past_max_age(make_sink):
+    sink = make_sink(max_age=3600)
+    now = time.time()
+    sink._write(spans([now - 7200, now - 60, now - 30]))
+    sink.prune()
+    assert sorted(sink.load()['span_id']) == ['s1', 's2']
+
+
+def test_prune_keeps_newest_spans_up_to_max_spans(make_sink):
+    sink = make_sink(max_spans=3)
+    now = time.time()
+    sink._write(spans([now - 50 + i for i in range(10)]))
+    sink.prune()
+    assert sorted(sink.load()['span_id']) == ['s7', 's8', 's9']
+
+
+def test_load_returns_only_the_window(make_sink):
+    sink = make_sink()
+    now = time.time()
+    # Spans finish out of start order, e.g. a long span is appended after shorter later ones
+    started = [now - 5000 + i for i in range(2000)] + [now - 100, now - 400, now - 50]
+    sink._write(spans(started))
+    window = sink.load(since=now - 300)
+    assert list(window['started_at']) == sorted(t for t in started if t >= now - 300)
+    assert window['started_at'].is_monotonic_increasing
+
+
+def test_load_of_empty_sink(make_sink):
+    assert make_sink().load().empty
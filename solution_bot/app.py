@@ -3,12 +3,32 @@ from dotenv import load_dotenv
 from utils1.doc_processor import process_document
 from utils1.chat_manager import ChatManager
 from utils1.vector_store import VectorStore
+from langchain.chat_models import ChatOpenAI
 import os
 import io
 
 load_dotenv()
 
 
+# Built once per process and shared by every session; reruns reuse them
+@st.cache_resource
+def get_vector_store():
+    return VectorStore()
+
+@st.cache_resource
+def get_llm():
+    return ChatOpenAI(temperature=0)
+
+def get_chat_manager(vector_store):
+    """This session's ChatManager, so conversation memory survives reruns"""
+    if "chat_manager" not in st.session_state:
+        st.session_state.chat_manager = ChatManager(vector_store, llm=get_llm())
+    else:
+        # Pick up documents added since the chain was built, by any session
+        st.session_state.chat_manager.refresh(vector_store)
+    return st.session_state.chat_manager
+
+
 def handle_followup(question, chat_manager):
     response, new_follow_ups = chat_manager.get_response(question)
     return response, new_follow_ups
@@ -16,8 +36,8 @@ def handle_followup(question, chat_manager):
 def main():
     st.title("Document Q&A Chatbot")
     
-    # Initialize vector store
-    vector_store = VectorStore()
+    # Shared vector store, opened once per process
+    vector_store = get_vector_store()
     
     # Show database status
     if vector_store.vector_store is not None:
@@ -31,7 +51,10 @@ def main():
         help="Upload either a PDF or DOCX file"
     )
 
-    if uploaded_file is not None:
+    # The uploader keeps returning the same file on every rerun; process it once per session
+    if "processed_files" not in st.session_state:
+        st.session_state.processed_files = set()
+    if uploaded_file is not None and uploaded_file.id not in st.session_state.processed_files:
         try:
             # Create BytesIO object for PDF files
             if uploaded_file.type == "application/pdf":
@@ -42,8 +65,14 @@ def main():
 
             with st.spinner("Processing document..."):
                 chunks = process_document(file_bytes)
-                vector_store.add_texts(chunks)
+                stats = vector_store.add_texts(chunks)
+            st.session_state.processed_files.add(uploaded_file.id)
             st.success(f"Document '{uploaded_file.name}' processed and saved successfully!")
+            st.caption(
+                f"{stats['chunks']} chunks: {stats['added']} added, {stats['already_stored']} already stored, "
+                f"{stats['embedded']} embedded ({stats['cache_hits']} from cache) "
+                f"in {stats['seconds']:.1f}s, {stats['chunks_per_second']:.0f} chunks/s"
+            )
         except Exception as e:
             st.error(f"Error processing document: {str(e)}")
             st.error("Please make sure the file is not corrupted and try again.")
@@ -56,7 +85,7 @@ def main():
     if "message_counter" not in st.session_state:
         st.session_state.message_counter = 0
     
-    chat_manager = ChatManager(vector_store)
+    chat_manager = get_chat_manager(vector_store)
     
     # Display chat messages
     for idx, message in enumerate(st.session_state.messages):
@@ -82,6 +111,7 @@ def main():
     # Clear chat button
     if st.button("Clear Chat History"):
         st.session_state.messages = []
+        chat_manager.memory.clear()
         st.session_state.message_counter = 0
         st.experimental_rerun()
     
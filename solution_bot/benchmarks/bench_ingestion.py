@@ -0,0 +1,62 @@
+"""Benchmark document ingestion through the embedding cache.
+
+Uses the deterministic HashEmbeddings stub with a simulated per-request
+latency, so no OpenAI key is needed. Compares the previous path (every
+chunk embedded in one sequential pass on every upload) with the cached,
+concurrently batched path, for a first upload and a re-upload.
+
+    python benchmarks/bench_ingestion.py --chunks 2000 --batch-size 64 --workers 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+# Make ``utils1`` importable the same way ``streamlit run app.py`` does
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from utils1.embedding_cache import CachedEmbeddings, EmbeddingCache, HashEmbeddings
+
+
+def make_chunks(count):
+    return [f"Section {i}: " + " ".join(f"term{(i * 7 + j) % 500}" for j in range(150)) for i in range(count)]
+
+
+def sequential(chunks, stub, batch_size):
+    """Previous behaviour: one request after another for every chunk, on every upload"""
+    start = time.perf_counter()
+    for i in range(0, len(chunks), batch_size):
+        stub.embed_documents(chunks[i:i + batch_size])
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--chunks', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.2, help="Seconds per embedding request")
+    args = parser.parse_args()
+
+    chunks = make_chunks(args.chunks)
+    baseline = sequential(chunks, HashEmbeddings(latency=args.latency), args.batch_size)
+    print(f"sequential, uncached: {baseline:.2f}s per upload ({len(chunks) / baseline:.0f} chunks/s)")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        stub = HashEmbeddings(latency=args.latency)
+        cached = CachedEmbeddings(stub, EmbeddingCache(os.path.join(cache_dir, 'cache.db')),
+                                  batch_size=args.batch_size, max_workers=args.workers)
+        for label in ('first upload', 're-upload'):
+            before = dict(cached.stats)
+            start = time.perf_counter()
+            cached.embed_documents(chunks)
+            elapsed = time.perf_counter() - start
+            print(f"cached, {label}: {elapsed:.2f}s ({len(chunks) / elapsed:.0f} chunks/s), "
+                  f"{cached.stats['embedded'] - before['embedded']} embedded, "
+                  f"{cached.stats['cache_hits'] - before['cache_hits']} cache hits")
+        print(f"embedding requests: {stub.requests}, throughput while embedding: {cached.throughput():.0f} chunks/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,8 +5,9 @@ from langchain.prompts import PromptTemplate
 from langchain.chains.question_answering import load_qa_chain
 
 class ChatManager:
-    def __init__(self, vector_store):
-        self.llm = ChatOpenAI(temperature=0)
+    def __init__(self, vector_store, llm=None):
+        # The LLM client can be shared; the memory is this conversation's own
+        self.llm = llm or ChatOpenAI(temperature=0)
         self.memory = ConversationBufferMemory(
             memory_key="chat_history",
             output_key="answer",
@@ -41,6 +42,13 @@ class ChatManager:
         """
         
         self.chain = self._create_chain(vector_store)
+        self.vector_store_version = vector_store.version
+    
+    def refresh(self, vector_store):
+        """Rebuild the chain after documents were added, keeping the conversation memory"""
+        if vector_store.version != self.vector_store_version:
+            self.chain = self._create_chain(vector_store)
+            self.vector_store_version = vector_store.version
     
     def _create_chain(self, vector_store):
         if (vector_store.vector_store is None):
@@ -0,0 +1,160 @@
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from langchain.embeddings.base import Embeddings
+
+
+def content_hash(text, namespace=""):
+    """Stable ID for a chunk: the same text under the same model always maps to the same key"""
+    return hashlib.sha256(f"{namespace}\n{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite store of embeddings keyed by content hash"""
+
+    def __init__(self, path="./embedding_cache.db"):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (hash TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_many(self, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        conn = self._connect()
+        try:
+            # Stay below SQLite's limit on bound parameters
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT hash, vector FROM embeddings WHERE hash IN ({placeholders})", batch
+                )
+                for key, blob in rows:
+                    vector = array("d")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+        finally:
+            conn.close()
+        return found
+
+    def put_many(self, vectors: Dict[str, List[float]]):
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (hash, vector) VALUES (?, ?)",
+                        [(key, array("d", vector).tobytes()) for key, vector in vectors.items()],
+                    )
+            finally:
+                conn.close()
+
+    def count(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        finally:
+            conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Wrap an embedding model with a content-hash cache and concurrent batched requests.
+
+    Duplicate texts and texts embedded before are never sent to the model;
+    the rest go out in batches of ``batch_size`` on up to ``max_workers``
+    threads. ``stats`` accumulates ingestion counts and throughput.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: Optional[EmbeddingCache] = None,
+                 batch_size=64, max_workers=4, namespace=None):
+        self.embeddings = embeddings
+        self.cache = cache or EmbeddingCache()
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        # Embeddings from different models must not share cache entries
+        self.namespace = namespace or getattr(embeddings, "model", type(embeddings).__name__)
+        self.stats = {"texts": 0, "unique": 0, "cache_hits": 0, "embedded": 0, "batches": 0,
+                      "embed_seconds": 0.0}
+
+    def key(self, text):
+        return content_hash(text, self.namespace)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.key(text) for text in texts]
+        unique = dict(zip(keys, texts))
+        vectors = self.cache.get_many(list(unique))
+        missing = [key for key in unique if key not in vectors]
+
+        start = time.perf_counter()
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        if batches:
+            def embed_batch(batch_keys):
+                return dict(zip(batch_keys, self.embeddings.embed_documents([unique[k] for k in batch_keys])))
+
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(batches))) as executor:
+                for embedded in executor.map(embed_batch, batches):
+                    # Store each batch as it finishes so an interrupted upload keeps its progress
+                    self.cache.put_many(embedded)
+                    vectors.update(embedded)
+
+        self.stats["texts"] += len(texts)
+        self.stats["unique"] += len(unique)
+        self.stats["cache_hits"] += len(unique) - len(missing)
+        self.stats["embedded"] += len(missing)
+        self.stats["batches"] += len(batches)
+        self.stats["embed_seconds"] += time.perf_counter() - start
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def throughput(self):
+        """Chunks embedded per second of embedding time"""
+        seconds = self.stats["embed_seconds"]
+        return self.stats["embedded"] / seconds if seconds else 0.0
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic local stand-in for OpenAIEmbeddings, for benchmarks and offline runs.
+
+    Each text becomes a normalized bag of hashed words, so identical texts get
+    identical vectors and similar texts similar ones. ``latency`` seconds are
+    slept per request to model the API round-trip.
+    """
+
+    def __init__(self, size=256, latency=0.0):
+        self.size = size
+        self.latency = latency
+        self.model = f"hash-{size}"
+        self.requests = 0
+
+    def _embed(self, text):
+        vector = [0.0] * self.size
+        for word in text.lower().split():
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.size
+            vector[index] += 1.0 if digest[4] % 2 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
@@ -2,12 +2,27 @@ import chromadb
 from chromadb.config import Settings
 from langchain.embeddings import OpenAIEmbeddings
 from langchain.vectorstores import Chroma
+from utils1.embedding_cache import CachedEmbeddings, EmbeddingCache
 import os
+import threading
+import time
 
 class VectorStore:
-    def __init__(self):
-        self.embeddings = OpenAIEmbeddings()
-        self.persist_directory = "./chroma_db"
+    def __init__(self, embeddings=None, persist_directory="./chroma_db", batch_size=64, max_workers=4,
+                 cache_path="./embedding_cache.db"):
+        # Chunks are embedded once: the cache is keyed by content hash, and new
+        # chunks are embedded concurrently in batches of batch_size
+        self.embeddings = CachedEmbeddings(
+            embeddings or OpenAIEmbeddings(),
+            EmbeddingCache(cache_path),
+            batch_size=batch_size,
+            max_workers=max_workers
+        )
+        self.persist_directory = persist_directory
+        # Bumped whenever chunks are added, so cached chat chains know to rebuild
+        self.version = 0
+        # One instance is shared by every Streamlit session; serialize writes
+        self._lock = threading.Lock()
         # Load existing database if it exists
         if os.path.exists(self.persist_directory):
             self.vector_store = Chroma(
@@ -16,24 +31,56 @@ class VectorStore:
             )
         else:
             self.vector_store = None
-    
+
     def add_texts(self, texts):
-        if self.vector_store is None:
-            self.vector_store = Chroma.from_texts(
-                texts,
-                self.embeddings,
-                persist_directory=self.persist_directory,
-                metadata=[{"source": f"chunk_{i}"} for i in range(len(texts))]
-            )
-        else:
-            # Add new texts to existing database
-            self.vector_store.add_texts(
-                texts,
-                metadatas=[{"source": f"chunk_{i}"} for i in range(len(texts))]
-            )
-        # Persist the database
-        self.vector_store.persist()
-    
+        """Add chunks not stored yet; returns ingestion metrics for this call"""
+        with self._lock:
+            return self._add_texts(texts)
+
+    def _add_texts(self, texts):
+        start = time.perf_counter()
+        before = dict(self.embeddings.stats)
+        # The content hash is the Chroma ID, so re-uploaded chunks are recognized
+        ids = [self.embeddings.key(text) for text in texts]
+        new = dict(zip(ids, texts))
+        if self.vector_store is not None and new:
+            stored = self.vector_store.get(ids=list(new), include=[])["ids"]
+            for chunk_id in stored:
+                new.pop(chunk_id, None)
+
+        if new:
+            new_ids = list(new)
+            new_texts = list(new.values())
+            metadatas = [{"source": f"chunk_{i}"} for i in range(len(new_texts))]
+            if self.vector_store is None:
+                self.vector_store = Chroma.from_texts(
+                    new_texts,
+                    self.embeddings,
+                    metadatas=metadatas,
+                    ids=new_ids,
+                    persist_directory=self.persist_directory
+                )
+            else:
+                # Add new texts to existing database
+                self.vector_store.add_texts(new_texts, metadatas=metadatas, ids=new_ids)
+            # Persist the database
+            self.vector_store.persist()
+            self.version += 1
+
+        seconds = time.perf_counter() - start
+        stats = self.embeddings.stats
+        return {
+            "chunks": len(texts),
+            "already_stored": len(set(ids)) - len(new),
+            "duplicates": len(texts) - len(set(ids)),
+            "added": len(new),
+            "cache_hits": stats["cache_hits"] - before["cache_hits"],
+            "embedded": stats["embedded"] - before["embedded"],
+            "batches": stats["batches"] - before["batches"],
+            "seconds": seconds,
+            "chunks_per_second": len(texts) / seconds if seconds else 0.0
+        }
+
     def similarity_search(self, query, k=4):
         if self.vector_store is None:
             return []
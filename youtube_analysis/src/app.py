@@ -52,7 +52,9 @@ def main():
                 
             # Display results
             st.subheader("Sentiment Distribution")
-            fig = px.pie(df, names='sentiment', title='Comment Sentiments')
+            # Ship one row per sentiment to the browser, not one per comment
+            sentiment_counts = df['sentiment'].value_counts().rename_axis('sentiment').reset_index(name='count')
+            fig = px.pie(sentiment_counts, names='sentiment', values='count', title='Comment Sentiments')
             st.plotly_chart(fig)
             
             # Display comments with reply option